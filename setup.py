@@ -41,6 +41,7 @@ install_requires = [
     'iptools>=0.6.1',
     'jira>=1.0.15',
     'lxml>=3.2.0',
+    'numpy>=1.11.0,<1.17',  # NumPy 1.16 is the last release supporting Python 2.7
     'passlib>=1.7.0',
     'paypalrestsdk>=1.10.0,<2.0',
     'pbr!=2.1.0',
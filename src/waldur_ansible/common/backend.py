@@ -69,10 +69,10 @@ class ManagementRequestsBackend(object):
             extracted_information_handler = self.instantiate_extracted_information_handler_class(request)
             error_handler = self.instantiate_error_handler_class(request)
             try:
-                for output_line in utils.subprocess_output_iterator(command, env):
-                    request.output += output_line
-                    request.save(update_fields=['output'])
-                    lines_post_processor_instance.post_process_line(output_line)
+                with self.build_output_buffer(request) as output_buffer:
+                    for output_line in utils.subprocess_output_iterator(command, env):
+                        output_buffer.write(output_line)
+                        lines_post_processor_instance.post_process_line(output_line)
             except subprocess.CalledProcessError as e:
                 logger.error('%s - failed to execute command "%s".', request, command_str)
                 logger.error('%s - Ansible request processing output: \n %s.', request, request.output)
@@ -84,6 +84,13 @@ class ManagementRequestsBackend(object):
         finally:
             self.handle_on_processing_finished(request)
 
+    def build_output_buffer(self, request):
+        return utils.OutputBuffer(
+            request,
+            flush_size=settings.WALDUR_ANSIBLE_COMMON.get('OUTPUT_FLUSH_SIZE', 4096),
+            flush_interval=settings.WALDUR_ANSIBLE_COMMON.get('OUTPUT_FLUSH_INTERVAL', 2),
+        )
+
     def build_command(self, request):
         playbook_path = self.get_playbook_path(request)
         self.ensure_playbook_exists_or_raise(playbook_path)
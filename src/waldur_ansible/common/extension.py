@@ -12,6 +12,10 @@ class AnsibleCommonExtension(WaldurExtension):
             'ANSIBLE_REQUEST_TIMEOUT': 3600,
             'ANSIBLE_LIBRARY': '/usr/share/ansible-waldur/',
             'REMOTE_VM_SSH_PORT': '22',
+            # Output of playbook is flushed to database when buffer size (in characters)
+            # or time since previous flush (in seconds) exceeds threshold.
+            'OUTPUT_FLUSH_SIZE': 4096,
+            'OUTPUT_FLUSH_INTERVAL': 2,
         }
 
     @staticmethod
@@ -1,20 +1,58 @@
 from __future__ import unicode_literals
 
 from django.apps import apps
+from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
+from django.contrib.contenttypes.models import ContentType
 from django.db import models
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.lru_cache import lru_cache
+from django.utils.translation import ugettext_lazy as _
 
 from waldur_core.core import models as core_models
 from waldur_core.structure import models as structure_models
 
 
+class OutputChunk(models.Model):
+    """
+    Part of output appended while Ansible playbook is running.
+    Chunks are removed when complete output is stored in the request itself.
+    """
+    content_type = models.ForeignKey(ContentType)
+    object_id = models.PositiveIntegerField()
+    scope = GenericForeignKey('content_type', 'object_id')
+    offset = models.PositiveIntegerField(help_text=_('Position of the first character of chunk in the output.'))
+    text = models.TextField()
+
+    class Meta(object):
+        ordering = ('offset',)
+        index_together = ('content_type', 'object_id', 'offset')
+
+
 class OutputMixin(models.Model):
     output = models.TextField(blank=True)
+    output_chunks = GenericRelation(OutputChunk)
 
     class Meta(object):
         abstract = True
 
+    def get_output_tail(self, offset=0):
+        """
+        Return output produced since given offset and offset of its end,
+        so that client may fetch only new output while request is processed.
+        """
+        chunks = list(self.output_chunks.filter(offset__gte=offset))
+        if offset and (not chunks or chunks[0].offset > offset):
+            previous = self.output_chunks.filter(offset__lt=offset).last()
+            if previous:
+                chunks.insert(0, previous)
+
+        if not chunks:
+            return self.output[offset:], max(offset, len(self.output))
+
+        start = chunks[0].offset
+        text = self.output[offset:start] + ''.join(chunk.text for chunk in chunks)[max(offset - start, 0):]
+        return text, chunks[-1].offset + len(chunks[-1].text)
+
 
 @python_2_unicode_compatible
 class UuidStrMixin(core_models.UuidMixin):
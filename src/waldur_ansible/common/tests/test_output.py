@@ -0,0 +1,64 @@
+from django.test import TestCase
+
+from waldur_ansible.common import models, utils
+from waldur_ansible.python_management.tests import factories
+
+
+class OutputBufferTest(TestCase):
+    def setUp(self):
+        self.request = factories.PythonManagementInitializeRequestFactory(output='')
+
+    def test_lines_are_flushed_when_buffer_size_is_exceeded(self):
+        output_buffer = utils.OutputBuffer(self.request, flush_size=10, flush_interval=60)
+        output_buffer.write('line 1\n')
+        self.assertEqual(self.request.output_chunks.count(), 0)
+
+        output_buffer.write('line 2\n')
+        self.assertEqual(list(self.request.output_chunks.values_list('offset', 'text')), [(0, 'line 1\nline 2\n')])
+
+    def test_lines_are_flushed_when_interval_is_exceeded(self):
+        output_buffer = utils.OutputBuffer(self.request, flush_size=1000, flush_interval=0)
+        output_buffer.write('line 1\n')
+        output_buffer.write('line 2\n')
+        self.assertEqual(list(self.request.output_chunks.values_list('offset', 'text')),
+                         [(0, 'line 1\n'), (7, 'line 2\n')])
+
+    def test_output_of_request_is_updated_when_lines_are_flushed(self):
+        output_buffer = utils.OutputBuffer(self.request, flush_size=10, flush_interval=60)
+        output_buffer.write('line 1\n')
+        output_buffer.write('line 2\n')
+        output_buffer.write('line 3\n')
+
+        self.request.refresh_from_db()
+        self.assertEqual(self.request.output, 'line 1\nline 2\n')
+
+    def test_output_is_saved_and_chunks_are_removed_when_buffer_is_closed(self):
+        with utils.OutputBuffer(self.request, flush_size=1, flush_interval=60) as output_buffer:
+            output_buffer.write('line 1\n')
+            output_buffer.write('line 2\n')
+
+        self.request.refresh_from_db()
+        self.assertEqual(self.request.output, 'line 1\nline 2\n')
+        self.assertFalse(models.OutputChunk.objects.exists())
+
+
+class OutputTailTest(TestCase):
+    def setUp(self):
+        self.request = factories.PythonManagementInitializeRequestFactory(output='')
+        self.output_buffer = utils.OutputBuffer(self.request, flush_size=1, flush_interval=60)
+        self.output_buffer.write('line 1\n')
+        self.output_buffer.write('line 2\n')
+
+    def test_output_is_returned_from_offset_of_chunk(self):
+        self.assertEqual(self.request.get_output_tail(7), ('line 2\n', 14))
+
+    def test_output_is_returned_from_offset_inside_of_chunk(self):
+        self.assertEqual(self.request.get_output_tail(3), ('e 1\nline 2\n', 14))
+
+    def test_empty_output_is_returned_if_there_is_no_new_output(self):
+        self.assertEqual(self.request.get_output_tail(14), ('', 14))
+
+    def test_offsets_are_preserved_when_output_is_stored(self):
+        self.output_buffer.close()
+        self.request.refresh_from_db()
+        self.assertEqual(self.request.get_output_tail(7), ('line 2\n', 14))
@@ -1,4 +1,10 @@
 import subprocess  # nosec
+import time
+
+from django.db import transaction
+from django.utils.encoding import force_text
+
+from . import models
 
 
 def subprocess_output_iterator(command, env, **kwargs):
@@ -9,3 +15,51 @@ def subprocess_output_iterator(command, env, **kwargs):
     return_code = process.wait()
     if return_code:
         raise subprocess.CalledProcessError(return_code, command)
+
+
+class OutputBuffer(object):
+    """
+    Collect output of request and flush it when buffer size or time since previous flush
+    exceeds threshold, so that request is not saved on each line of output.
+    Flushed text is appended to output of request, so that it is updated while request is processed,
+    and to output chunks, which allow to fetch only new output. Chunks are removed when buffer is closed.
+    """
+
+    def __init__(self, request, flush_size, flush_interval):
+        self.request = request
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.offset = len(request.output)
+        self.lines = []
+        self.pending_size = 0
+        self.flushed_at = time.time()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def write(self, line):
+        line = force_text(line)
+        self.lines.append(line)
+        self.pending_size += len(line)
+        if self.pending_size >= self.flush_size or time.time() - self.flushed_at >= self.flush_interval:
+            self.flush()
+
+    @transaction.atomic()
+    def flush(self):
+        text = ''.join(self.lines)
+        if text:
+            models.OutputChunk.objects.create(scope=self.request, offset=self.offset, text=text)
+            self.request.output += text
+            self.request.save(update_fields=['output'])
+            self.offset += len(text)
+        self.lines = []
+        self.pending_size = 0
+        self.flushed_at = time.time()
+
+    @transaction.atomic()
+    def close(self):
+        self.flush()
+        self.request.output_chunks.all().delete()
@@ -1,9 +1,12 @@
 import logging
 
+from django.http import Http404
 from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import decorators, response, serializers as rf_serializers
 from rest_framework.mixins import ListModelMixin
 from rest_framework.viewsets import GenericViewSet
 
+from waldur_core.core import managers as core_managers
 from waldur_core.structure import views as structure_views, filters as structure_filters
 
 from . import filters, managers, models, serializers
@@ -29,3 +32,28 @@ class ApplicationsSummaryViewSet(ListModelMixin, GenericViewSet):
 
     def get_queryset(self):
         return get_applications_queryset()
+
+
+class RequestOutputMixin(object):
+    """
+    Expose output of management request starting from given offset,
+    so that client may poll only new output while playbook is running.
+    """
+    request_models = NotImplemented
+    request_scope_field = NotImplemented
+
+    @decorators.detail_route(url_path='request_output/(?P<request_uuid>[a-f0-9]+)', methods=['get'])
+    def request_output(self, request, uuid=None, request_uuid=None):
+        offset = rf_serializers.IntegerField(min_value=0).run_validation(request.query_params.get('offset', 0))
+        requests = core_managers.SummaryQuerySet(self.request_models).filter(
+            uuid=request_uuid, **{self.request_scope_field: self.get_object()})[:1]
+        if not requests:
+            raise Http404()
+
+        management_request = requests[0]
+        output, next_offset = management_request.get_output_tail(offset)
+        return response.Response({
+            'output': output,
+            'offset': next_offset,
+            'state': management_request.human_readable_state,
+        })
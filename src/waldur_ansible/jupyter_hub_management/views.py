@@ -2,7 +2,7 @@ import logging
 
 from rest_framework import decorators, response
 
-from waldur_ansible.common import serializers as common_serializers
+from waldur_ansible.common import serializers as common_serializers, views as common_views
 from waldur_ansible.python_management import views as python_management_views
 from waldur_ansible.python_management import serializers as python_management_serializers
 
@@ -17,8 +17,10 @@ jupyter_hub_management_requests_models = [models.JupyterHubManagementSyncConfigu
 logger = logging.getLogger(__name__)
 
 
-class JupyterHubManagementViewSet(core_mixins.AsyncExecutor, core_views.ActionsViewSet):
+class JupyterHubManagementViewSet(core_mixins.AsyncExecutor, common_views.RequestOutputMixin, core_views.ActionsViewSet):
     lookup_field = 'uuid'
+    request_models = jupyter_hub_management_requests_models
+    request_scope_field = 'jupyter_hub_management'
     queryset = models.JupyterHubManagement.objects.all().order_by('pk')
     serializer_class = serializers.JupyterHubManagementSerializer
     python_management_request_executor = executors.JupyterHubManagementRequestExecutor
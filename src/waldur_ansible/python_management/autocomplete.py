@@ -0,0 +1,152 @@
+from __future__ import unicode_literals
+
+import array
+import bisect
+import collections
+import heapq
+import logging
+import threading
+
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION_CACHE_KEY = 'python_management:library_index_version'
+
+LibraryMatch = collections.namedtuple('LibraryMatch', ('name', 'uuid'))
+
+
+def get_trigrams(value):
+    value = '  %s ' % value
+    return set(value[i:i + 3] for i in range(len(value) - 2))
+
+
+class LibraryNameIndex(object):
+    """
+    In-memory index of cached PyPI library names.
+    Names are kept in an array sorted case-insensitively, so that prefix lookup is a binary search.
+    Matches are ordered by popularity, i.e. number of virtual environments where library is installed,
+    and then by name. Trigram index used for fuzzy matching is built on first fuzzy query.
+    """
+
+    def __init__(self, libraries, popularity=None):
+        """
+        :param libraries: iterable of (name, uuid) pairs
+        :param popularity: dict mapping lowercase library name to its popularity
+        """
+        popularity = popularity or {}
+        entries = sorted((name.lower(), name, uuid) for name, uuid in libraries)
+        self.keys = [entry[0] for entry in entries]
+        self.libraries = [LibraryMatch(entry[1], entry[2]) for entry in entries]
+        self.popularity = array.array(b'l', (popularity.get(key, 0) for key in self.keys))
+        # Positions of popular libraries are kept separately, because most libraries are never installed.
+        self.popular_positions = [position for position, value in enumerate(self.popularity) if value]
+        self._trigrams = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def search(self, query, limit=30, fuzzy=False):
+        matches = self.prefix_search(query, limit)
+        if fuzzy and len(matches) < limit:
+            found = set(match.name for match in matches)
+            for match in self.fuzzy_search(query, limit):
+                if match.name not in found and len(matches) < limit:
+                    matches.append(match)
+        return matches
+
+    def prefix_search(self, query, limit=30):
+        query = query.lower()
+        start = bisect.bisect_left(self.keys, query)
+        end = bisect.bisect_left(self.keys, query + '\uffff', lo=start)
+
+        popular_start = bisect.bisect_left(self.popular_positions, start)
+        popular_end = bisect.bisect_left(self.popular_positions, end, lo=popular_start)
+        positions = heapq.nsmallest(
+            limit,
+            self.popular_positions[popular_start:popular_end],
+            key=lambda position: (-self.popularity[position], position),
+        )
+
+        if len(positions) < limit:
+            selected = set(positions)
+            for position in range(start, end):
+                if position not in selected:
+                    positions.append(position)
+                    if len(positions) == limit:
+                        break
+
+        return [self.libraries[position] for position in positions]
+
+    def fuzzy_search(self, query, limit=30, threshold=0.3):
+        """
+        Find libraries which names share enough trigrams with query, so that misspelled names are matched too.
+        Similarity is the ratio of shared trigrams to all trigrams of query and name.
+        """
+        query_trigrams = get_trigrams(query.lower())
+        trigrams = self.get_trigram_index()
+
+        shared = collections.Counter()
+        for trigram in query_trigrams:
+            shared.update(trigrams.get(trigram, ()))
+
+        scores = []
+        for position, count in shared.items():
+            name_trigrams_count = len(self.keys[position]) + 1
+            similarity = float(count) / (len(query_trigrams) + name_trigrams_count - count)
+            if similarity >= threshold:
+                scores.append((similarity, self.popularity[position], -position))
+
+        best = heapq.nlargest(limit, scores)
+        return [self.libraries[-negative_position] for _, _, negative_position in best]
+
+    def get_trigram_index(self):
+        with self._lock:
+            if self._trigrams is None:
+                trigrams = {}
+                for position, key in enumerate(self.keys):
+                    for trigram in get_trigrams(key):
+                        positions = trigrams.get(trigram)
+                        if positions is None:
+                            positions = trigrams[trigram] = array.array(b'l')
+                        positions.append(position)
+                self._trigrams = trigrams
+            return self._trigrams
+
+
+def build_index():
+    libraries = models.CachedRepositoryPythonLibrary.objects.values_list('name', 'uuid').iterator()
+    popularity = collections.Counter()
+    installed = models.InstalledLibrary.objects.values('name').annotate(count=Count('virtual_environment', distinct=True))
+    for row in installed:
+        popularity[row['name'].lower()] += row['count']
+    return LibraryNameIndex(libraries, popularity)
+
+
+_index = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """
+    Index is built once per process and rebuilt when catalog synchronization bumps its version.
+    """
+    global _index, _index_version
+
+    version = cache.get(INDEX_VERSION_CACHE_KEY)
+    with _index_lock:
+        if _index is None or version != _index_version:
+            _index = build_index()
+            _index_version = version
+            logger.debug('Python library autocomplete index with %s names has been built.', len(_index))
+        return _index
+
+
+def invalidate_index():
+    cache.set(INDEX_VERSION_CACHE_KEY, timezone.now().isoformat(), None)
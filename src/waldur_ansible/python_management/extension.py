@@ -9,6 +9,17 @@ class PythonManagementExtension(WaldurExtension):
             'PYTHON_MANAGEMENT_PLAYBOOKS_DIRECTORY': '%swaldur-apps/python_management/' % AnsibleCommonExtension.Settings.WALDUR_ANSIBLE_COMMON['ANSIBLE_LIBRARY'],
             'SYNC_PIP_PACKAGES_TASK_ENABLED': False,
             'SYNC_PIP_PACKAGES_BATCH_SIZE': 300,
+            # Path to local file with names of packages, one per line. If it is not set, PyPI is used.
+            'SYNC_PIP_PACKAGES_FILE': None,
+            'PYPI_JSON_API_URL': 'https://pypi.python.org/pypi/%s/json',
+            'PYPI_TIMEOUT': 10,
+            # Releases of libraries are cached in seconds; missing libraries are cached for shorter time.
+            'PIP_VERSIONS_CACHE_TIMEOUT': 6 * 60 * 60,
+            'PIP_VERSIONS_NEGATIVE_CACHE_TIMEOUT': 10 * 60,
+            'PIP_VERSIONS_LOOKUP_WORKERS': 8,
+            # Path to local JSON file mapping library name to PyPI JSON API response.
+            # If it is set, PyPI is not queried at all, which is useful for air-gapped deployments.
+            'PIP_INDEX_FILE': None,
         }
 
     @staticmethod
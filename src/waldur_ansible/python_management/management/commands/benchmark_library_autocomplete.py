@@ -0,0 +1,79 @@
+from __future__ import unicode_literals
+
+import random
+import string
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from waldur_ansible.python_management import autocomplete, models
+
+
+class Command(BaseCommand):
+    help = ('Measure latency of Python library name autocomplete. '
+            'Cached PyPI catalog is used unless synthetic catalog size is specified.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--synthetic', type=int, default=0,
+                            help='Number of random library names to use instead of cached catalog.')
+        parser.add_argument('--queries', type=int, default=1000,
+                            help='Number of queries per query type.')
+
+    def handle(self, *args, **options):
+        if options['synthetic']:
+            names = self.generate_names(options['synthetic'])
+            start = time.time()
+            index = autocomplete.LibraryNameIndex((name, uuid.uuid4()) for name in names)
+        else:
+            names = list(models.CachedRepositoryPythonLibrary.objects.values_list('name', flat=True))
+            start = time.time()
+            index = autocomplete.build_index()
+        self.stdout.write('Index of %s names is built in %.3f seconds' % (len(index), time.time() - start))
+
+        start = time.time()
+        index.get_trigram_index()
+        self.stdout.write('Trigram index is built in %.3f seconds' % (time.time() - start))
+
+        if not names:
+            return
+
+        for prefix_length in (1, 2, 4):
+            queries = [random.choice(names)[:prefix_length] for _ in range(options['queries'])]  # nosec
+            self.measure('Prefix of %s characters' % prefix_length, queries, index.prefix_search)
+
+        queries = [self.misspell(random.choice(names)) for _ in range(options['queries'])]  # nosec
+        self.measure('Fuzzy', queries, lambda query: index.search(query, fuzzy=True))
+
+        if not options['synthetic']:
+            queries = [random.choice(names)[:2] for _ in range(min(options['queries'], 100))]  # nosec
+            self.measure('Database prefix of 2 characters', queries, self.database_search)
+
+    def measure(self, title, queries, search):
+        timings = []
+        for query in queries:
+            start = time.time()
+            search(query)
+            timings.append((time.time() - start) * 1000)
+        timings.sort()
+        self.stdout.write('%s: median %.3f ms, p95 %.3f ms, max %.3f ms' % (
+            title, timings[len(timings) // 2], timings[int(len(timings) * 0.95)], timings[-1]))
+
+    def database_search(self, query):
+        list(models.CachedRepositoryPythonLibrary.objects.filter(name__startswith=query).order_by('name')[0:30])
+        connection.queries_log.clear()
+
+    def misspell(self, name):
+        if len(name) < 4:
+            return name
+        position = random.randrange(1, len(name) - 1)  # nosec
+        return name[:position] + name[position + 1:]
+
+    def generate_names(self, count):
+        alphabet = string.ascii_lowercase + '-'
+        return [
+            random.choice(string.ascii_lowercase) + ''.join(  # nosec
+                random.choice(alphabet) for _ in range(random.randint(3, 15)))  # nosec
+            for _ in range(count)
+        ]
@@ -1,29 +1,155 @@
+import json
+import logging
+from multiprocessing.pool import ThreadPool
 import string
 
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.lru_cache import lru_cache
+from django.utils.translation import ugettext_lazy as _
 import requests
+from rest_framework import status
+from rest_framework.exceptions import APIException
 
-from . import models
+from . import autocomplete
+
+logger = logging.getLogger(__name__)
+
+WRONG_OS_VERSIONS = ['win', 'mac']
+
+# Marker stored in cache for libraries which do not exist in the index.
+MISSING_LIBRARY = 'missing'
+
+
+class PyPIUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Python package index is not available.')
 
 
 def find_versions(queried_library_name, python_version):
-    lib_info = requests.get("https://pypi.python.org/pypi/%s/json" % queried_library_name).json()
+    return find_versions_batch([queried_library_name], python_version)[queried_library_name]
+
 
-    wrong_os_versions = ["win", "mac"]
+def find_versions_batch(library_names, python_version):
+    """
+    Return dict mapping library name to its versions suitable for given Python version.
+    Versions are ordered by upload date, newest first. Unknown libraries have no versions.
+    PyPIUnavailable is raised if versions could not be fetched.
+    """
     python_versions = build_version_criteria(python_version)
-    version_upload_date_pairs = []
+    releases = get_releases(library_names)
+    return {
+        library_name: filter_versions(releases.get(library_name), python_versions)
+        for library_name in library_names
+    }
 
-    for release_version, release_info in lib_info['releases'].viewitems():
-        for platform_version in release_info:
-            if not contains_any_string(platform_version['filename'], wrong_os_versions) and\
-                    (contains_any_string(platform_version['python_version'], python_versions) or
-                     version_not_specified(platform_version['filename'])):
-                version_upload_date_pairs.append(dict(version=release_version, upload_date=platform_version['upload_time']))
+
+def filter_versions(releases, python_versions):
+    if not releases:
+        return []
+
+    version_upload_date_pairs = []
+    for release_version, files in releases:
+        for filename, file_python_version, upload_time in files:
+            if contains_any_string(file_python_version, python_versions) or version_not_specified(filename):
+                version_upload_date_pairs.append(dict(version=release_version, upload_date=upload_time))
                 break
 
     version_upload_date_pairs.sort(reverse=True, key=lambda pair: pair['upload_date'])
     return map(lambda pair: pair['version'], version_upload_date_pairs)
 
 
+def get_releases(library_names):
+    """
+    Releases are looked up in local index file if it is configured. Otherwise, they are served
+    from cache and cache misses are fetched from PyPI concurrently. Missing libraries are cached too,
+    but for a shorter time, so that typos are not queried again on each keystroke.
+    """
+    options = settings.WALDUR_PYTHON_MANAGEMENT
+    index_file = options.get('PIP_INDEX_FILE')
+    if index_file:
+        index = load_index_file(index_file)
+        return {library_name: compact_releases(index.get(library_name)) for library_name in library_names}
+
+    keys = {get_releases_cache_key(library_name): library_name for library_name in set(library_names)}
+    cached = cache.get_many(keys.keys())
+    result = {keys[key]: releases for key, releases in cached.items() if releases != MISSING_LIBRARY}
+
+    missing_names = [library_name for key, library_name in keys.items() if key not in cached]
+    if not missing_names:
+        return result
+
+    pool = ThreadPool(processes=min(len(missing_names), options.get('PIP_VERSIONS_LOOKUP_WORKERS', 8)))
+    try:
+        fetched = pool.map(fetch_releases, missing_names)
+    finally:
+        pool.close()
+
+    found = {}
+    not_found = {}
+    for library_name, releases in zip(missing_names, fetched):
+        if releases is not None:
+            found[get_releases_cache_key(library_name)] = releases
+            result[library_name] = releases
+        else:
+            not_found[get_releases_cache_key(library_name)] = MISSING_LIBRARY
+
+    cache.set_many(found, options.get('PIP_VERSIONS_CACHE_TIMEOUT', 6 * 60 * 60))
+    cache.set_many(not_found, options.get('PIP_VERSIONS_NEGATIVE_CACHE_TIMEOUT', 10 * 60))
+    return result
+
+
+def get_releases_cache_key(library_name):
+    return 'python_management:pip_releases:%s' % library_name.lower()
+
+
+def fetch_releases(library_name):
+    """
+    :return: compact releases or None if library does not exist.
+    Errors are not masked as missing library, so that they are not cached and reported to user.
+    """
+    url = settings.WALDUR_PYTHON_MANAGEMENT.get('PYPI_JSON_API_URL', 'https://pypi.python.org/pypi/%s/json')
+    try:
+        response = requests.get(url % library_name, timeout=settings.WALDUR_PYTHON_MANAGEMENT.get('PYPI_TIMEOUT', 10))
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return compact_releases(response.json())
+    except (requests.RequestException, ValueError):
+        logger.exception('Unable to fetch releases of Python library %s.', library_name)
+        raise PyPIUnavailable()
+
+
+def compact_releases(lib_info):
+    """
+    Keep only fields used to filter versions and skip files built for Windows and macOS,
+    so that cached value is small.
+    :return: list of (version, [(filename, python_version, upload_time)]) pairs
+    """
+    if not lib_info:
+        return None
+
+    releases = []
+    for release_version, release_info in lib_info['releases'].viewitems():
+        files = [
+            (platform_version['filename'], platform_version['python_version'], platform_version['upload_time'])
+            for platform_version in release_info
+            if not contains_any_string(platform_version['filename'], WRONG_OS_VERSIONS)
+        ]
+        if files:
+            releases.append((release_version, files))
+    return releases
+
+
+@lru_cache()
+def load_index_file(path):
+    """
+    Local index file contains JSON object mapping library name to the PyPI JSON API response.
+    """
+    with open(path) as index_file:
+        return json.load(index_file)
+
+
 def build_version_criteria(python_version):
     if python_version != '3':
         required_version = python_version[0:find_nth(python_version, '.', 2)]
@@ -52,5 +178,5 @@ def contains_any_string(target_string, strings):
     return False
 
 
-def autocomplete_library_name(queried_library_name):
-    return models.CachedRepositoryPythonLibrary.objects.filter(name__startswith=queried_library_name).order_by('name')[0:30]
+def autocomplete_library_name(queried_library_name, fuzzy=False):
+    return autocomplete.get_index().search(queried_library_name, limit=30, fuzzy=fuzzy)
@@ -1,3 +1,4 @@
+import io
 import logging
 # patched with xmlrpc.monkey_patch() below
 import xmlrpclib  # nosec
@@ -5,9 +6,11 @@ import xmlrpclib  # nosec
 from celery import shared_task
 from defusedxml import xmlrpc
 from django.conf import settings
-from django.core.validators import MaxValueValidator
+from django.db import transaction
 
-from . import models
+from waldur_core.core import utils as core_utils
+
+from . import autocomplete, models
 
 xmlrpc.monkey_patch()
 logger = logging.getLogger(__name__)
@@ -38,36 +41,54 @@ def _sync_pip_libraries():
     This task is called asynchronously by Celery beat schedule.
     """
     logger.info('Started synching PIP packages.')
-    client = xmlrpclib.ServerProxy('https://pypi.python.org/pypi')
-    actual_repository_packages = client.list_packages()
-    previously_cached_packages = models.CachedRepositoryPythonLibrary.objects.values_list('name', flat=True)
+    created_count, deleted_count = sync_cached_libraries(fetch_repository_packages())
+    logger.info('Finished synching PIP packages. Created: %s, deleted: %s.', created_count, deleted_count)
 
-    delete_removed_libraries(actual_repository_packages, previously_cached_packages)
 
-    persist_new_libraries(actual_repository_packages, previously_cached_packages)
+def fetch_repository_packages():
+    """
+    Names of packages are read from local file, one per line, if it is configured.
+    Otherwise they are fetched from PyPI.
+    """
+    packages_file = settings.WALDUR_PYTHON_MANAGEMENT.get('SYNC_PIP_PACKAGES_FILE')
+    if packages_file:
+        with io.open(packages_file, encoding='utf-8') as packages:
+            return [line.strip() for line in packages if line.strip()]
+
+    client = xmlrpclib.ServerProxy('https://pypi.python.org/pypi')
+    return client.list_packages()
+
 
+@transaction.atomic()
+def sync_cached_libraries(actual_repository_packages):
+    """
+    Inserts and deletes are computed as set differences between actual and cached names,
+    so that each name is checked in constant time, and applied in bulk batches.
+    """
+    batch_size = settings.WALDUR_PYTHON_MANAGEMENT.get('SYNC_PIP_PACKAGES_BATCH_SIZE')
+    max_length = models.CachedRepositoryPythonLibrary._meta.get_field('name').max_length
 
-def persist_new_libraries(actual_repository_packages, previously_cached_packages):
-    current_batch = []
+    actual_names = set()
     for library_name in actual_repository_packages:
-        if library_name not in previously_cached_packages:
-            if len(current_batch) == settings.WALDUR_PYTHON_MANAGEMENT.get('SYNC_PIP_PACKAGES_BATCH_SIZE'):
-                try:
-                    models.CachedRepositoryPythonLibrary.objects.bulk_create(current_batch)
-                except MaxValueValidator:
-                    logger.exception('Pip backend could not save "%s" python library: name is too long.', library_name)
-                current_batch = []
-
-            current_batch.append(models.CachedRepositoryPythonLibrary(name=library_name))
-
-    if current_batch:
-        models.CachedRepositoryPythonLibrary.objects.bulk_create(current_batch)
-
-
-def delete_removed_libraries(actual_repository_packages, previously_cached_packages):
-    library_names_to_delete = []
-    for previously_cached_package in previously_cached_packages:
-        if previously_cached_package not in actual_repository_packages:
-            library_names_to_delete.append(previously_cached_package)
-    if library_names_to_delete:
-        models.CachedRepositoryPythonLibrary.objects.filter(name__in=library_names_to_delete).delete()
+        if len(library_name) > max_length:
+            logger.warning('Pip backend could not save "%s" python library: name is too long.', library_name)
+            continue
+        actual_names.add(library_name)
+
+    cached_names = set(models.CachedRepositoryPythonLibrary.objects.values_list('name', flat=True))
+    names_to_delete = sorted(cached_names - actual_names)
+    names_to_create = sorted(actual_names - cached_names)
+
+    for batch in core_utils.chunked(names_to_delete, batch_size):
+        models.CachedRepositoryPythonLibrary.objects.filter(name__in=batch).delete()
+
+    for batch in core_utils.chunked(names_to_create, batch_size):
+        models.CachedRepositoryPythonLibrary.objects.bulk_create([
+            models.CachedRepositoryPythonLibrary(name=library_name)
+            for library_name in batch
+        ])
+
+    if names_to_create or names_to_delete:
+        transaction.on_commit(autocomplete.invalidate_index)
+
+    return len(names_to_create), len(names_to_delete)
@@ -65,3 +65,10 @@ class InstalledLibraryFactory(factory.DjangoModelFactory):
 
     virtual_environment = factory.SubFactory(VirtualEnvironmentFactory)
     version = factory.Sequence(lambda n: 'version%s' % n)
+
+
+class CachedRepositoryPythonLibraryFactory(factory.DjangoModelFactory):
+    class Meta(object):
+        model = models.CachedRepositoryPythonLibrary
+
+    name = factory.Sequence(lambda n: 'library%s' % n)
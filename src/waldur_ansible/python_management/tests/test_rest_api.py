@@ -59,3 +59,24 @@ class PythonManagementCreateTest(PythonManagementBaseTest):
         response = self.client.post(factories.PythonManagementFactory.get_list_url(), data=payload)
 
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class PythonManagementRequestOutputTest(PythonManagementBaseTest):
+    def setUp(self):
+        super(PythonManagementRequestOutputTest, self).setUp()
+        self.management_request = factories.PythonManagementInitializeRequestFactory(
+            python_management=self.python_management, output='line 1\nline 2\n')
+        self.url = factories.PythonManagementFactory.get_url(
+            self.python_management, 'request_output/%s' % self.management_request.uuid.hex)
+
+    def test_output_is_returned_from_offset(self):
+        self.client.force_authenticate(self.fixture.staff)
+        response = self.client.get(self.url, {'offset': 7})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['output'], 'line 2\n')
+        self.assertEqual(response.data['offset'], 14)
+
+    def test_negative_offset_is_not_accepted(self):
+        self.client.force_authenticate(self.fixture.staff)
+        response = self.client.get(self.url, {'offset': -1})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,48 @@
+import uuid
+
+from django.test import TestCase
+
+from waldur_ansible.python_management import autocomplete, pip_service
+from waldur_ansible.python_management.tests import factories
+
+LIBRARIES = ['Django', 'django-filter', 'django-fsm', 'djangorestframework', 'numpy', 'requests', 'six']
+
+
+class LibraryNameIndexTest(TestCase):
+    def setUp(self):
+        self.index = autocomplete.LibraryNameIndex(
+            [(name, uuid.uuid4()) for name in LIBRARIES],
+            popularity={'django-fsm': 2, 'djangorestframework': 5},
+        )
+
+    def get_names(self, matches):
+        return [match.name for match in matches]
+
+    def test_prefix_matches_are_ordered_by_popularity_and_name(self):
+        self.assertEqual(self.get_names(self.index.prefix_search('djan')),
+                         ['djangorestframework', 'django-fsm', 'Django', 'django-filter'])
+
+    def test_prefix_search_is_case_insensitive(self):
+        self.assertEqual(self.get_names(self.index.prefix_search('NUM')), ['numpy'])
+
+    def test_number_of_matches_is_limited(self):
+        self.assertEqual(self.get_names(self.index.prefix_search('d', limit=2)),
+                         ['djangorestframework', 'django-fsm'])
+
+    def test_fuzzy_search_matches_misspelled_name(self):
+        self.assertEqual(self.get_names(self.index.search('reqests', fuzzy=True)), ['requests'])
+
+    def test_fuzzy_search_is_not_used_by_default(self):
+        self.assertEqual(self.index.search('reqests'), [])
+
+
+class AutocompleteLibraryNameTest(TestCase):
+    def test_index_is_rebuilt_when_it_is_invalidated(self):
+        factories.InstalledLibraryFactory(name='numpy')
+        autocomplete.invalidate_index()
+        self.assertEqual(pip_service.autocomplete_library_name('num'), [])
+
+        library = factories.CachedRepositoryPythonLibraryFactory(name='numpy')
+        autocomplete.invalidate_index()
+        self.assertEqual(pip_service.autocomplete_library_name('num'),
+                         [autocomplete.LibraryMatch('numpy', library.uuid)])
@@ -0,0 +1,68 @@
+import json
+import os
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+import mock
+import requests
+
+from waldur_ansible.python_management import pip_service
+
+INDEX_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'pypi_index.json')
+
+
+@override_settings(WALDUR_PYTHON_MANAGEMENT={'PIP_INDEX_FILE': INDEX_FILE})
+class OfflineVersionsTest(TestCase):
+    def test_versions_are_ordered_by_upload_date(self):
+        self.assertEqual(pip_service.find_versions('six', '3'), ['1.11.0', '1.10.0'])
+
+    def test_versions_are_filtered_by_python_version(self):
+        self.assertEqual(pip_service.find_versions('numpy', '2.7.12'), ['1.15.0'])
+        self.assertEqual(pip_service.find_versions('numpy', '3.6.5'), ['1.16.0', '1.15.0'])
+
+    def test_unknown_library_has_no_versions(self):
+        self.assertEqual(pip_service.find_versions('unknown', '3'), [])
+
+
+@override_settings(WALDUR_PYTHON_MANAGEMENT={'PIP_VERSIONS_LOOKUP_WORKERS': 2})
+class CachedVersionsTest(TestCase):
+    def setUp(self):
+        with open(INDEX_FILE) as index_file:
+            self.index = json.load(index_file)
+        for library_name in ('six', 'numpy', 'unknown'):
+            cache.delete(pip_service.get_releases_cache_key(library_name))
+
+        patcher = mock.patch('waldur_ansible.python_management.pip_service.requests.get')
+        self.mocked_get = patcher.start()
+        self.mocked_get.side_effect = self.get_response
+        self.addCleanup(patcher.stop)
+
+    def get_response(self, url, **kwargs):
+        library_name = url.split('/')[-2]
+        response = mock.Mock()
+        response.status_code = 200 if library_name in self.index else 404
+        response.json.return_value = self.index.get(library_name)
+        return response
+
+    def test_versions_of_several_libraries_are_resolved_in_batch(self):
+        versions = pip_service.find_versions_batch(['six', 'numpy', 'unknown'], '2.7.12')
+        self.assertEqual(versions, {'six': ['1.10.0'], 'numpy': ['1.15.0'], 'unknown': []})
+        self.assertEqual(self.mocked_get.call_count, 3)
+
+    def test_releases_are_fetched_only_once(self):
+        pip_service.find_versions('six', '2.7.12')
+        self.assertEqual(pip_service.find_versions('six', '3'), ['1.11.0', '1.10.0'])
+        self.assertEqual(self.mocked_get.call_count, 1)
+
+    def test_missing_library_is_cached(self):
+        pip_service.find_versions('unknown', '3')
+        pip_service.find_versions('unknown', '3')
+        self.assertEqual(self.mocked_get.call_count, 1)
+
+    def test_error_is_raised_and_not_cached_if_pypi_is_not_available(self):
+        self.mocked_get.side_effect = requests.ConnectionError()
+        with self.assertRaises(pip_service.PyPIUnavailable):
+            pip_service.find_versions('six', '3')
+
+        self.mocked_get.side_effect = self.get_response
+        self.assertEqual(pip_service.find_versions('six', '3'), ['1.11.0', '1.10.0'])
@@ -0,0 +1,37 @@
+import os
+
+from django.test import TestCase, override_settings
+
+from waldur_ansible.python_management import models, tasks
+
+PACKAGES_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'pypi_packages.txt')
+
+
+@override_settings(WALDUR_PYTHON_MANAGEMENT={
+    'SYNC_PIP_PACKAGES_BATCH_SIZE': 2,
+    'SYNC_PIP_PACKAGES_FILE': PACKAGES_FILE,
+})
+class SyncPipLibrariesTest(TestCase):
+    def get_cached_names(self):
+        return set(models.CachedRepositoryPythonLibrary.objects.values_list('name', flat=True))
+
+    def test_packages_are_loaded_from_local_file(self):
+        tasks._sync_pip_libraries()
+        self.assertEqual(self.get_cached_names(), {'Django', 'djangorestframework', 'numpy', 'requests', 'six'})
+
+    def test_new_packages_are_created_and_removed_packages_are_deleted(self):
+        models.CachedRepositoryPythonLibrary.objects.create(name='numpy')
+        models.CachedRepositoryPythonLibrary.objects.create(name='removed-package')
+
+        created_count, deleted_count = tasks.sync_cached_libraries(tasks.fetch_repository_packages())
+
+        self.assertEqual((created_count, deleted_count), (4, 1))
+        self.assertEqual(self.get_cached_names(), {'Django', 'djangorestframework', 'numpy', 'requests', 'six'})
+
+    def test_repeated_synchronization_does_not_change_anything(self):
+        tasks._sync_pip_libraries()
+        self.assertEqual(tasks.sync_cached_libraries(tasks.fetch_repository_packages()), (0, 0))
+
+    def test_too_long_names_are_skipped(self):
+        tasks.sync_cached_libraries(['a' * 256, 'six'])
+        self.assertEqual(self.get_cached_names(), {'six'})
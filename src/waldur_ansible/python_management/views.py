@@ -4,7 +4,7 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import decorators, response
 from rest_framework.viewsets import GenericViewSet
 
-from waldur_ansible.common import serializers as common_serializers
+from waldur_ansible.common import serializers as common_serializers, views as common_views
 from waldur_ansible.jupyter_hub_management import models as jupyter_hub_models
 
 from waldur_core.core import views as core_views, managers as core_managers, mixins as core_mixins
@@ -21,8 +21,10 @@ python_management_requests_models = [models.PythonManagementInitializeRequest,
 logger = logging.getLogger(__name__)
 
 
-class PythonManagementViewSet(core_mixins.AsyncExecutor, core_views.ActionsViewSet):
+class PythonManagementViewSet(core_mixins.AsyncExecutor, common_views.RequestOutputMixin, core_views.ActionsViewSet):
     lookup_field = 'uuid'
+    request_models = python_management_requests_models
+    request_scope_field = 'python_management'
     queryset = models.PythonManagement.objects.all().order_by('pk')
     serializer_class = serializers.PythonManagementSerializer
     python_management_request_executor = executors.PythonManagementRequestExecutor
@@ -121,9 +123,17 @@ class PipPackagesViewSet(GenericViewSet):
 
         return response.Response({'versions': versions})
 
+    @decorators.list_route(url_path="find_libraries_versions/(?P<python_version>[^/]+)", methods=['get'])
+    def find_libraries_versions(self, request, python_version=None):
+        library_names = request.query_params.getlist('name')
+        versions = pip_service.find_versions_batch(library_names, python_version)
+
+        return response.Response({'versions': versions})
+
     @decorators.list_route(url_path="autocomplete_library/(?P<queried_library_name>.+)", methods=['get'])
     def autocomplete_library_name(self, request, queried_library_name=None):
-        matching_libraries = pip_service.autocomplete_library_name(queried_library_name)
+        fuzzy = request.query_params.get('fuzzy') in ('true', 'True', '1')
+        matching_libraries = pip_service.autocomplete_library_name(queried_library_name, fuzzy)
         serializer = serializers.CachedRepositoryPythonLibrarySerializer(matching_libraries, many=True)
 
         return response.Response(serializer.data)
@@ -13,6 +13,7 @@ class AzureConfig(AppConfig):
         from backend import AzureBackend
         SupportedServices.register_backend(AzureBackend)
 
+        from waldur_core.core import signals as core_signals
         from waldur_azure import models, handlers
 
         signals.post_save.connect(
@@ -20,3 +21,9 @@ class AzureConfig(AppConfig):
             sender=models.AzureServiceProjectLink,
             dispatch_uid='waldur_azure.handlers.copy_cloud_service_name_on_service_creation',
         )
+
+        core_signals.bulk_synchronized.connect(
+            handlers.copy_cloud_service_name_on_bulk_service_creation,
+            sender=models.AzureServiceProjectLink,
+            dispatch_uid='waldur_azure.handlers.copy_cloud_service_name_on_bulk_service_creation',
+        )
@@ -10,3 +10,8 @@ def copy_cloud_service_name_on_service_creation(sender, instance, created=False,
     cloud_service_name = service_project_link.service.settings.options['cloud_service_name']
     instance.cloud_service_name = cloud_service_name
     instance.save()
+
+
+def copy_cloud_service_name_on_bulk_service_creation(sender, created, **kwargs):
+    for service_project_link in created:
+        copy_cloud_service_name_on_service_creation(sender, service_project_link, created=True)
@@ -6,3 +6,7 @@ pre_serializer_fields = django.dispatch.Signal(providing_args=['fields'])
 # This signal allows to implement deletion validation in dependent
 # application without introducing circular dependency
 pre_delete_validate = django.dispatch.Signal(providing_args=['instance', 'user'])
+
+# This signal is sent once per bulk synchronization of model rows
+# instead of post_save and post_delete signals for each row
+bulk_synchronized = django.dispatch.Signal(providing_args=['created', 'updated', 'deleted'])
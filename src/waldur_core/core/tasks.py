@@ -498,10 +498,10 @@ class PollBackendCheckTask(Task):
     def get_backend(self, instance):
         return instance.get_backend()
 
-    def execute(self, instance, backend_check_method):
+    def execute(self, instance, backend_check_method, *args, **kwargs):
         # backend_check_method should return True if object does not exist at backend
         backend = self.get_backend(instance)
-        if not getattr(backend, backend_check_method)(instance):
+        if not getattr(backend, backend_check_method)(instance, *args, **kwargs):
             self.retry()
         return instance
 
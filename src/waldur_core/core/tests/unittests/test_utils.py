@@ -37,3 +37,50 @@ class TestFormatTimeAndValueToSegmentList(unittest.TestCase):
         expected_second_segment_value = sum([value for _, value in second_segment_time_value_list])
         self.assertEqual(first_segment['value'], expected_first_segment_value)
         self.assertEqual(second_segment['value'], expected_second_segment_value)
+
+    def test_function_averages_values_in_segments(self):
+        segment_list = utils.format_time_and_value_to_segment_list(
+            [(22, 1), (23, 3), (45, 4)], 2, 20, 60, average=True)
+        self.assertEqual([segment['value'] for segment in segment_list], [2, 4])
+
+
+class TestAggregateSegments(unittest.TestCase):
+    def setUp(self):
+        self.times = [1, 2, 5, 6, 7, 12]
+        self.values = [4, 1, 9, 3, 5, 2]
+        self.edges = [0, 4, 8, 10, 14]
+
+    def aggregate(self, method, closed='left'):
+        result, counts = utils.aggregate_segments(self.times, self.values, self.edges, method, closed)
+        return result.tolist(), counts.tolist()
+
+    def test_values_are_summed(self):
+        self.assertEqual(self.aggregate('sum'), ([5, 17, 0, 2], [2, 3, 0, 1]))
+
+    def test_minimum_and_maximum_skip_empty_segments(self):
+        self.assertEqual(self.aggregate('min')[0], [1, 3, 0, 2])
+        self.assertEqual(self.aggregate('max')[0], [4, 9, 0, 2])
+
+    def test_average_and_last_value(self):
+        self.assertEqual(self.aggregate('avg')[0], [2.5, 17 / 3.0, 0, 2])
+        self.assertEqual(self.aggregate('last')[0], [1, 5, 0, 2])
+
+    def test_segments_closed_on_the_right_include_end(self):
+        self.edges = [0, 2, 7]
+        self.assertEqual(self.aggregate('sum', closed='right'), ([5, 17], [2, 3]))
+
+    def test_invalid_method_is_rejected(self):
+        self.assertRaises(ValueError, self.aggregate, 'median')
+
+
+class TestConcurrentMap(unittest.TestCase):
+    def test_results_are_returned_in_order_of_items(self):
+        self.assertEqual(utils.concurrent_map(lambda x: x * 2, range(10), workers=4), list(range(0, 20, 2)))
+
+    def test_exception_is_propagated(self):
+        def func(x):
+            if x == 3:
+                raise ValueError()
+            return x
+
+        self.assertRaises(ValueError, utils.concurrent_map, func, range(5), 2)
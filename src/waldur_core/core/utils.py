@@ -3,6 +3,7 @@ from collections import OrderedDict
 import datetime
 import importlib
 from itertools import chain
+from multiprocessing.pool import ThreadPool
 from operator import itemgetter
 import os
 import re
@@ -13,7 +14,9 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.mail import send_mail
 from django.core.management import call_command
-from django.db.models import F
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Cast
 from django.db.models.sql.query import get_order_dir
 from django.http import QueryDict
 from django.template.loader import render_to_string
@@ -21,8 +24,11 @@ from django.urls import resolve
 from django.utils import timezone
 from django.utils.crypto import get_random_string
 from django.utils.encoding import force_text
+import numpy as np
 from rest_framework.settings import api_settings
 
+from waldur_core.core import signals as core_signals
+
 
 def flatten(*xs):
     return tuple(chain.from_iterable(xs))
@@ -47,7 +53,6 @@ def format_time_and_value_to_segment_list(time_and_value_list, segments_count, s
     Parameters
     ^^^^^^^^^^
     time_and_value_list: list of tuples
-        Have to be sorted by time
         Example: [(time, value), (time, value) ...]
     segments_count: integer
         How many segments will be in result
@@ -57,26 +62,71 @@ def format_time_and_value_to_segment_list(time_and_value_list, segments_count, s
         Example:
         [{'from': time1, 'to': time2, 'value': sum_of_values_from_time1_to_time2}, ...]
     """
-    segment_list = []
     time_step = (end_timestamp - start_timestamp) / segments_count
+    edges = [start_timestamp + time_step * i for i in range(segments_count + 1)]
+
+    time_and_value_list = sorted(time_and_value_list, key=itemgetter(0))
+    times = np.array([time for time, _ in time_and_value_list])
+    values = np.array([value for _, value in time_and_value_list])
+    if not len(values):
+        # Keep integer zeros for empty segments
+        values = values.astype(int)
+    sums, counts = aggregate_segments(times, values, edges, method='sum')
+
+    segment_list = []
     for i in range(segments_count):
-        segment_start_timestamp = start_timestamp + time_step * i
-        segment_end_timestamp = segment_start_timestamp + time_step
-        value_list = [
-            value for time, value in time_and_value_list
-            if time >= segment_start_timestamp and time < segment_end_timestamp]
-        segment_value = sum(value_list)
-        if average and len(value_list) != 0:
-            segment_value /= len(value_list)
+        segment_value = sums[i].item()
+        if average and counts[i] != 0:
+            segment_value /= counts[i].item()
 
         segment_list.append({
-            'from': segment_start_timestamp,
-            'to': segment_end_timestamp,
+            'from': edges[i],
+            'to': edges[i] + time_step,
             'value': segment_value,
         })
     return segment_list
 
 
+def get_segment_bounds(times, edges, closed='left'):
+    """
+    Locate segments in sorted array of times using binary search.
+    Segment i is [edges[i], edges[i + 1]) if closed is 'left' and (edges[i], edges[i + 1]] if it is 'right'.
+    Returns arrays of start and end positions, so that segment i contains times[starts[i]:ends[i]].
+    """
+    positions = np.searchsorted(times, edges, side=closed == 'left' and 'left' or 'right')
+    return positions[:-1], positions[1:]
+
+
+def aggregate_segments(times, values, edges, method='sum', closed='left'):
+    """
+    Aggregate values within each segment in vectorized form.
+    Times have to be sorted, values are aligned with times.
+    Supported methods are sum, avg, min, max and last.
+    Returns arrays of aggregated values and of number of values in each segment.
+    Aggregated value of empty segment is zero, so that counts should be used to distinguish them.
+    """
+    times = np.asarray(times)
+    values = np.asarray(values)
+    starts, ends = get_segment_bounds(times, edges, closed)
+    counts = ends - starts
+    if method not in ('sum', 'avg', 'min', 'max', 'last'):
+        raise ValueError('Unsupported aggregation method %s.' % method)
+
+    result = np.zeros(len(counts), dtype=values.dtype)
+    non_empty = counts > 0
+    if non_empty.any():
+        if method == 'last':
+            result[non_empty] = values[ends[non_empty] - 1]
+        else:
+            ufunc = {'min': np.minimum, 'max': np.maximum}.get(method, np.add)
+            # Segments are adjacent, so that each non-empty segment is reduced up to the next one.
+            result[non_empty] = ufunc.reduceat(values[:ends[-1]], starts[non_empty])
+
+    if method == 'avg':
+        result = np.true_divide(result, np.maximum(counts, 1))
+    return result, counts
+
+
 def datetime_to_timestamp(datetime):
     return int(time.mktime(datetime.timetuple()))
 
@@ -267,3 +317,161 @@ def order_with_nulls(queryset, field):
         return queryset.order_by(F(col).desc(nulls_last=True))
     else:
         return queryset.order_by(F(col).asc(nulls_first=True))
+
+
+def chunked(iterable, size):
+    """
+    Split iterable into lists of given size. Last list may be shorter.
+    """
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def concurrent_map(func, items, workers):
+    """
+    Apply function to each item using bounded pool of threads.
+    Results are returned in the same order as items, the first raised exception is propagated.
+    Function is expected not to access database, because each thread would open its own connection.
+    """
+    items = list(items)
+    if workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    pool = ThreadPool(min(workers, len(items)))
+    try:
+        return pool.map(func, items)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def bulk_upsert(model, objects, key_fields, update_fields, batch_size=500):
+    """
+    Create missing rows and update changed rows using constant number of queries per batch.
+    Rows are matched by key fields which are expected to be covered by unique constraint.
+    Unchanged rows are not written at all, therefore repeated call with the same objects is no-op.
+    Note that model signals are not sent.
+
+    Returns tuple with lists of created and updated objects.
+    """
+    created = []
+    updated = []
+    for batch in chunked(objects, batch_size):
+        batch_created, batch_updated = _upsert_batch(model, batch, key_fields, update_fields)
+        created.extend(batch_created)
+        updated.extend(batch_updated)
+    return created, updated
+
+
+def _upsert_batch(model, objects, key_fields, update_fields, retry=True):
+    def get_key(obj):
+        return tuple(getattr(obj, field) for field in key_fields)
+
+    # If the same key is provided several times, the last object wins.
+    objects = OrderedDict((get_key(obj), obj) for obj in objects)
+
+    lookup = {
+        '%s__in' % field: set(key[index] for key in objects.keys())
+        for index, field in enumerate(key_fields)
+    }
+    existing_rows = {get_key(row): row for row in model.objects.filter(**lookup)}
+
+    to_create = []
+    to_update = []
+    for key, obj in objects.items():
+        row = existing_rows.get(key)
+        if row is None:
+            to_create.append(obj)
+        elif any(getattr(row, field) != getattr(obj, field) for field in update_fields):
+            obj.pk = row.pk
+            to_update.append(obj)
+
+    if to_create:
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(to_create)
+        except IntegrityError:
+            if not retry:
+                raise
+            # Rows have been created concurrently, so they should be matched again.
+            return _upsert_batch(model, objects.values(), key_fields, update_fields, retry=False)
+
+    if to_update:
+        _update_batch(model, to_update, update_fields)
+
+    return to_create, to_update
+
+
+def bulk_update(model, objects, update_fields, batch_size=500):
+    """
+    Save given fields of existing objects using one query per batch.
+    Note that model signals are not sent.
+    """
+    for batch in chunked(objects, batch_size):
+        _update_batch(model, batch, update_fields)
+
+
+def _update_batch(model, objects, update_fields):
+    values = {}
+    for field in update_fields:
+        model_field = model._meta.get_field(field)
+        cases = [When(pk=obj.pk, then=Value(getattr(obj, field))) for obj in objects]
+        # Explicit cast is required if all values are NULL, otherwise database can't infer their type.
+        values[field] = Cast(Case(*cases, output_field=model_field), model_field)
+    model.objects.filter(pk__in=[obj.pk for obj in objects]).update(**values)
+
+
+def bulk_sync(queryset, objects, key_fields, update_fields, batch_size=500):
+    """
+    Make rows of the queryset match given objects using constant number of queries per batch.
+    Missing rows are created, changed rows are updated and rows
+    which are not present in the objects are deleted.
+    Instead of model signals for each row, bulk_synchronized signal is sent once.
+    If several rows share the same key, only one of them is kept.
+
+    Returns tuple with lists of created, updated and deleted objects.
+    """
+    model = queryset.model
+
+    def get_key(obj):
+        return tuple(getattr(obj, field) for field in key_fields)
+
+    existing_rows = OrderedDict()
+    to_delete = []
+    for row in queryset:
+        key = get_key(row)
+        if key in existing_rows:
+            to_delete.append(row)
+        else:
+            existing_rows[key] = row
+    # If the same key is provided several times, the last object wins.
+    objects = OrderedDict((get_key(obj), obj) for obj in objects)
+
+    to_create = []
+    to_update = []
+    for key, obj in objects.items():
+        row = existing_rows.pop(key, None)
+        if row is None:
+            to_create.append(obj)
+        elif any(getattr(row, field) != getattr(obj, field) for field in update_fields):
+            obj.pk = row.pk
+            to_update.append(obj)
+    to_delete.extend(existing_rows.values())
+    if not (to_create or to_update or to_delete):
+        return to_create, to_update, to_delete
+
+    with transaction.atomic():
+        # Stale rows are deleted first so that they do not conflict with new rows on unique constraints.
+        if to_delete:
+            model.objects.filter(pk__in=[stale_row.pk for stale_row in to_delete]).delete()
+        if to_create:
+            model.objects.bulk_create(to_create, batch_size=batch_size)
+        bulk_update(model, to_update, update_fields, batch_size)
+
+    core_signals.bulk_synchronized.send(sender=model, created=to_create, updated=to_update, deleted=to_delete)
+    return to_create, to_update, to_delete
@@ -0,0 +1,124 @@
+from collections import defaultdict
+import datetime
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import models
+
+from .models import ResourceItem, ResourceSla
+from .utils import format_period
+
+SLA_CACHE_KEY = 'monitoring:sla:%s:%s:%s'
+
+
+class MonitoringDataCache(object):
+    """
+    Monitoring data of resources rendered within the same request.
+
+    It is shared by all serializers of the request, so that SLA and monitoring items
+    are loaded with one query per content type and period for all resources registered so far,
+    instead of separate queries for each serializer instance.
+    """
+
+    def __init__(self):
+        self.pending = defaultdict(set)  # content type ID -> IDs of registered resources
+        self.sla = defaultdict(dict)  # (content type ID, period) -> {object ID: SLA}
+        self.items = defaultdict(dict)  # content type ID -> {object ID: {item name: value}}
+
+    def add(self, resources):
+        """
+        Register resources which data is going to be rendered.
+        :param resources: resource, list or queryset of resources
+        """
+        if isinstance(resources, models.Model):
+            resources = [resources]
+        for resource in resources or []:
+            self.pending[get_content_type_id(resource)].add(resource.pk)
+
+    def get_sla(self, resource, period):
+        content_type_id = get_content_type_id(resource)
+        loaded = self.sla[(content_type_id, period)]
+        if resource.pk not in loaded:
+            object_ids = self._get_missing_ids(content_type_id, resource, loaded)
+            loaded.update(load_sla(content_type_id, period, object_ids))
+        return loaded[resource.pk]
+
+    def get_items(self, resource):
+        content_type_id = get_content_type_id(resource)
+        loaded = self.items[content_type_id]
+        if resource.pk not in loaded:
+            object_ids = self._get_missing_ids(content_type_id, resource, loaded)
+            loaded.update(load_items(content_type_id, object_ids))
+        return loaded[resource.pk]
+
+    def _get_missing_ids(self, content_type_id, resource, loaded):
+        object_ids = self.pending[content_type_id] - set(loaded.keys())
+        object_ids.add(resource.pk)
+        return object_ids
+
+
+def get_content_type_id(resource):
+    # Content types are cached by Django, so that it does not hit database
+    return ContentType.objects.get_for_model(resource).id
+
+
+def get_request_cache(request):
+    """
+    Monitoring data cache is stored in request, so that nested serializers reuse it.
+    """
+    monitoring_cache = getattr(request, '_monitoring_cache', None)
+    if monitoring_cache is None:
+        monitoring_cache = MonitoringDataCache()
+        request._monitoring_cache = monitoring_cache
+    return monitoring_cache
+
+
+def load_sla(content_type_id, period, object_ids):
+    """
+    :return: dict mapping all given object IDs to SLA or None
+    """
+    result = dict.fromkeys(object_ids)
+    timeout = settings.WALDUR_CORE.get('MONITORING_SLA_CACHE_TIMEOUT', 0)
+    # Only SLA of current period is updated regularly, so that it is worth caching.
+    use_cache = timeout and period == format_period(datetime.date.today())
+
+    if use_cache:
+        keys = {SLA_CACHE_KEY % (content_type_id, period, object_id): object_id for object_id in object_ids}
+        for key, sla in cache.get_many(keys.keys()).items():
+            # Missing SLA is cached as empty dict
+            result[keys[key]] = sla or None
+            object_ids = object_ids - {keys[key]}
+
+    if not object_ids:
+        return result
+
+    rows = ResourceSla.objects.filter(
+        content_type_id=content_type_id, object_id__in=object_ids, period=period)
+    for row in rows:
+        result[row.object_id] = dict(
+            value=row.value,
+            agreed_value=row.agreed_value,
+            period=row.period,
+        )
+
+    if use_cache:
+        cache.set_many({
+            SLA_CACHE_KEY % (content_type_id, period, object_id): result[object_id] or {}
+            for object_id in object_ids
+        }, timeout)
+    return result
+
+
+def load_items(content_type_id, object_ids):
+    """
+    :return: dict mapping all given object IDs to monitoring items or None
+    """
+    result = dict.fromkeys(object_ids)
+    rows = ResourceItem.objects.filter(
+        content_type_id=content_type_id, object_id__in=object_ids).values_list('object_id', 'name', 'value')
+    for object_id, name, value in rows:
+        if result[object_id] is None:
+            result[object_id] = {}
+        result[object_id][name] = value
+    return result
@@ -1,9 +1,7 @@
-from collections import defaultdict
-
 from rest_framework import serializers
 
-from .models import ResourceItem, ResourceSla
-from .utils import get_period, to_list
+from .cache import get_request_cache
+from .utils import get_period
 
 
 class ResourceSlaStateTransitionSerializer(serializers.Serializer):
@@ -22,28 +20,19 @@ class MonitoringSerializerMixin(serializers.Serializer):
         fields = ('sla', 'monitoring_items')
 
     def get_sla(self, resource):
-        if not hasattr(self, 'sla_map_cache'):
-            self.sla_map_cache = {}
-            request = self.context['request']
-
-            items = ResourceSla.objects.filter(scope__in=to_list(self.instance))
-            items = items.filter(period=get_period(request))
-            for item in items:
-                self.sla_map_cache[item.object_id] = dict(
-                    value=item.value,
-                    agreed_value=item.agreed_value,
-                    period=item.period
-                )
-
-        return self.sla_map_cache.get(resource.id)
+        return self.get_monitoring_cache().get_sla(resource, get_period(self.context['request']))
 
     def get_monitoring_items(self, resource):
-        if not hasattr(self, 'monitoring_items_map'):
-            self.monitoring_items_map = {}
-            items = ResourceItem.objects.filter(scope__in=to_list(self.instance))
-
-            self.monitoring_items_map = defaultdict(dict)
-            for item in items:
-                self.monitoring_items_map[item.object_id][item.name] = item.value
-
-        return self.monitoring_items_map.get(resource.id)
+        return self.get_monitoring_cache().get_items(resource)
+
+    def get_monitoring_cache(self):
+        """
+        Cache is shared by all serializers of the request,
+        so that data of all resources rendered by this serializer is loaded together.
+        """
+        request = self.context.get('request')
+        monitoring_cache = get_request_cache(request if request is not None else self)
+        if not getattr(self, '_monitoring_resources_added', False):
+            monitoring_cache.add(self.instance)
+            self._monitoring_resources_added = True
+        return monitoring_cache
@@ -0,0 +1,96 @@
+import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework import status, test
+from rest_framework.reverse import reverse
+
+from waldur_core.structure.tests.factories import (
+    TestNewInstanceFactory, TestServiceProjectLinkFactory, TestVolumeFactory, UserFactory)
+
+from ..cache import MonitoringDataCache
+from ..models import ResourceSla, ResourceItem
+from ..utils import format_period
+
+
+class MonitoringDataCacheTest(TestCase):
+    def setUp(self):
+        self.period = format_period(datetime.date.today())
+        self.vm1 = TestNewInstanceFactory()
+        self.vm2 = TestNewInstanceFactory()
+        self.volume = TestVolumeFactory()
+        ResourceSla.objects.create(scope=self.vm1, period=self.period, value=90)
+        ResourceSla.objects.create(scope=self.vm2, period='2000-01', value=80)
+        ResourceItem.objects.create(scope=self.vm1, name='application_status', value=1)
+        ResourceItem.objects.create(scope=self.vm2, name='application_status', value=0)
+
+    def test_data_of_registered_resources_is_loaded_with_one_query(self):
+        monitoring_cache = MonitoringDataCache()
+        monitoring_cache.add([self.vm1, self.vm2])
+
+        with self.assertNumQueries(2):
+            self.assertEqual(monitoring_cache.get_sla(self.vm1, self.period)['value'], 90)
+            self.assertEqual(monitoring_cache.get_sla(self.vm2, self.period), None)
+            self.assertEqual(monitoring_cache.get_items(self.vm1), {'application_status': 1})
+            self.assertEqual(monitoring_cache.get_items(self.vm2), {'application_status': 0})
+
+    def test_resources_are_distinguished_by_content_type(self):
+        monitoring_cache = MonitoringDataCache()
+        monitoring_cache.add([self.vm1, self.volume])
+        self.assertEqual(monitoring_cache.get_items(self.volume), None)
+        self.assertEqual(monitoring_cache.get_items(self.vm1), {'application_status': 1})
+
+    def test_periods_are_cached_separately(self):
+        monitoring_cache = MonitoringDataCache()
+        monitoring_cache.add(self.vm2)
+        self.assertEqual(monitoring_cache.get_sla(self.vm2, self.period), None)
+        self.assertEqual(monitoring_cache.get_sla(self.vm2, '2000-01')['value'], 80)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_current_sla_is_shared_between_requests(self):
+        cache.clear()
+        with self.settings(WALDUR_CORE=dict(settings.WALDUR_CORE, MONITORING_SLA_CACHE_TIMEOUT=60)):
+            MonitoringDataCache().get_sla(self.vm1, self.period)
+            ResourceSla.objects.filter(period=self.period).update(value=70)
+
+            with self.assertNumQueries(0):
+                sla = MonitoringDataCache().get_sla(self.vm1, self.period)
+            self.assertEqual(sla['value'], 90)
+
+
+class MonitoringViewTest(test.APITransactionTestCase):
+    def setUp(self):
+        link = TestServiceProjectLinkFactory()
+        self.vm1 = TestNewInstanceFactory(service_project_link=link)
+        self.vm2 = TestNewInstanceFactory(service_project_link=link)
+        self.url = reverse('monitoring-list')
+
+        period = format_period(datetime.date.today())
+        ResourceSla.objects.create(scope=self.vm1, period=period, value=90)
+        ResourceItem.objects.create(scope=self.vm2, name='application_status', value=1)
+
+    def test_data_of_several_resources_is_returned(self):
+        self.client.force_authenticate(UserFactory(is_staff=True))
+        vm1_url = TestNewInstanceFactory.get_url(self.vm1)
+        vm2_url = TestNewInstanceFactory.get_url(self.vm2)
+
+        response = self.client.get(self.url, {'resource': [vm1_url, vm2_url]})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = {row['resource']: row for row in response.data}
+        self.assertEqual(data[vm1_url]['sla']['value'], 90)
+        self.assertEqual(data[vm1_url]['monitoring_items'], None)
+        self.assertEqual(data[vm2_url]['sla'], None)
+        self.assertEqual(data[vm2_url]['monitoring_items'], {'application_status': 1})
+
+    def test_resources_invisible_to_user_are_skipped(self):
+        self.client.force_authenticate(UserFactory())
+        response = self.client.get(self.url, {'resource': TestNewInstanceFactory.get_url(self.vm1)})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
+
+    def test_invalid_url_is_rejected(self):
+        self.client.force_authenticate(UserFactory(is_staff=True))
+        response = self.client.get(self.url, {'resource': 'http://testserver/api/customers/'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
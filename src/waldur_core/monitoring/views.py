@@ -1,8 +1,20 @@
+from collections import defaultdict
+from uuid import UUID
+
+from django.urls import Resolver404, resolve
 from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import exceptions
 from rest_framework import permissions as rf_permissions
 from rest_framework import viewsets
+from rest_framework.response import Response
+
+from waldur_core.core import utils as core_utils
+from waldur_core.structure import models as structure_models
+from waldur_core.structure.managers import filter_queryset_for_user
 
 from . import serializers, filters, models
+from .cache import get_request_cache
+from .utils import get_period
 
 
 class ResourceSlaStateTransitionViewSet(viewsets.ReadOnlyModelViewSet):
@@ -18,3 +30,55 @@ class ResourceSlaStateTransitionViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = (rf_permissions.IsAuthenticated,)
     filter_backends = (filters.ResourceScopeFilterBackend, DjangoFilterBackend)
     filter_class = filters.ResourceStateFilter
+
+
+class MonitoringViewSet(viewsets.ViewSet):
+    permission_classes = (rf_permissions.IsAuthenticated,)
+
+    def list(self, request):
+        """
+        To get SLA and monitoring items of several resources at once, issue a **GET** request
+        to */api/monitoring/* with one or more *?resource=<resource URL>* parameters.
+        Optional *?period=<year>-<month>* parameter defines SLA period. Default: current month.
+
+        Response is list of dictionaries with following fields:
+         - 'resource' - resource URL as it has been provided in request;
+         - 'sla' - SLA of resource for the period;
+         - 'monitoring_items' - dictionary of monitoring item values.
+
+        Resources which are not visible to user are skipped.
+        """
+        urls = request.query_params.getlist('resource')
+        if not urls:
+            raise exceptions.ValidationError('At least one resource URL should be specified.')
+
+        resource_models = structure_models.ResourceMixin.get_all_models()
+        grouped_uuids = defaultdict(dict)
+        for url in urls:
+            try:
+                match = resolve(core_utils.clear_url(url))
+                model = core_utils.get_model_from_resolve_match(match)
+                uuid = UUID(match.kwargs['uuid']).hex
+            except (Resolver404, AttributeError, KeyError, ValueError):
+                raise exceptions.ValidationError('Invalid resource URL: %s.' % url)
+            if model not in resource_models:
+                raise exceptions.ValidationError('URL %s does not point to resource.' % url)
+            grouped_uuids[model][uuid] = url
+
+        # Resources of the same type are fetched with one query
+        resources = []
+        for model, uuids in grouped_uuids.items():
+            queryset = filter_queryset_for_user(model.objects.filter(uuid__in=uuids.keys()), request.user)
+            resources.extend((uuids[resource.uuid.hex], resource) for resource in queryset)
+
+        monitoring_cache = get_request_cache(request)
+        monitoring_cache.add([resource for _, resource in resources])
+        period = get_period(request)
+        return Response([
+            {
+                'resource': url,
+                'sla': monitoring_cache.get_sla(resource, period),
+                'monitoring_items': monitoring_cache.get_items(resource),
+            }
+            for url, resource in resources
+        ])
@@ -1,7 +1,70 @@
+from collections import defaultdict
+
 from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import F
+import six
 
-from waldur_core.quotas import models
+from waldur_core.core import utils as core_utils
+from waldur_core.quotas import models, fields
 
 
 def get_models_with_quotas():
     return [m for m in apps.get_models() if issubclass(m, models.QuotaModelMixin)]
+
+
+def get_scopes_quotas(model, quota_name, scope_ids):
+    """
+    Fetch quota with given name for several scopes of the same model using one query.
+    Returns dictionary which maps scope ID to quota.
+    """
+    content_type = ContentType.objects.get_for_model(model)
+    quotas = models.Quota.objects.filter(content_type=content_type, name=quota_name, object_id__in=scope_ids)
+    return {quota.object_id: quota for quota in quotas}
+
+
+def bulk_init_quotas(model, scopes, batch_size=500):
+    """
+    Create quotas for scopes which have been created using bulk_create.
+    It is a counterpart of init_quotas and increase_global_quota handlers.
+    """
+    quotas = []
+    for scope in scopes:
+        for field in model.get_quotas_fields():
+            if not field.is_connected_to_scope(scope):
+                continue
+            usage = field.default_usage(scope) if six.callable(field.default_usage) else field.default_usage
+            quotas.append(models.Quota(scope=scope, name=field.name, limit=field.scope_default_limit(scope),
+                                       usage=usage))
+    models.Quota.objects.bulk_create(quotas, batch_size=batch_size)
+
+    if scopes and hasattr(model, 'GLOBAL_COUNT_QUOTA_NAME'):
+        models.Quota.objects.filter(name=model.GLOBAL_COUNT_QUOTA_NAME).update(usage=F('usage') + len(scopes))
+
+
+def bulk_increase_counter_quotas(target_model, target_instances, batch_size=500):
+    """
+    Increase counter quotas which count instances of target model created using bulk_create.
+    It is a counterpart of counter quota handlers: usage of each affected quota is increased
+    by aggregated delta using one query per batch of scopes with the same delta.
+    Note that quota usage is not validated and quota signals are not sent.
+    """
+    deltas = defaultdict(int)
+    for model in get_models_with_quotas():
+        for field in model.get_quotas_fields(field_class=fields.CounterQuotaField):
+            if target_model not in field.target_models:
+                continue
+            for instance in target_instances:
+                scope = field._get_scope(instance)
+                if field.is_connected_to_scope(scope):
+                    deltas[(model, field.name, scope.pk)] += field.get_delta(instance)
+
+    scopes_by_delta = defaultdict(list)
+    for (model, quota_name, scope_id), delta in deltas.items():
+        scopes_by_delta[(model, quota_name, delta)].append(scope_id)
+
+    for (model, quota_name, delta), scope_ids in scopes_by_delta.items():
+        content_type = ContentType.objects.get_for_model(model)
+        for batch in core_utils.chunked(scope_ids, batch_size):
+            models.Quota.objects.filter(content_type=content_type, name=quota_name, object_id__in=batch).update(
+                usage=F('usage') + delta)
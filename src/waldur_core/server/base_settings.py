@@ -296,6 +296,9 @@ WALDUR_CORE = {
     'ENABLE_ACCOUNTING_START_DATE': False,
     'USE_ATOMIC_TRANSACTION': True,
     'NOTIFICATION_SUBJECT': 'Notifications from Waldur',
+    # SLA of current period rendered by resource serializers is cached for this number of seconds.
+    # Caching is disabled if it is 0.
+    'MONITORING_SLA_CACHE_TIMEOUT': 0,
 }
 
 WALDUR_CORE_PUBLIC_SETTINGS = [
@@ -10,6 +10,7 @@ class StructureConfig(AppConfig):
     verbose_name = 'Structure'
 
     def ready(self):
+        from waldur_core.core import signals as core_signals
         from waldur_core.core.models import CoordinatesMixin, User
         from waldur_core.structure.executors import check_cleanup_executors
         from waldur_core.structure.models import ResourceMixin, SubResource, Service, TagMixin, VirtualMachine, \
@@ -225,6 +226,14 @@ class StructureConfig(AppConfig):
                 ),
             )
 
+            core_signals.bulk_synchronized.connect(
+                handlers.log_spl_bulk_create,
+                sender=spl_model,
+                dispatch_uid='waldur_core.structure.handlers.log_spl_{}_bulk_create_{}'.format(
+                    spl_model.__name__, index
+                ),
+            )
+
             signals.pre_delete.connect(
                 handlers.log_spl_delete,
                 sender=spl_model,
@@ -413,6 +413,11 @@ def log_spl_create(sender, instance, created=False, **kwargs):
             })
 
 
+def log_spl_bulk_create(sender, created, **kwargs):
+    for service_project_link in created:
+        log_spl_create(sender, service_project_link, created=True)
+
+
 def log_spl_delete(sender, instance, **kwargs):
     event_logger.spl.info(
         'ServiceProjectLink for project \'{project_name}\' '
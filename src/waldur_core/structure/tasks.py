@@ -1,17 +1,19 @@
 from __future__ import unicode_literals
 
+import collections
 from datetime import timedelta
 import logging
 
 from celery import shared_task
 from django.core import exceptions
 from django.db import transaction
+from django.db.models import Exists, OuterRef
 from django.db.utils import DatabaseError
 from django.utils import timezone
 import six
 
-from waldur_core.core import utils as core_utils, tasks as core_tasks, models as core_models
-from waldur_core.quotas.exceptions import QuotaValidationError
+from waldur_core.core import utils as core_utils, tasks as core_tasks, models as core_models, signals as core_signals
+from waldur_core.quotas import utils as quotas_utils
 from waldur_core.structure import SupportedServices, models, utils, ServiceBackendError, models as structure_models
 
 logger = logging.getLogger(__name__)
@@ -52,6 +54,13 @@ def check_expired_permissions():
 
 
 class ConnectSharedSettingsTask(core_tasks.Task):
+    """
+    Connect shared service settings to all customers and their projects.
+    Missing services and service project links are found using anti-join queries and created in batches.
+    Instead of model signals for each created object, quotas are updated
+    and bulk_synchronized signal is sent once per model.
+    """
+    batch_size = 500
 
     def execute(self, service_settings):
         logger.debug('About to connect service settings "%s" to all available customers' % service_settings.name)
@@ -60,29 +69,71 @@ class ConnectSharedSettingsTask(core_tasks.Task):
         service_model = SupportedServices.get_service_models()[service_settings.type]['service']
 
         with transaction.atomic():
-            for customer in models.Customer.objects.all():
-                defaults = {'available_for_all': True}
-                try:
-                    service, _ = service_model.objects.get_or_create(
-                        customer=customer, settings=service_settings, defaults=defaults)
-                except QuotaValidationError:
-                    logger.warning('Unable to connect shared service '
-                                   'settings to customer because quota is exceeded. '
-                                   'Service settings ID: %s, customer ID: %s',
-                                   service_settings.id, customer.id)
-                    continue
-
-                service_project_link_model = service.projects.through
-                for project in service.customer.projects.all():
-                    try:
-                        service_project_link_model.objects.get_or_create(project=project, service=service)
-                    except QuotaValidationError:
-                        logger.warning('Unable to connect shared service to project because '
-                                       'quota is exceeded. Service ID: %s, project ID: %s',
-                                       service.id, project.id)
-                        continue
-
-        logger.info('Successfully connected service settings "%s" to all available customers' % service_settings.name)
+            services = self._create_services(service_model, service_settings)
+            links = self._create_links(service_model.projects.through, service_settings)
+
+        logger.info('Successfully connected service settings "%s" to all available customers. '
+                    'Created services: %s, created links: %s.', service_settings.name, len(services), len(links))
+
+    def _create_services(self, service_model, service_settings):
+        connected_services = service_model.objects.filter(customer=OuterRef('pk'), settings=service_settings)
+        customers = list(models.Customer.objects.annotate(is_connected=Exists(connected_services))
+                         .filter(is_connected=False))
+        quotas = quotas_utils.get_scopes_quotas(
+            models.Customer, models.Customer.Quotas.nc_service_count.name, [customer.pk for customer in customers])
+
+        services = []
+        for customer in customers:
+            if customer.pk in quotas and quotas[customer.pk].is_exceeded(1):
+                logger.warning('Unable to connect shared service '
+                               'settings to customer because quota is exceeded. '
+                               'Service settings ID: %s, customer ID: %s',
+                               service_settings.id, customer.id)
+                continue
+            services.append(service_model(customer=customer, settings=service_settings, available_for_all=True))
+
+        self._bulk_create(service_model, services)
+        return services
+
+    def _create_links(self, service_project_link_model, service_settings):
+        services = {service.customer_id: service
+                    for service in service_settings.get_services().select_related('customer', 'settings')}
+        existing_links = service_project_link_model.objects.filter(
+            project=OuterRef('pk'), service__settings=service_settings)
+        projects = list(models.Project.objects.filter(customer__in=service_settings.get_services().values('customer'))
+                        .annotate(is_connected=Exists(existing_links))
+                        .filter(is_connected=False)
+                        .select_related('customer'))
+
+        quota_name = models.Project.Quotas.nc_service_project_link_count.name
+        project_quotas = quotas_utils.get_scopes_quotas(models.Project, quota_name, [p.pk for p in projects])
+        customer_quotas = quotas_utils.get_scopes_quotas(models.Customer, quota_name, list(services))
+        customer_deltas = collections.Counter()
+
+        links = []
+        for project in projects:
+            service = services[project.customer_id]
+            customer_quota = customer_quotas.get(project.customer_id)
+            project_quota = project_quotas.get(project.pk)
+            if ((project_quota and project_quota.is_exceeded(1)) or
+                    (customer_quota and customer_quota.is_exceeded(customer_deltas[project.customer_id] + 1))):
+                logger.warning('Unable to connect shared service to project because '
+                               'quota is exceeded. Service ID: %s, project ID: %s',
+                               service.id, project.id)
+                continue
+            customer_deltas[project.customer_id] += 1
+            links.append(service_project_link_model(project=project, service=service))
+
+        self._bulk_create(service_project_link_model, links)
+        return links
+
+    def _bulk_create(self, model, objects):
+        if not objects:
+            return
+        model.objects.bulk_create(objects, batch_size=self.batch_size)
+        quotas_utils.bulk_init_quotas(model, objects, batch_size=self.batch_size)
+        quotas_utils.bulk_increase_counter_quotas(model, objects, batch_size=self.batch_size)
+        core_signals.bulk_synchronized.send(sender=model, created=objects, updated=[], deleted=[])
 
 
 class BackgroundPullTask(core_tasks.BackgroundTask):
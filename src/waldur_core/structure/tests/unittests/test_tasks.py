@@ -97,3 +97,70 @@ class SetErredProvisioningResourcesTaskTest(TestCase):
 
         self.assertEqual(ok_vm.state, models.TestNewInstance.States.CREATING)
         self.assertEqual(ok_volume.state, models.TestVolume.States.CREATING)
+
+
+class ConnectSharedSettingsTaskTest(TestCase):
+
+    def setUp(self):
+        self.customer = factories.CustomerFactory()
+        self.projects = factories.ProjectFactory.create_batch(2, customer=self.customer)
+        self.other_customer = factories.CustomerFactory()
+        self.other_project = factories.ProjectFactory(customer=self.other_customer)
+        self.settings = factories.ServiceSettingsFactory(shared=True)
+
+    def connect(self):
+        tasks.ConnectSharedSettingsTask().execute(self.settings)
+
+    def get_services(self):
+        return models.TestService.objects.filter(settings=self.settings)
+
+    def get_links(self):
+        return models.TestServiceProjectLink.objects.filter(service__settings=self.settings)
+
+    def test_services_and_links_are_created_for_all_customers_and_projects(self):
+        self.connect()
+
+        self.assertEqual(set(self.get_services().values_list('customer', flat=True)),
+                         {self.customer.pk, self.other_customer.pk})
+        self.assertTrue(all(self.get_services().values_list('available_for_all', flat=True)))
+        self.assertEqual(set(self.get_links().values_list('project', flat=True)),
+                         {self.projects[0].pk, self.projects[1].pk, self.other_project.pk})
+
+    def test_existing_services_and_links_are_not_duplicated(self):
+        service = models.TestService.objects.create(customer=self.customer, settings=self.settings)
+        models.TestServiceProjectLink.objects.get_or_create(service=service, project=self.projects[0])
+
+        self.connect()
+        self.connect()
+
+        self.assertEqual(self.get_services().count(), 2)
+        self.assertEqual(self.get_links().count(), 3)
+
+    def test_counter_quotas_are_increased_once_per_scope(self):
+        self.connect()
+
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.quotas.get(name='nc_service_count').usage, 1)
+        self.assertEqual(self.customer.quotas.get(name='nc_service_project_link_count').usage, 2)
+        self.assertEqual(self.projects[0].quotas.get(name='nc_service_project_link_count').usage, 1)
+
+    def test_quotas_of_created_links_are_initialized(self):
+        self.connect()
+
+        link = self.get_links().get(project=self.other_project)
+        self.assertEqual(link.quotas.get(name='instances').limit, 30)
+
+    def test_customer_is_skipped_if_service_quota_is_exceeded(self):
+        self.customer.set_quota_limit('nc_service_count', 0)
+
+        self.connect()
+
+        self.assertFalse(self.get_services().filter(customer=self.customer).exists())
+        self.assertTrue(self.get_services().filter(customer=self.other_customer).exists())
+
+    def test_links_are_created_up_to_customer_quota_limit(self):
+        self.customer.set_quota_limit('nc_service_project_link_count', 1)
+
+        self.connect()
+
+        self.assertEqual(self.get_links().filter(project__customer=self.customer).count(), 1)
@@ -21,25 +21,25 @@ class FreeIPAConfig(AppConfig):
             signals.post_save.connect(
                 handlers.schedule_sync,
                 sender=model,
-                dispatch_uid='waldur_freeipa.handlers.schedule_sync_on_%s_creation' % model.__class__,
+                dispatch_uid='waldur_freeipa.handlers.schedule_sync_on_%s_creation' % model.__name__,
             )
 
             signals.pre_delete.connect(
                 handlers.schedule_sync,
                 sender=model,
-                dispatch_uid='waldur_freeipa.handlers.schedule_sync_on_%s_deletion' % model.__class__,
+                dispatch_uid='waldur_freeipa.handlers.schedule_sync_on_%s_deletion' % model.__name__,
             )
 
             structure_signals.structure_role_granted.connect(
-                handlers.schedule_sync,
+                handlers.log_group_change,
                 sender=model,
-                dispatch_uid='waldur_freeipa.handlers.schedule_sync_on_%s_role_granted' % model.__class__,
+                dispatch_uid='waldur_freeipa.handlers.log_group_change_on_%s_role_granted' % model.__name__,
             )
 
             structure_signals.structure_role_revoked.connect(
-                handlers.schedule_sync,
+                handlers.log_group_change,
                 sender=model,
-                dispatch_uid='waldur_freeipa.handlers.schedule_sync_on_%s_role_revoked' % model.__class__,
+                dispatch_uid='waldur_freeipa.handlers.log_group_change_on_%s_role_revoked' % model.__name__,
             )
 
         signals.post_save.connect(
@@ -6,6 +6,7 @@ import csv
 
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
+from django.db.models import Max
 import python_freeipa
 
 from waldur_core.structure import models as structure_models
@@ -14,7 +15,22 @@ from waldur_core.quotas import models as quota_models
 from . import models, utils
 
 
-class GroupSynchronizer(object):
+class BaseGroupSynchronizer(object):
+    def __init__(self, client):
+        self.client = client
+        self.prefix = settings.WALDUR_FREEIPA['GROUPNAME_PREFIX']
+
+    def group_name(self, key):
+        return '%s%s' % (self.prefix, key)
+
+    def project_group_name(self, project):
+        return self.group_name('project_%s' % project.uuid)
+
+    def customer_group_name(self, customer):
+        return self.group_name('org_%s' % customer.uuid)
+
+
+class GroupSynchronizer(BaseGroupSynchronizer):
     """
     This class maps Waldur structure units to FreeIPA groups and memberships.
 
@@ -32,13 +48,14 @@ class GroupSynchronizer(object):
     2) Convert FreeIPA entities to group mappings.
     3) Compare group mappings and apply series of API calls to synchronize them.
 
+    Permission changes recorded after synchronization has started are applied by the next synchronization.
+
     Note that in order to distinguish between Waldur managed groups and internal FreeIPA groups,
     group name prefix should be specified. Similarly, there's also user name prefix setting available.
     """
 
     def __init__(self, client):
-        self.client = client
-        self.prefix = settings.WALDUR_FREEIPA['GROUPNAME_PREFIX']
+        super(GroupSynchronizer, self).__init__(client)
 
         self.profiles = {
             profile.user_id: profile.username
@@ -55,15 +72,6 @@ class GroupSynchronizer(object):
         self.freeipa_children = collections.defaultdict(set)
         self.freeipa_names = dict()
 
-    def group_name(self, key):
-        return '%s%s' % (self.prefix, key)
-
-    def project_group_name(self, project):
-        return self.group_name('project_%s' % project.uuid)
-
-    def customer_group_name(self, customer):
-        return self.group_name('org_%s' % customer.uuid)
-
     def get_group_description(self, name, limit):
         stream = cStringIO.StringIO()
         writer = csv.writer(stream)
@@ -198,6 +206,7 @@ class GroupSynchronizer(object):
             self.client.group_del(group)
 
     def sync(self):
+        last_change_id = models.GroupChange.objects.aggregate(Max('id'))['id__max']
         try:
             self.collect_waldur_permissions()
             self.collect_waldur_customers()
@@ -210,10 +219,109 @@ class GroupSynchronizer(object):
             self.sync_children()
             self.delete_stale_groups()
 
+            # Permission changes are reconciled by full synchronization
+            if last_change_id:
+                models.GroupChange.objects.filter(id__lte=last_change_id).delete()
+
         finally:
             utils.release_task_status()
 
 
+class IncrementalGroupSynchronizer(BaseGroupSynchronizer):
+    """
+    This class applies permission changes recorded in change log to FreeIPA group memberships.
+
+    Only groups and users mentioned in change log are considered. Desired membership is
+    taken from current permissions rather than from the change itself, so that repeated
+    changes of the same permission converge to its latest state. Memberships of each group
+    are updated with at most two API calls.
+
+    If some group does not exist in FreeIPA yet, full synchronization is required.
+    """
+
+    def __init__(self, client):
+        super(IncrementalGroupSynchronizer, self).__init__(client)
+        self.last_change_id = None
+        self.changed_users = collections.defaultdict(set)
+        self.new_members = collections.defaultdict(set)
+        self.stale_members = collections.defaultdict(set)
+        self.missing_groups = set()
+
+    def collect_changes(self):
+        changes = models.GroupChange.objects.order_by('id').values_list(
+            'id', 'content_type_id', 'object_id', 'user_id')
+        for change_id, content_type_id, object_id, user_id in changes:
+            self.last_change_id = change_id
+            self.changed_users[(content_type_id, object_id)].add(user_id)
+
+    def get_changed_scopes(self, model):
+        content_type_id = ContentType.objects.get_for_model(model).id
+        return {
+            object_id: user_ids
+            for (scope_content_type_id, object_id), user_ids in self.changed_users.items()
+            if scope_content_type_id == content_type_id
+        }
+
+    def compute_diff(self, model, permission_model, field, get_group_name, profiles):
+        changed_scopes = self.get_changed_scopes(model)
+        if not changed_scopes:
+            return
+
+        # Groups of deleted customers and projects are removed by full synchronization
+        scopes = model.objects.in_bulk(changed_scopes.keys())
+        user_ids = set().union(*changed_scopes.values())
+        active_permissions = set(permission_model.objects.filter(**{
+            'is_active': True,
+            '%s_id__in' % field: scopes.keys(),
+            'user_id__in': user_ids,
+        }).values_list('%s_id' % field, 'user_id'))
+
+        for scope_id, scope in scopes.items():
+            group = get_group_name(scope)
+            for user_id in changed_scopes[scope_id]:
+                username = profiles.get(user_id)
+                if not username:
+                    continue
+                if (scope_id, user_id) in active_permissions:
+                    self.new_members[group].add(username)
+                else:
+                    self.stale_members[group].add(username)
+
+    def compute_diffs(self):
+        user_ids = set().union(*self.changed_users.values())
+        profiles = dict(models.Profile.objects.filter(user_id__in=user_ids).values_list('user_id', 'username'))
+        self.compute_diff(structure_models.Customer, structure_models.CustomerPermission,
+                          'customer', self.customer_group_name, profiles)
+        self.compute_diff(structure_models.Project, structure_models.ProjectPermission,
+                          'project', self.project_group_name, profiles)
+
+    def apply_diffs(self):
+        for group in sorted(set(self.new_members) | set(self.stale_members)):
+            try:
+                new_members = sorted(self.new_members.get(group, []))
+                if new_members:
+                    self.client.group_add_member(group, users=new_members, skip_errors=True)
+
+                stale_members = sorted(self.stale_members.get(group, []))
+                if stale_members:
+                    self.client.group_remove_member(group, users=stale_members, skip_errors=True)
+            except python_freeipa.exceptions.NotFound:
+                self.missing_groups.add(group)
+
+    def sync(self):
+        """
+        Returns False if full synchronization is required.
+        """
+        self.collect_changes()
+        if self.last_change_id is None:
+            return True
+
+        self.compute_diffs()
+        self.apply_diffs()
+        models.GroupChange.objects.filter(id__lte=self.last_change_id).delete()
+        return not self.missing_groups
+
+
 class FreeIPABackend(object):
     def __init__(self):
         options = settings.WALDUR_FREEIPA
@@ -301,3 +409,10 @@ class FreeIPABackend(object):
     def synchronize_groups(self):
         synchronizer = GroupSynchronizer(self._client)
         synchronizer.sync()
+
+    def synchronize_group_changes(self):
+        """
+        Returns False if full synchronization is required.
+        """
+        synchronizer = IncrementalGroupSynchronizer(self._client)
+        return synchronizer.sync()
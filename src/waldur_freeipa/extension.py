@@ -12,6 +12,9 @@ class FreeIPAExtension(WaldurExtension):
             'USERNAME_PREFIX': 'waldur_',
             'GROUPNAME_PREFIX': 'waldur_',
             'BLACKLISTED_USERNAMES': ['root'],
+            # If enabled, role changes are applied to affected groups only,
+            # while full synchronization is performed periodically.
+            'INCREMENTAL_GROUP_SYNC': True,
         }
 
     @staticmethod
@@ -1,5 +1,6 @@
 import logging
 
+from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import transaction
 
@@ -14,6 +15,21 @@ def schedule_sync(*args, **kwargs):
     tasks.schedule_sync()
 
 
+def log_group_change(sender, structure, user, **kwargs):
+    """
+    Record permission change, so that only affected group membership is synchronized.
+    """
+    if not settings.WALDUR_FREEIPA['ENABLED']:
+        return
+
+    if not settings.WALDUR_FREEIPA.get('INCREMENTAL_GROUP_SYNC', True):
+        tasks.schedule_sync()
+        return
+
+    models.GroupChange.objects.create(scope=structure, user=user)
+    tasks.schedule_group_changes_sync()
+
+
 def schedule_sync_on_quota_change(sender, instance, created=False, **kwargs):
     if instance.name != utils.QUOTA_NAME:
         return
@@ -3,6 +3,8 @@ from __future__ import unicode_literals
 import re
 
 from django.conf import settings
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
 from django.core import exceptions, validators
 from django.db import models
 from django.utils import timezone
@@ -49,3 +51,14 @@ class Profile(core_models.UuidMixin, models.Model):
 
     def __str__(self):
         return self.username
+
+
+class GroupChange(models.Model):
+    """
+    Customer or project permission change which has not been applied to FreeIPA group yet.
+    Change log is consumed by incremental group synchronization.
+    """
+    content_type = models.ForeignKey(ContentType)
+    object_id = models.PositiveIntegerField()
+    scope = GenericForeignKey('content_type', 'object_id')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL)
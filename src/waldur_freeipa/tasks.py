@@ -3,6 +3,7 @@ import logging
 from celery import shared_task
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
 from python_freeipa import exceptions as freeipa_exceptions
 
 from . import models, utils
@@ -47,6 +48,28 @@ def _sync_groups():
     FreeIPABackend().synchronize_groups()
 
 
+def schedule_group_changes_sync():
+    """
+    Permission changes are applied after transaction is committed, so that change log is visible to the task.
+    """
+    if not settings.WALDUR_FREEIPA['ENABLED']:
+        logger.debug('Skipping FreeIPA group changes synchronization because plugin is disabled.')
+        return
+
+    transaction.on_commit(lambda: _sync_group_changes.apply_async(countdown=10))
+
+
+@shared_task()
+def _sync_group_changes():
+    """
+    Apply recorded permission changes to FreeIPA groups.
+    If some groups are missing in FreeIPA, full synchronization is scheduled.
+    """
+    if not FreeIPABackend().synchronize_group_changes():
+        logger.info('Scheduling full FreeIPA synchronization because some groups are missing.')
+        schedule_sync()
+
+
 def schedule_sync_names():
     _sync_names.apply_async(countdown=10)
 
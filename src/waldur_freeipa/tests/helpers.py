@@ -2,9 +2,76 @@ import copy
 
 from django.conf import settings
 from django.test import override_settings
+from python_freeipa import exceptions as freeipa_exceptions
 
 
 def override_plugin_settings(**kwargs):
     plugin_settings = copy.deepcopy(settings.WALDUR_FREEIPA)
     plugin_settings.update(kwargs)
     return override_settings(WALDUR_FREEIPA=plugin_settings)
+
+
+class FakeFreeIPAClient(object):
+    """
+    In-memory FreeIPA server implementing group API used by synchronizers.
+    All API calls are recorded, so that tests can check their number.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.groups = {}
+        self.calls = []
+
+    def login(self, username, password):
+        pass
+
+    def add_group(self, name, description=None, users=(), groups=()):
+        self.groups[name] = {
+            'description': description,
+            'users': set(users),
+            'groups': set(groups),
+        }
+
+    def get_group(self, name):
+        try:
+            return self.groups[name]
+        except KeyError:
+            raise freeipa_exceptions.NotFound('%s: group not found' % name, 4001)
+
+    def group_find(self):
+        self.calls.append(('group_find',))
+        result = []
+        for name, group in self.groups.items():
+            row = {
+                'cn': [name],
+                'member_user': sorted(group['users']),
+                'member_group': sorted(group['groups']),
+            }
+            if group['description']:
+                row['description'] = [group['description']]
+            result.append(row)
+        return {'result': result}
+
+    def group_add(self, name, description=None):
+        self.calls.append(('group_add', name))
+        self.add_group(name, description)
+
+    def group_mod(self, name, description=None):
+        self.calls.append(('group_mod', name))
+        self.get_group(name)['description'] = description
+
+    def group_del(self, name):
+        self.calls.append(('group_del', name))
+        self.get_group(name)
+        del self.groups[name]
+
+    def group_add_member(self, name, users=None, groups=None, skip_errors=False):
+        self.calls.append(('group_add_member', name))
+        group = self.get_group(name)
+        group['users'].update(users or [])
+        group['groups'].update(groups or [])
+
+    def group_remove_member(self, name, users=None, groups=None, skip_errors=False):
+        self.calls.append(('group_remove_member', name))
+        group = self.get_group(name)
+        group['users'].difference_update(users or [])
+        group['groups'].difference_update(groups or [])
@@ -0,0 +1,102 @@
+from __future__ import unicode_literals
+
+import mock
+from django.test import TestCase
+
+from waldur_core.structure import models as structure_models
+from waldur_core.structure.tests import factories as structure_factories
+
+from waldur_freeipa import models
+from waldur_freeipa.backend import FreeIPABackend
+
+from .helpers import FakeFreeIPAClient, override_plugin_settings
+
+
+@override_plugin_settings(ENABLED=True)
+class GroupChangeTest(TestCase):
+    def setUp(self):
+        self.freeipa = FakeFreeIPAClient()
+        # Tasks are not run, so that synchronization is triggered explicitly
+        for target, kwargs in (
+            ('python_freeipa.Client', {'return_value': self.freeipa}),
+            ('waldur_freeipa.tasks.schedule_sync', {}),
+            ('waldur_freeipa.tasks._sync_group_changes', {}),
+        ):
+            patcher = mock.patch(target, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.customer = structure_factories.CustomerFactory()
+        self.project = structure_factories.ProjectFactory(customer=self.customer)
+        self.user = structure_factories.UserFactory()
+        models.Profile.objects.create(user=self.user, username='alice')
+
+        self.customer_group = 'waldur_org_%s' % self.customer.uuid
+        self.project_group = 'waldur_project_%s' % self.project.uuid
+        self.freeipa.add_group(self.customer_group)
+        self.freeipa.add_group(self.project_group)
+
+    def sync_changes(self):
+        self.freeipa.calls = []
+        return FreeIPABackend().synchronize_group_changes()
+
+    def test_role_change_is_recorded(self):
+        self.customer.add_user(self.user, structure_models.CustomerRole.OWNER)
+        self.assertTrue(models.GroupChange.objects.filter(
+            object_id=self.customer.id, user=self.user).exists())
+
+    def test_granted_role_is_added_to_group_without_full_synchronization(self):
+        self.project.add_user(self.user, structure_models.ProjectRole.ADMINISTRATOR)
+
+        self.assertTrue(self.sync_changes())
+        self.assertEqual(self.freeipa.groups[self.project_group]['users'], {'alice'})
+        self.assertEqual(self.freeipa.calls, [('group_add_member', self.project_group)])
+        self.assertFalse(models.GroupChange.objects.exists())
+
+    def test_revoked_role_is_removed_from_group(self):
+        self.freeipa.add_group(self.customer_group, users=['alice', 'bob'])
+        self.customer.add_user(self.user, structure_models.CustomerRole.OWNER)
+        self.customer.remove_user(self.user)
+
+        self.sync_changes()
+        self.assertEqual(self.freeipa.groups[self.customer_group]['users'], {'bob'})
+        self.assertEqual(self.freeipa.calls, [('group_remove_member', self.customer_group)])
+
+    def test_changes_of_several_users_are_applied_with_one_call_per_group(self):
+        for username in ('bob', 'carol'):
+            user = structure_factories.UserFactory()
+            models.Profile.objects.create(user=user, username=username)
+            self.customer.add_user(user, structure_models.CustomerRole.OWNER)
+        self.customer.add_user(self.user, structure_models.CustomerRole.OWNER)
+
+        self.sync_changes()
+        self.assertEqual(self.freeipa.groups[self.customer_group]['users'], {'alice', 'bob', 'carol'})
+        self.assertEqual(len(self.freeipa.calls), 1)
+
+    def test_users_without_profile_are_skipped(self):
+        self.customer.add_user(structure_factories.UserFactory(), structure_models.CustomerRole.OWNER)
+        self.assertTrue(self.sync_changes())
+        self.assertEqual(self.freeipa.calls, [])
+
+    def test_full_synchronization_is_required_if_group_is_missing(self):
+        del self.freeipa.groups[self.project_group]
+        self.project.add_user(self.user, structure_models.ProjectRole.ADMINISTRATOR)
+
+        self.assertFalse(self.sync_changes())
+
+        FreeIPABackend().synchronize_groups()
+        self.assertEqual(self.freeipa.groups[self.project_group]['users'], {'alice'})
+
+    def test_full_synchronization_consumes_change_log(self):
+        self.customer.add_user(self.user, structure_models.CustomerRole.OWNER)
+        FreeIPABackend().synchronize_groups()
+
+        self.assertFalse(models.GroupChange.objects.exists())
+        self.assertEqual(self.freeipa.groups[self.customer_group]['users'], {'alice'})
+
+
+class GroupChangeDisabledTest(TestCase):
+    def test_changes_are_not_recorded_if_plugin_is_disabled(self):
+        customer = structure_factories.CustomerFactory()
+        customer.add_user(structure_factories.UserFactory(), structure_models.CustomerRole.OWNER)
+        self.assertFalse(models.GroupChange.objects.exists())
@@ -1,5 +1,6 @@
 from __future__ import unicode_literals, division
 
+import datetime
 import functools
 import logging
 import sys
@@ -12,8 +13,10 @@ from django.utils.dateparse import parse_datetime
 from django.utils.functional import cached_property
 from jira.client import _get_template_list
 from jira.utils import json_loads
+import pytz
 from rest_framework import status
 
+from waldur_core.core import utils as core_utils
 from waldur_core.core.models import StateMixin
 from waldur_core.structure import ServiceBackend, ServiceBackendError
 from waldur_core.structure.utils import update_pulled_fields
@@ -23,6 +26,10 @@ from . import models
 
 logger = logging.getLogger(__name__)
 
+# Issues updated slightly before watermark are pulled again, so that clock skew
+# between Waldur and JIRA does not lead to missed updates.
+ISSUE_SYNC_OVERLAP = datetime.timedelta(minutes=5)
+
 
 class JiraBackendError(ServiceBackendError):
     pass
@@ -429,37 +436,19 @@ class JiraBackend(ServiceBackend):
                          'because it has already been deleted on backend.', attachment.id)
 
     @reraise_exceptions
-    def import_project_issues(self, project, start_at=0, max_results=50, order=None):
-        waldur_issues = list(self.model_issue.objects.filter(project=project, backend_id__isnull=False).
-                             values_list('backend_id', flat=True))
-
-        jql = 'project=%s' % project.backend_id
-        if order:
-            jql += ' ORDER BY %s' % order
-
-        for backend_issue in self.manager.search_issues(jql, startAt=start_at, maxResults=max_results, fields='*all'):
-            key = backend_issue.key
-            if key in waldur_issues:
-                logger.debug('Skipping import of issue with key=%s, '
-                             'because it already exists in Waldur.', key)
-                continue
-
-            issue = self.model_issue(project=project, backend_id=key, state=StateMixin.States.OK)
-            self._backend_issue_to_issue(backend_issue, issue)
-            issue.save()
-
-            attachment_synchronizer = AttachmentSynchronizer(self, issue, backend_issue)
-            attachment_synchronizer.perform_update()
-
-            for backend_comment in backend_issue.fields.comment.comments:
-                tmp = issue.comments.model()
-                tmp.clean_message(backend_comment.body)
-                issue.comments.create(
-                    user=tmp.user,
-                    message=tmp.message,
-                    created=parse_datetime(backend_comment.created),
-                    backend_id=backend_comment.id,
-                    state=issue.comments.model.States.OK)
+    def import_project_issues(self, project, start_after=None, max_results=None):
+        """
+        Import issues of the project updated since the last synchronization in the order of keys.
+        If max_results is not specified, all issues are imported and synchronization watermark is moved forward.
+        :param start_after: key of the last issue imported by the previous batch
+        :return: key of the last imported issue or None if there are no issues left
+        """
+        started_at = timezone.now()
+        last_key = IssueImporter(self, project).run(start_after, max_results)
+        if max_results is None:
+            project.issues_synced_at = started_at
+            project.save(update_fields=['issues_synced_at'])
+        return last_key
 
     def _import_project(self, project_backend_id, service_project_link, state):
         backend_project = self.get_project(project_backend_id)
@@ -484,19 +473,26 @@ class JiraBackend(ServiceBackend):
 
     def import_project_batch(self, project):
         max_results = settings.WALDUR_JIRA.get('ISSUE_IMPORT_LIMIT')
-        start_at = project.action_details.get('current_issue', 0)
-        self.import_project_issues(project, order='id', start_at=start_at, max_results=max_results)
-
-        total_added = project.action_details.get('current_issue', 0) + max_results
-
-        if total_added >= project.action_details.get('issues_count', 0):
-            project.action_details['current_issue'] = project.action_details.get('issues_count', 0)
-            project.action_details['percentage'] = 100
+        details = project.action_details
+        # Issues updated after beginning of the synchronization are pulled next time
+        started_at = details.setdefault('started_at', timezone.now().isoformat())
+        last_issue = self.import_project_issues(
+            project, start_after=details.get('last_issue'), max_results=max_results)
+
+        issues_count = details.get('issues_count', 0)
+        current_issue = min(details.get('current_issue', 0) + max_results, issues_count)
+
+        if last_issue is None or current_issue >= issues_count:
+            details.pop('last_issue', None)
+            details.pop('started_at')
+            details['current_issue'] = issues_count
+            details['percentage'] = 100
+            project.issues_synced_at = parse_datetime(started_at)
             project.runtime_state = 'success'
         else:
-            project.action_details['current_issue'] = total_added
-            project.action_details['percentage'] = int((project.action_details['current_issue'] /
-                                                        project.action_details['issues_count']) * 100)
+            details['last_issue'] = last_issue
+            details['current_issue'] = current_issue
+            details['percentage'] = int((current_issue / issues_count) * 100)
 
         project.save()
         return max_results
@@ -570,27 +566,36 @@ class JiraBackend(ServiceBackend):
         project.name = backend_project.name
         project.description = backend_project.description
 
+    def _get_service_properties(self, model, project):
+        """
+        Service properties are loaded once per backend instance,
+        so that mapping of imported issues does not query them one by one.
+        """
+        cache = self.__dict__.setdefault('_service_properties', {})
+        if model not in cache:
+            cache[model] = {
+                obj.backend_id: obj
+                for obj in model.objects.filter(settings=project.service_project_link.service.settings)
+            }
+        return cache[model]
+
     def _get_or_create_priority(self, project, backend_priority):
-        try:
-            priority = models.Priority.objects.get(
-                settings=project.service_project_link.service.settings,
-                backend_id=backend_priority.id
-            )
-        except models.Priority.DoesNotExist:
+        priorities = self._get_service_properties(models.Priority, project)
+        priority = priorities.get(backend_priority.id)
+        if priority is None:
             priority = self.import_priority(backend_priority)
             priority.save()
+            priorities[priority.backend_id] = priority
         return priority
 
     def _get_or_create_issue_type(self, project, backend_issue_type):
-        try:
-            issue_type = models.IssueType.objects.get(
-                settings=project.service_project_link.service.settings,
-                backend_id=backend_issue_type.id
-            )
-        except models.IssueType.DoesNotExist:
+        issue_types = self._get_service_properties(models.IssueType, project)
+        issue_type = issue_types.get(backend_issue_type.id)
+        if issue_type is None:
             issue_type = self.import_issue_type(backend_issue_type)
             issue_type.save()
             project.issue_types.add(issue_type)
+            issue_types[issue_type.backend_id] = issue_type
         return issue_type
 
     def _get_resolution_sla(self, backend_issue):
@@ -627,9 +632,32 @@ class JiraBackend(ServiceBackend):
         response = self.manager._session.get(url)
         return response.json()
 
-    def get_issues_count(self, project_key):
+    @reraise_exceptions
+    def format_jql_datetime(self, value):
+        """
+        JQL does not accept timezone, dates are interpreted in timezone of JIRA user.
+        """
+        try:
+            tz = getattr(self, '_timezone')
+        except AttributeError:
+            try:
+                tz = pytz.timezone(self.manager.myself().get('timeZone'))
+            except pytz.UnknownTimeZoneError:
+                tz = pytz.utc
+            self._timezone = tz
+        return timezone.localtime(value, tz).strftime('%Y/%m/%d %H:%M')
+
+    def get_issues_jql(self, project_key, updated_since=None, start_after=None):
+        conditions = ['project = "%s"' % project_key]
+        if updated_since:
+            conditions.append('updated >= "%s"' % self.format_jql_datetime(updated_since - ISSUE_SYNC_OVERLAP))
+        if start_after:
+            conditions.append('key > "%s"' % start_after)
+        return ' AND '.join(conditions) + ' ORDER BY key ASC'
+
+    def get_issues_count(self, project_key, updated_since=None):
         base = '{server}/rest/{rest_path}/{rest_api_version}/{path}'
-        page_params = {'jql': 'project=%s' % project_key,
+        page_params = {'jql': self.get_issues_jql(project_key, updated_since),
                        'validateQuery': True,
                        'startAt': 0,
                        'fields': [],
@@ -644,6 +672,7 @@ class AttachmentSynchronizer(object):
         self.backend = backend
         self.current_issue = current_issue
         self.backend_issue = backend_issue
+        self.downloaded_files = {}
 
     def perform_update(self):
         if self.stale_attachment_ids:
@@ -718,6 +747,28 @@ class AttachmentSynchronizer(object):
 
         return True
 
+    def download_files(self):
+        """
+        Download files of new attachments and thumbnails of updated attachments in advance.
+        Database is not accessed if current attachments have been loaded already,
+        therefore it is safe to call this method from worker thread.
+        """
+        urls = [self.get_backend_attachment(attachment_id).content
+                for attachment_id in self.new_attachment_ids]
+        urls += [self.get_backend_attachment(attachment_id).thumbnail
+                 for attachment_id in self.updated_attachments_ids]
+        for url in urls:
+            try:
+                self.downloaded_files[url] = self._download_file(url)
+            except JIRAError:
+                # Error is reported when attachment is saved
+                pass
+
+    def _get_file(self, url):
+        if url in self.downloaded_files:
+            return self.downloaded_files.pop(url)
+        return self._download_file(url)
+
     def _download_file(self, url):
         """
         Download file from URL using secure JIRA session.
@@ -736,9 +787,9 @@ class AttachmentSynchronizer(object):
         thumbnail = getattr(backend_attachment, 'thumbnail', False) and getattr(attachment, 'thumbnail', False)
 
         try:
-            content = self._download_file(backend_attachment.content)
+            content = self._get_file(backend_attachment.content)
             if thumbnail:
-                thumbnail_content = self._download_file(backend_attachment.thumbnail)
+                thumbnail_content = self._get_file(backend_attachment.thumbnail)
 
         except JIRAError as error:
             logger.error('Unable to load attachment for issue with backend id {backend_id}. Error: {error}).'
@@ -760,7 +811,7 @@ class AttachmentSynchronizer(object):
 
     def _update_attachment(self, issue, backend_attachment, current_attachment):
         try:
-            content = self._download_file(backend_attachment.thumbnail)
+            content = self._get_file(backend_attachment.thumbnail)
         except JIRAError as error:
             logger.error('Unable to load attachment thumbnail for issue with backend id {backend_id}. Error: {error}).'
                          .format(backend_id=issue.backend_id, error=error))
@@ -810,3 +861,123 @@ class CommentSynchronizer(object):
     @cached_property
     def stale_comments_ids(self):
         return self.current_comments_ids - self.backend_comments_ids
+
+
+class IssueImporter(object):
+    """
+    Import issues of JIRA project together with their comments and attachments.
+
+    Issues are fetched page by page. Comments and attachments of the page are fetched
+    by bounded pool of threads, whereas database is accessed from the calling thread only:
+    issues and comments are stored with bulk upserts, so that unchanged rows are not written.
+    """
+    ISSUE_FIELDS = (
+        'type_id', 'priority_id', 'summary', 'description', 'status',
+        'resolution', 'resolution_date', 'resolution_sla',
+        'creator_name', 'creator_email', 'creator_username',
+        'reporter_name', 'reporter_email', 'reporter_username',
+        'assignee_name', 'assignee_email', 'assignee_username',
+    )
+    COMMENT_FIELDS = ('message', 'user_id')
+
+    def __init__(self, backend, project, page_size=50, workers=None):
+        self.backend = backend
+        self.project = project
+        self.page_size = page_size
+        if workers is None:
+            workers = settings.WALDUR_JIRA.get('ISSUE_IMPORT_WORKERS', 4)
+        self.workers = workers
+
+    def run(self, start_after=None, max_results=None):
+        """
+        Import issues updated since the last synchronization of the project.
+        Issues are ordered by key and pages are requested starting after the last seen key,
+        so that issues updated or deleted meanwhile do not shift the pages.
+        :return: key of the last imported issue or None if there are no issues left
+        """
+        last_key = start_after
+        imported = 0
+        while max_results is None or imported < max_results:
+            page_size = self.page_size
+            if max_results is not None:
+                page_size = min(page_size, max_results - imported)
+
+            jql = self.backend.get_issues_jql(self.project.backend_id, self.project.issues_synced_at, last_key)
+            backend_issues = self.backend.manager.search_issues(
+                jql, startAt=0, maxResults=page_size, fields='*all')
+            if backend_issues:
+                self.import_issues(backend_issues)
+                imported += len(backend_issues)
+                last_key = backend_issues[-1].key
+            if len(backend_issues) < page_size:
+                return None
+        return last_key
+
+    def import_issues(self, backend_issues):
+        issues = self.save_issues(backend_issues)
+        # Attachments are prefetched, so that synchronizers do not access database from worker threads
+        synchronizers = [AttachmentSynchronizer(self.backend, issues[backend_issue.key], backend_issue)
+                         for backend_issue in backend_issues]
+
+        def fetch(synchronizer):
+            synchronizer.download_files()
+            return self.get_backend_comments(synchronizer.backend_issue)
+
+        backend_comments = core_utils.concurrent_map(fetch, synchronizers, self.workers)
+        self.save_comments(issues, backend_issues, backend_comments)
+
+        for synchronizer in synchronizers:
+            synchronizer.perform_update()
+
+    def save_issues(self, backend_issues):
+        """
+        :return: dict mapping issue key to stored issue
+        """
+        model = self.backend.model_issue
+        issues = []
+        for backend_issue in backend_issues:
+            issue = model(project=self.project, backend_id=backend_issue.key, state=StateMixin.States.OK)
+            self.backend._backend_issue_to_issue(backend_issue, issue)
+            issues.append(issue)
+
+        core_utils.bulk_upsert(model, issues, ('project_id', 'backend_id'), self.ISSUE_FIELDS)
+        rows = model.objects.filter(
+            project=self.project,
+            backend_id__in=[backend_issue.key for backend_issue in backend_issues],
+        ).prefetch_related('attachments')
+        return {row.backend_id: row for row in rows}
+
+    def get_backend_comments(self, backend_issue):
+        field = getattr(backend_issue.fields, 'comment', None)
+        comments = getattr(field, 'comments', [])
+        if getattr(field, 'total', len(comments)) > len(comments):
+            # Search results contain only the first page of comments
+            comments = self.backend.manager.comments(backend_issue.key)
+        return comments
+
+    @transaction.atomic()
+    def save_comments(self, issues, backend_issues, backend_comments):
+        model = self.backend.model_comment
+        comments = []
+        for backend_issue, issue_comments in zip(backend_issues, backend_comments):
+            issue = issues[backend_issue.key]
+            for backend_comment in issue_comments:
+                comment = model(
+                    issue=issue,
+                    backend_id=backend_comment.id,
+                    created=parse_datetime(backend_comment.created),
+                    state=StateMixin.States.OK,
+                )
+                self.backend._backend_comment_to_comment(backend_comment, comment)
+                comments.append(comment)
+
+        core_utils.bulk_upsert(model, comments, ('issue_id', 'backend_id'), self.COMMENT_FIELDS)
+
+        # Comments which are not created on backend yet are skipped
+        current_comments = model.objects.filter(
+            issue__in=issues.values(), backend_id__isnull=False).values_list('pk', 'issue_id', 'backend_id')
+        pulled_comments = {(comment.issue_id, comment.backend_id) for comment in comments}
+        stale_comments = [pk for pk, issue_id, backend_id in current_comments
+                          if (issue_id, backend_id) not in pulled_comments]
+        if stale_comments:
+            model.objects.filter(pk__in=stale_comments).delete()
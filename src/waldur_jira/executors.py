@@ -124,12 +124,11 @@ class ProjectPullExecutor(executors.ActionExecutor):
 
     @classmethod
     def get_action_details(cls, project, **kwargs):
-        if 'issues_count' not in project.action_details:
-            backend = project.get_backend()
-            issues_count = backend.get_issues_count(project.backend_id)
-            return {'issues_count': issues_count,
-                    'current_issue': 0,
-                    'percentage': 0}
+        backend = project.get_backend()
+        issues_count = backend.get_issues_count(project.backend_id, updated_since=project.issues_synced_at)
+        return {'issues_count': issues_count,
+                'current_issue': 0,
+                'percentage': 0}
 
     @classmethod
     def get_task_signature(cls, project, serialized_project, **kwargs):
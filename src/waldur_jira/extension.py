@@ -14,7 +14,9 @@ class JiraExtension(WaldurExtension):
             'ISSUE': {
                 'resolution_sla_field': 'Time to resolution',
             },
-            'ISSUE_IMPORT_LIMIT': 10
+            'ISSUE_IMPORT_LIMIT': 10,
+            # Number of threads fetching comments and attachments of imported issues
+            'ISSUE_IMPORT_WORKERS': 4,
         }
 
     @staticmethod
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('waldur_jira', '0019_immutable_default_json'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='issues_synced_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Issues updated since this moment are pulled on next synchronization.', null=True),
+        ),
+    ]
@@ -55,6 +55,9 @@ class Project(structure_models.NewResource, core_models.RuntimeStateMixin):
     template = models.ForeignKey(ProjectTemplate, blank=True, null=True)
     action = models.CharField(max_length=50, blank=True)
     action_details = JSONField(default=dict)
+    issues_synced_at = models.DateTimeField(
+        blank=True, null=True, editable=False,
+        help_text=_('Issues updated since this moment are pulled on next synchronization.'))
 
     def get_backend(self):
         return super(Project, self).get_backend(project=self.backend_id)
@@ -0,0 +1,127 @@
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+import datetime
+import re
+
+from django.utils import timezone
+import pytz
+
+
+class Resource(object):
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class FakeResponse(object):
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession(object):
+    def __init__(self, jira):
+        self.jira = jira
+
+    def get(self, url):
+        self.jira.calls.append(('download', url))
+        return FakeResponse(self.jira.files[url])
+
+
+def get_key_order(key):
+    project, number = key.rsplit('-', 1)
+    return project, int(number)
+
+
+class FakeJira(object):
+    """
+    In-memory stand-in for JIRA client.
+    It supports JQL queries issued by issue importer and records all calls.
+    """
+    JQL_DATETIME_FORMAT = '%Y/%m/%d %H:%M'
+
+    def __init__(self, time_zone='UTC', comments_page_size=50):
+        self.time_zone = time_zone
+        # Search results contain only the first page of comments
+        self.comments_page_size = comments_page_size
+        self.issues = OrderedDict()
+        self.files = {}
+        self.calls = []
+        self._session = FakeSession(self)
+        self.priority = Resource(id='1', name='Major', description='', iconUrl='')
+        self.issue_type = Resource(id='1', name='Task', description='', iconUrl='', subtask=False)
+
+    def add_issue(self, key, summary='', updated=None, comments=(), attachments=()):
+        self.issues[key] = dict(
+            key=key,
+            summary=summary,
+            updated=updated or timezone.now(),
+            comments=[Resource(id=str(comment_id), body=body, created='2018-01-01T10:00:00.000+0000')
+                      for comment_id, body in comments],
+            attachments=[],
+        )
+        for attachment_id, content in attachments:
+            self.add_attachment(key, attachment_id, content)
+
+    def add_attachment(self, key, attachment_id, content):
+        url = 'http://jira/attachment/%s' % attachment_id
+        self.files[url] = content
+        self.issues[key]['attachments'].append(
+            Resource(id=attachment_id, filename='file-%s.txt' % attachment_id, content=url))
+
+    def update_issue(self, key, **kwargs):
+        self.issues[key].update(kwargs, updated=timezone.now())
+
+    def myself(self):
+        return {'name': 'admin', 'timeZone': self.time_zone}
+
+    def fields(self):
+        return [{'id': 'customfield_10138', 'clauseNames': ['Time to resolution'], 'name': 'Time to resolution'}]
+
+    def search_issues(self, jql, startAt=0, maxResults=50, fields=None):
+        self.calls.append(('search_issues', jql))
+        issues = self._filter_issues(jql)
+        return [self._to_resource(issue) for issue in issues[startAt:startAt + maxResults]]
+
+    def comments(self, key):
+        self.calls.append(('comments', key))
+        return list(self.issues[key]['comments'])
+
+    def _get_json(self, path, params=None, base=None):
+        return {'total': len(self._filter_issues(params['jql']))}
+
+    def _filter_issues(self, jql):
+        project = re.search(r'project = "([^"]+)"', jql).group(1)
+        issues = [issue for issue in self.issues.values() if issue['key'].startswith(project + '-')]
+
+        updated = re.search(r'updated >= "([^"]+)"', jql)
+        if updated:
+            tz = pytz.timezone(self.time_zone)
+            updated_since = tz.localize(datetime.datetime.strptime(updated.group(1), self.JQL_DATETIME_FORMAT))
+            issues = [issue for issue in issues if issue['updated'] >= updated_since]
+
+        start_after = re.search(r'key > "([^"]+)"', jql)
+        if start_after:
+            start_after = get_key_order(start_after.group(1))
+            issues = [issue for issue in issues if get_key_order(issue['key']) > start_after]
+
+        return sorted(issues, key=lambda issue: get_key_order(issue['key']))
+
+    def _to_resource(self, issue):
+        comments = issue['comments']
+        return Resource(
+            key=issue['key'],
+            fields=Resource(
+                summary=issue['summary'],
+                description='',
+                status=Resource(name='Open'),
+                resolution=None,
+                resolutiondate=None,
+                priority=self.priority,
+                issuetype=self.issue_type,
+                comment=Resource(comments=comments[:self.comments_page_size], total=len(comments)),
+                attachment=list(issue['attachments']),
+            ),
+        )
@@ -0,0 +1,115 @@
+from __future__ import unicode_literals
+
+import datetime
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.utils import timezone
+import mock
+
+from waldur_jira import models
+
+from . import fixtures
+from .helpers import FakeJira
+
+
+class IssueImportTest(TestCase):
+    def setUp(self):
+        self.jira = FakeJira()
+        patcher = mock.patch('waldur_jira.backend.JIRA', return_value=self.jira)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.fixture = fixtures.JiraFixture()
+        self.project = self.fixture.jira_project
+        self.project.backend_id = 'TST'
+        self.project.save()
+
+        yesterday = timezone.now() - datetime.timedelta(days=1)
+        self.jira.add_issue('TST-1', 'First issue', yesterday, comments=[(1, 'Hello'), (2, 'World')])
+        self.jira.add_issue('TST-2', 'Second issue', yesterday)
+        self.jira.add_issue('TST-10', 'Third issue', yesterday, attachments=[('1', b'content')])
+
+    def import_issues(self, **kwargs):
+        self.jira.calls = []
+        return self.project.get_backend().import_project_issues(self.project, **kwargs)
+
+    def get_summaries(self):
+        return dict(models.Issue.objects.filter(project=self.project).values_list('backend_id', 'summary'))
+
+    def test_issues_are_imported_with_comments_and_attachments(self):
+        self.import_issues()
+
+        self.assertEqual(self.get_summaries(), {
+            'TST-1': 'First issue',
+            'TST-2': 'Second issue',
+            'TST-10': 'Third issue',
+        })
+        self.assertEqual(set(models.Comment.objects.filter(issue__backend_id='TST-1')
+                             .values_list('message', flat=True)), {'Hello', 'World'})
+        attachment = models.Attachment.objects.get(issue__backend_id='TST-10')
+        self.assertEqual(attachment.file.read(), b'content')
+
+    def test_only_issues_updated_since_last_synchronization_are_pulled(self):
+        self.import_issues()
+        self.project.refresh_from_db()
+        self.assertIsNotNone(self.project.issues_synced_at)
+
+        self.jira.update_issue('TST-2', summary='Updated issue')
+        self.import_issues()
+
+        self.assertIn('updated >=', self.jira.calls[0][1])
+        self.assertEqual(self.get_summaries()['TST-2'], 'Updated issue')
+        self.assertEqual(models.Issue.objects.filter(project=self.project).count(), 3)
+
+    def test_comments_of_updated_issue_are_synchronized(self):
+        self.import_issues()
+
+        self.jira.update_issue('TST-1', comments=self.jira.issues['TST-1']['comments'][1:])
+        self.import_issues()
+
+        self.assertEqual(list(models.Comment.objects.filter(issue__backend_id='TST-1')
+                              .values_list('message', flat=True)), ['World'])
+
+    def test_all_comments_are_fetched_if_search_results_are_truncated(self):
+        self.jira.comments_page_size = 1
+        self.import_issues()
+
+        self.assertIn(('comments', 'TST-1'), self.jira.calls)
+        self.assertEqual(models.Comment.objects.filter(issue__backend_id='TST-1').count(), 2)
+
+    def test_issues_are_imported_in_batches(self):
+        last_key = self.import_issues(max_results=2)
+        self.assertEqual(last_key, 'TST-2')
+        self.assertEqual(set(self.get_summaries()), {'TST-1', 'TST-2'})
+
+        self.assertIsNone(self.import_issues(start_after=last_key, max_results=2))
+        self.assertEqual(set(self.get_summaries()), {'TST-1', 'TST-2', 'TST-10'})
+
+        # Watermark is moved forward only after full synchronization
+        self.project.refresh_from_db()
+        self.assertIsNone(self.project.issues_synced_at)
+
+    def test_batch_import_reports_progress(self):
+        self.project.action_details = {'issues_count': 3, 'current_issue': 0, 'percentage': 0}
+        backend = self.project.get_backend()
+
+        with self.settings(WALDUR_JIRA=dict(settings.WALDUR_JIRA, ISSUE_IMPORT_LIMIT=2)):
+            backend.import_project_batch(self.project)
+            self.assertEqual(self.project.action_details['percentage'], 66)
+            self.assertNotEqual(self.project.runtime_state, 'success')
+
+            backend.import_project_batch(self.project)
+            self.assertEqual(self.project.action_details['percentage'], 100)
+            self.assertEqual(self.project.runtime_state, 'success')
+
+        self.assertEqual(len(self.get_summaries()), 3)
+        self.assertIsNotNone(self.project.issues_synced_at)
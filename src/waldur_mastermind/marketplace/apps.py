@@ -43,6 +43,24 @@ class MarketplaceConfig(AppConfig):
             dispatch_uid='waldur_mastermind.marketplace.update_category_quota_when_offering_is_deleted',
         )
 
+        signals.post_save.connect(
+            handlers.update_offering_attribute_values,
+            sender=models.Offering,
+            dispatch_uid='waldur_mastermind.marketplace.update_offering_attribute_values',
+        )
+
+        signals.post_save.connect(
+            handlers.clear_usage_components_cache,
+            sender=models.OfferingComponent,
+            dispatch_uid='waldur_mastermind.marketplace.clear_usage_components_cache_after_component_saved',
+        )
+
+        signals.post_delete.connect(
+            handlers.clear_usage_components_cache,
+            sender=models.OfferingComponent,
+            dispatch_uid='waldur_mastermind.marketplace.clear_usage_components_cache_after_component_deleted',
+        )
+
         quota_signals.recalculate_quotas.connect(
             handlers.update_category_offerings_count,
             dispatch_uid='waldur_mastermind.marketplace.update_category_offerings_count',
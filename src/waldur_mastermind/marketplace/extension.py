@@ -16,7 +16,9 @@ class MarketplaceExtension(WaldurExtension):
             'ORDER_LINK_TEMPLATE': 'https://www.example.com/#/projects/'
                                    '{project_uuid}/marketplace-order-list/',
             'ORDER_ITEM_LINK_TEMPLATE': 'https://www.example.com/#/projects/{project_uuid}/'
-                                        'marketplace-order-item-details/{order_item_uuid}/'
+                                        'marketplace-order-item-details/{order_item_uuid}/',
+            'PDF_RENDERING_WORKERS': 4,
+            'USAGE_COMPONENTS_CACHE_TIMEOUT': 60 * 60,
         }
 
     @staticmethod
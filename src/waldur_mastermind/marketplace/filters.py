@@ -2,13 +2,14 @@ import json
 
 from django.db.models import Q
 import django_filters
+import six
 from django.utils.translation import ugettext_lazy as _
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import exceptions as rf_exceptions
 
 from waldur_core.core import filters as core_filters
 
-from . import models
+from . import models, utils
 
 
 class ServiceProviderFilter(django_filters.FilterSet):
@@ -48,13 +49,29 @@ class OfferingFilter(django_filters.FilterSet):
             raise rf_exceptions.ValidationError(_('Filter attribute should be an dict.'))
 
         for k, v in value.items():
-            if isinstance(v, list):
-                # If a filter value is a list, use multiple choice.
-                queryset = queryset.filter(**{'attributes__{key}__has_any_keys'.format(key=k): v})
-            else:
-                queryset = queryset.filter(attributes__contains={k: v})
+            queryset = self._filter_attribute(queryset, k, v)
         return queryset
 
+    def _filter_attribute(self, queryset, key, value):
+        """
+        Translate attribute lookup into semi-join against attribute index table.
+        If value does not fit into index, JSON field lookup is used instead.
+        """
+        max_length = models.OfferingAttributeValue.MAX_VALUE_LENGTH
+        if isinstance(value, list):
+            # If a filter value is a list, use multiple choice.
+            encoded_values = [utils.encode_attribute_value(six.text_type(item)) for item in value]
+            if any(len(encoded_value) > max_length for encoded_value in encoded_values):
+                return queryset.filter(**{'attributes__{key}__has_any_keys'.format(key=key): value})
+            rows = models.OfferingAttributeValue.objects.filter(key=key, value__in=encoded_values)
+        else:
+            encoded_value = utils.encode_attribute_value(value)
+            if len(encoded_value) > max_length:
+                return queryset.filter(attributes__contains={key: value})
+            rows = models.OfferingAttributeValue.objects.filter(key=key, value=encoded_value, is_list=False)
+
+        return queryset.filter(pk__in=rows.values('offering_id'))
+
     class Meta(object):
         model = models.Offering
         fields = ['shared', 'type']
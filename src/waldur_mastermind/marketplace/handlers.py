@@ -3,7 +3,7 @@ from __future__ import unicode_literals
 from django.db.models import Count
 from django.db import transaction
 
-from . import tasks, models
+from . import tasks, models, utils
 
 
 def create_screenshot_thumbnail(sender, instance, created=False, **kwargs):
@@ -65,6 +65,17 @@ def update_category_quota_when_offering_is_deleted(sender, instance, **kwargs):
         instance.category.add_quota_usage(models.Category.Quotas.offering_count, -1, fail_silently=True)
 
 
+def update_offering_attribute_values(sender, instance, created=False, **kwargs):
+    if not created and not instance.tracker.has_changed('attributes'):
+        return
+
+    utils.update_offering_attribute_values(instance)
+
+
+def clear_usage_components_cache(sender, instance, **kwargs):
+    utils.clear_usage_components_cache(instance.offering_id)
+
+
 def update_category_offerings_count(sender, **kwargs):
     for category in models.Category.objects.all():
         value = models.Offering.objects.filter(category=category,
@@ -0,0 +1,79 @@
+from __future__ import unicode_literals
+
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from waldur_core.structure import models as structure_models
+from waldur_mastermind.marketplace import models, serializers, utils
+
+
+class Command(BaseCommand):
+    help = ('Measure throughput of component usage ingestion. '
+            'Synthetic data is created in transaction which is rolled back afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--resources', type=int, default=1000,
+                            help='Number of resources in usage report.')
+        parser.add_argument('--components', type=int, default=3,
+                            help='Number of usage-based components per offering.')
+        parser.add_argument('--rounds', type=int, default=3,
+                            help='Number of times the same report is submitted.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            usages = self.create_fixture(options['resources'], options['components'])
+            self.stdout.write('Submitting %s usages of %s resources' % (len(usages), options['resources']))
+
+            for index in range(options['rounds']):
+                with CaptureQueriesContext(connection) as context:
+                    start = time.time()
+                    serializer = serializers.PublicListComponentUsageSerializer(data={'usages': usages})
+                    serializer.is_valid(raise_exception=True)
+                    created, updated = utils.save_component_usages(serializer.validated_data['usages'])
+                    elapsed = time.time() - start
+
+                self.stdout.write(
+                    'Round %s: %.3f seconds, %.0f usages per second, %s queries, %s created, %s updated' % (
+                        index + 1, elapsed, len(usages) / elapsed, len(context.captured_queries),
+                        len(created), len(updated)))
+
+            transaction.set_rollback(True)
+
+    def create_fixture(self, resources_count, components_count):
+        customer = structure_models.Customer.objects.create(name='Benchmark customer')
+        project = structure_models.Project.objects.create(name='Benchmark project', customer=customer)
+        category = models.Category.objects.create(title='Benchmark category')
+        offering = models.Offering.objects.create(
+            name='Benchmark offering', category=category, customer=customer, type='Benchmark')
+        plan = models.Plan.objects.create(name='Benchmark plan', offering=offering)
+
+        component_types = ['component_%s' % index for index in range(components_count)]
+        for component_type in component_types:
+            models.OfferingComponent.objects.create(
+                offering=offering,
+                type=component_type,
+                name=component_type,
+                measured_unit='units',
+                billing_type=models.OfferingComponent.BillingTypes.USAGE,
+            )
+
+        models.Resource.objects.bulk_create([
+            models.Resource(project=project, offering=offering, plan=plan)
+            for _ in range(resources_count)
+        ])
+
+        today = datetime.date.today()
+        return [
+            {
+                'resource': resource_uuid.hex,
+                'type': component_type,
+                'date': today,
+                'amount': 1,
+            }
+            for resource_uuid in models.Resource.objects.filter(offering=offering).values_list('uuid', flat=True)
+            for component_type in component_types
+        ]
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import base64
+
+from django.core.files.base import ContentFile
+from django.db import migrations, models
+
+
+def move_order_files_to_storage(apps, schema_editor):
+    Order = apps.get_model('marketplace', 'Order')
+
+    orders = Order.objects.exclude(_file='').only('id', 'uuid', '_file')
+    for order in orders.iterator():
+        content = base64.b64decode(order._file)
+        filename = 'marketplace_order_{}.pdf'.format(order.uuid)
+        order.file.save(filename, ContentFile(content), save=False)
+        order.save(update_fields=['file'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0048_add_request_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='file',
+            field=models.FileField(blank=True, editable=False, null=True, upload_to='marketplace_order_details'),
+        ),
+        migrations.RunPython(move_order_files_to_storage, reverse_code=migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='order',
+            name='_file',
+        ),
+    ]
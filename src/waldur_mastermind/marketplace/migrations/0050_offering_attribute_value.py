@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import json
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+MAX_VALUE_LENGTH = 255
+
+
+def fill_offering_attribute_values(apps, schema_editor):
+    Offering = apps.get_model('marketplace', 'Offering')
+    OfferingAttributeValue = apps.get_model('marketplace', 'OfferingAttributeValue')
+
+    values = []
+    for offering in Offering.objects.exclude(attributes={}).only('id', 'attributes').iterator():
+        for key, value in offering.attributes.items():
+            if isinstance(value, list):
+                items = [(json.dumps(item, sort_keys=True), True) for item in value]
+            else:
+                items = [(json.dumps(value, sort_keys=True), False)]
+
+            for encoded_value, is_list in items:
+                if len(encoded_value) > MAX_VALUE_LENGTH:
+                    continue
+                values.append(OfferingAttributeValue(
+                    offering_id=offering.id,
+                    key=key,
+                    value=encoded_value,
+                    is_list=is_list,
+                ))
+
+    OfferingAttributeValue.objects.bulk_create(values, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0049_order_file_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OfferingAttributeValue',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255)),
+                ('value', models.CharField(max_length=255)),
+                ('is_list', models.BooleanField(default=False)),
+                ('offering', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attribute_values', to='marketplace.Offering')),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name='offeringattributevalue',
+            index_together=set([('key', 'value')]),
+        ),
+        migrations.RunPython(fill_offering_attribute_values, reverse_code=migrations.RunPython.noop),
+    ]
@@ -1,8 +1,6 @@
 from __future__ import unicode_literals
 
-import base64
 from decimal import Decimal
-import StringIO
 
 from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
@@ -262,6 +260,24 @@ class Offering(core_models.UuidMixin,
         return {component.type: component for component in components}
 
 
+class OfferingAttributeValue(models.Model):
+    """
+    Denormalized copy of offering attributes which allows to filter offerings
+    and aggregate facets using btree indexes instead of JSON containment lookups.
+    Each item of list attribute is stored as separate row with is_list flag set.
+    Values are stored JSON-encoded so that type of scalar value is preserved.
+    """
+    MAX_VALUE_LENGTH = 255
+
+    offering = models.ForeignKey(Offering, related_name='attribute_values', on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    value = models.CharField(max_length=MAX_VALUE_LENGTH)
+    is_list = models.BooleanField(default=False)
+
+    class Meta(object):
+        index_together = ('key', 'value')
+
+
 class OfferingComponent(core_models.DescribableMixin):
     class Meta(object):
         unique_together = ('type', 'offering')
@@ -415,7 +431,7 @@ class Order(core_models.UuidMixin, TimeStampedModel):
     state = FSMIntegerField(default=States.REQUESTED_FOR_APPROVAL, choices=States.CHOICES)
     total_cost = models.DecimalField(max_digits=22, decimal_places=10, null=True, blank=True)
     tracker = FieldTracker()
-    _file = models.TextField(blank=True, editable=False)
+    file = models.FileField(upload_to='marketplace_order_details', blank=True, null=True, editable=False)
 
     class Permissions(object):
         customer_path = 'project__customer'
@@ -462,20 +478,8 @@ class Order(core_models.UuidMixin, TimeStampedModel):
 
         return users and users.distinct()
 
-    @property
-    def file(self):
-        if not self._file:
-            return
-
-        content = base64.b64decode(self._file)
-        return StringIO.StringIO(content)
-
-    @file.setter
-    def file(self, value):
-        self._file = value
-
     def has_file(self):
-        return bool(self._file)
+        return bool(self.file)
 
     def get_filename(self):
         return 'marketplace_order_{}.pdf'.format(self.uuid)
@@ -695,57 +695,64 @@ class ServiceProviderSignatureSerializer(serializers.Serializer):
 
 
 class PublicComponentUsageSerializer(serializers.Serializer):
-    resource = serializers.SlugRelatedField(queryset=models.Resource.objects.all(), slug_field='uuid')
+    resource = serializers.UUIDField()
     date = serializers.DateField()
     type = serializers.CharField()
     amount = serializers.IntegerField()
 
-    def validate(self, attrs):
-        resource = attrs['resource']
-        date = attrs['date']
-        plan = resource.plan
-        if not plan:
-            raise rf_exceptions.ValidationError({
-                'resource': _('Resource does not have billing plan.')
-            })
+    def validate_date(self, date):
+        if date > datetime.date.today():
+            raise rf_exceptions.ValidationError(_('Invalid date value.'))
+        return date
 
-        offering = plan.offering
 
-        if date > datetime.date.today():
-            raise rf_exceptions.ValidationError({'date': _('Invalid date value.')})
+class PublicListComponentUsageSerializer(serializers.Serializer):
+    usages = PublicComponentUsageSerializer(many=True)
 
-        try:
-            component = models.OfferingComponent.objects.get(
-                offering=offering,
-                type=attrs['type'],
-                billing_type=models.OfferingComponent.BillingTypes.USAGE,
-            )
-        except models.OfferingComponent.DoesNotExist:
-            raise rf_exceptions.ValidationError(_('Component "%s" is not found.') % attrs['type'])
-
-        if models.ComponentUsage.objects.filter(resource=resource,
-                                                component=component,
-                                                date=attrs['date']).exists():
-            raise rf_exceptions.ValidationError({
-                'date': _('Component usage for provided billing period already exists.')
-            })
+    def validate_usages(self, usages):
+        """
+        Resources and components are resolved once for the whole batch
+        so that number of queries does not depend on number of usages.
+        """
+        resource_uuids = set(usage['resource'].hex for usage in usages)
+        resources = models.Resource.objects.filter(uuid__in=resource_uuids).select_related('plan')
+        resources_map = {resource.uuid.hex: resource for resource in resources}
+        components_map = utils.get_usage_components_map(
+            resource.plan.offering_id for resource in resources_map.values() if resource.plan)
 
-        attrs['component'] = component
+        errors = [self._validate_usage(usage, resources_map, components_map) for usage in usages]
+        if any(errors):
+            raise rf_exceptions.ValidationError(errors)
 
+        return usages
+
+    def _validate_usage(self, usage, resources_map, components_map):
+        resource = resources_map.get(usage['resource'].hex)
+        if not resource:
+            return {'resource': _('Resource is not found.')}
+
+        plan = resource.plan
+        if not plan:
+            return {'resource': _('Resource does not have billing plan.')}
+
+        component_id = components_map[plan.offering_id].get(usage['type'])
+        if not component_id:
+            return {'type': _('Component "%s" is not found.') % usage['type']}
+
+        usage['resource'] = resource
+        usage['component_id'] = component_id
+
+        date = usage['date']
         if plan.unit == UnitPriceMixin.Units.PER_MONTH:
-            attrs['date'] = datetime.date(year=date.year, month=date.month, day=1)
+            usage['date'] = datetime.date(year=date.year, month=date.month, day=1)
 
         if plan.unit == UnitPriceMixin.Units.PER_HALF_MONTH:
             if date.day < 16:
-                attrs['date'] = datetime.date(year=date.year, month=date.month, day=1)
+                usage['date'] = datetime.date(year=date.year, month=date.month, day=1)
             else:
-                attrs['date'] = datetime.date(year=date.year, month=date.month, day=16)
-
-        return attrs
+                usage['date'] = datetime.date(year=date.year, month=date.month, day=16)
 
-
-class PublicListComponentUsageSerializer(serializers.Serializer):
-    usages = PublicComponentUsageSerializer(many=True)
+        return {}
 
 
 def get_is_service_provider(serializer, scope):
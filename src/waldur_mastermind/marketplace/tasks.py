@@ -50,5 +50,5 @@ def create_order_pdf(order_id):
 
 @shared_task
 def create_pdf_for_all():
-    for order in models.Order.objects.all():
-        utils.create_order_pdf(order)
+    orders = models.Order.objects.all().select_related('project', 'created_by', 'approved_by')
+    utils.create_order_pdfs(orders.iterator())
@@ -51,10 +51,51 @@ class TestPublicComponentUsageApi(PostgreSQLTest):
         response = self.client.post('/api/marketplace-public-api/set_usage/', payload)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
-    def test_not_create_usage_if_usage_exists(self):
+    def test_usage_submission_is_idempotent(self):
         payload = self.get_valid_payload()
         self.client.post('/api/marketplace-public-api/set_usage/', payload)
         response = self.client.post('/api/marketplace-public-api/set_usage/', payload)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(models.ComponentUsage.objects.filter(resource=self.resource).count(), 1)
+
+    def test_existing_usage_is_updated(self):
+        self.client.post('/api/marketplace-public-api/set_usage/', self.get_valid_payload())
+        response = self.client.post('/api/marketplace-public-api/set_usage/', self.get_valid_payload(amount=10))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        usage = models.ComponentUsage.objects.get(resource=self.resource)
+        self.assertEqual(usage.usage, 10)
+
+    def test_usages_of_several_resources_are_created_in_one_batch(self):
+        resource = models.Resource.objects.create(
+            offering=self.plan.offering,
+            plan=self.plan,
+            project=structure_factories.ProjectFactory()
+        )
+        data = {
+            'usages': [
+                {
+                    'date': datetime.date.today(),
+                    'type': 'cpu',
+                    'amount': 5,
+                    'resource': self.resource.uuid,
+                },
+                {
+                    'date': datetime.date.today(),
+                    'type': 'cpu',
+                    'amount': 7,
+                    'resource': resource.uuid,
+                },
+            ]
+        }
+        response = self.client.post('/api/marketplace-public-api/set_usage/', self.get_payload(data))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(models.ComponentUsage.objects.get(resource=resource).usage, 7)
+        self.assertEqual(models.ComponentUsage.objects.get(resource=self.resource).usage, 5)
+
+    def test_not_create_usage_if_resource_not_exists(self):
+        payload = self.get_valid_payload()
+        self.resource.delete()
+        response = self.client.post('/api/marketplace-public-api/set_usage/', payload)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
     @freeze_time('2017-01-18 00:00:00')
@@ -75,16 +116,18 @@ class TestPublicComponentUsageApi(PostgreSQLTest):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertFalse(models.ComponentUsage.objects.filter().exists())
 
-    def get_valid_payload(self):
+    def get_valid_payload(self, amount=5):
         data = {
             'usages': [{
                 'date': datetime.date.today(),
                 'type': 'cpu',
-                'amount': 5,
+                'amount': amount,
                 'resource': self.resource.uuid
             }]
         }
+        return self.get_payload(data)
 
+    def get_payload(self, data):
         payload = dict(
             customer=self.service_provider.customer.uuid,
             signature=utils.get_api_signature(data, self.secret_code),
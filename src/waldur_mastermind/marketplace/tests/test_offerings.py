@@ -82,6 +82,43 @@ class OfferingFilterTest(PostgreSQLTest):
         })})
         self.assertEqual(len(response.data), 2)
 
+    def test_filter_boolean_does_not_match_string(self):
+        factories.OfferingFactory(attributes={'dedicated': True})
+        factories.OfferingFactory(attributes={'dedicated': 'true'})
+        response = self.client.get(self.url, {'attributes': json.dumps({
+            'dedicated': True,
+        })})
+        self.assertEqual(len(response.data), 1)
+
+    def test_attribute_index_is_updated_when_offering_is_saved(self):
+        self.offering.attributes = {'cloudDeploymentModel': 'public_cloud'}
+        self.offering.save()
+
+        response = self.client.get(self.url, {'attributes': json.dumps({
+            'cloudDeploymentModel': 'public_cloud',
+        })})
+        self.assertEqual(len(response.data), 1)
+        self.assertFalse(models.OfferingAttributeValue.objects.filter(
+            offering=self.offering, key='userSupportOption').exists())
+
+    def test_facets_are_counted_for_filtered_offerings(self):
+        factories.OfferingFactory(attributes={
+            'cloudDeploymentModel': 'private_cloud',
+            'userSupportOption': ['phone', 'email'],
+        })
+        factories.OfferingFactory(attributes={
+            'cloudDeploymentModel': 'public_cloud',
+        })
+        response = self.client.get(factories.OfferingFactory.get_list_url('facets'), {
+            'attributes': json.dumps({'cloudDeploymentModel': 'private_cloud'}),
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [
+            {'key': 'cloudDeploymentModel', 'value': 'private_cloud', 'count': 2},
+            {'key': 'userSupportOption', 'value': 'email', 'count': 1},
+            {'key': 'userSupportOption', 'value': 'phone', 'count': 2},
+        ])
+
     def test_shared_offerings_are_available_for_all_users(self):
         # Arrange
         factories.OfferingFactory(customer=self.fixture.customer, shared=False)
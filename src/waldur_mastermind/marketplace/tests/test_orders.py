@@ -11,7 +11,7 @@ from waldur_mastermind.marketplace.base import override_marketplace_settings
 from waldur_mastermind.marketplace.tests.factories import OFFERING_OPTIONS
 
 from . import factories
-from .. import models
+from .. import models, utils
 
 
 @ddt
@@ -348,3 +348,38 @@ class OrderStateTest(PostgreSQLTest):
         order_item.save()
         order.refresh_from_db()
         self.assertEqual(order.state, models.Order.States.EXECUTING)
+
+
+@mock.patch('waldur_mastermind.marketplace.utils.pdfkit')
+class OrderPdfTest(PostgreSQLTest):
+    def setUp(self):
+        self.fixture = fixtures.ProjectFixture()
+        self.order = factories.OrderFactory(project=self.fixture.project,
+                                            created_by=self.fixture.owner)
+
+    def test_pdf_is_stored_in_file_storage(self, mock_pdfkit):
+        mock_pdfkit.from_string.return_value = b'PDF'
+        utils.create_order_pdf(self.order)
+        self.order.refresh_from_db()
+        self.assertTrue(self.order.has_file())
+        self.assertEqual(self.order.file.read(), b'PDF')
+
+    def test_pdf_is_served_as_stream(self, mock_pdfkit):
+        mock_pdfkit.from_string.return_value = b'PDF'
+        utils.create_order_pdf(self.order)
+
+        self.client.force_authenticate(self.fixture.owner)
+        response = self.client.get(factories.OrderFactory.get_url(self.order, 'pdf'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(b''.join(response.streaming_content), b'PDF')
+
+    def test_pdfs_are_rendered_for_several_orders(self, mock_pdfkit):
+        mock_pdfkit.from_string.return_value = b'PDF'
+        orders = [self.order] + [factories.OrderFactory(project=self.fixture.project) for _ in range(3)]
+        utils.create_order_pdfs(orders, workers=2)
+
+        self.assertEqual(mock_pdfkit.from_string.call_count, 4)
+        for order in orders:
+            order.refresh_from_db()
+            self.assertTrue(order.has_file())
@@ -1,23 +1,32 @@
 from __future__ import unicode_literals
 
 import base64
+import json
+import logging
+from multiprocessing.pool import ThreadPool
 import os
 import hashlib
 
 from django.db import transaction
+from django.db.models import Count
 import pdfkit
 import six
 from PIL import Image
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage as storage
 from django.template.loader import render_to_string
+from django.utils.lru_cache import lru_cache
 from rest_framework import serializers, status
 
+from waldur_core.core import utils as core_utils
 from waldur_mastermind.common import utils as common_utils
 
 from . import models
 
+logger = logging.getLogger(__name__)
+
 
 def create_screenshot_thumbnail(screenshot):
     pic = screenshot.image
@@ -46,6 +55,115 @@ def create_screenshot_thumbnail(screenshot):
     temp_thumb.close()
 
 
+def encode_attribute_value(value):
+    return json.dumps(value, sort_keys=True)
+
+
+def get_offering_attribute_values(offering):
+    values = []
+    for key, value in offering.attributes.items():
+        if isinstance(value, list):
+            items = [(encode_attribute_value(item), True) for item in value]
+        else:
+            items = [(encode_attribute_value(value), False)]
+
+        for encoded_value, is_list in items:
+            # Values which do not fit into index are looked up in JSON field instead.
+            if len(encoded_value) > models.OfferingAttributeValue.MAX_VALUE_LENGTH:
+                continue
+            values.append(models.OfferingAttributeValue(
+                offering=offering,
+                key=key,
+                value=encoded_value,
+                is_list=is_list,
+            ))
+    return values
+
+
+@transaction.atomic
+def update_offering_attribute_values(offering):
+    models.OfferingAttributeValue.objects.filter(offering=offering).delete()
+    models.OfferingAttributeValue.objects.bulk_create(get_offering_attribute_values(offering))
+
+
+def get_offering_attribute_facets(offerings):
+    """
+    Count offerings for each attribute value so that category sidebar
+    is able to render number of matching offerings next to each filter.
+    """
+    rows = models.OfferingAttributeValue.objects\
+        .filter(offering__in=offerings)\
+        .values('key', 'value')\
+        .annotate(count=Count('offering', distinct=True))\
+        .order_by('key', 'value')
+
+    return [
+        {
+            'key': row['key'],
+            'value': json.loads(row['value']),
+            'count': row['count'],
+        }
+        for row in rows
+    ]
+
+
+def get_usage_components_cache_key(offering_id):
+    return 'marketplace:usage_components:%s' % offering_id
+
+
+def get_usage_components_map(offering_ids):
+    """
+    Return mapping from offering ID to mapping from usage-based component type to component ID.
+    Mapping is cached because it is resolved for each usage report while components are rarely changed.
+    """
+    keys = {get_usage_components_cache_key(offering_id): offering_id for offering_id in set(offering_ids)}
+    cached = cache.get_many(keys.keys())
+    result = {keys[key]: value for key, value in cached.items()}
+
+    missing = set(keys.values()) - set(result.keys())
+    if missing:
+        loaded = {offering_id: {} for offering_id in missing}
+        rows = models.OfferingComponent.objects\
+            .filter(offering_id__in=missing, billing_type=models.OfferingComponent.BillingTypes.USAGE)\
+            .values_list('offering_id', 'type', 'id')
+        for offering_id, component_type, component_id in rows:
+            loaded[offering_id][component_type] = component_id
+        cache.set_many({
+            get_usage_components_cache_key(offering_id): value
+            for offering_id, value in loaded.items()
+        }, timeout=settings.WALDUR_MARKETPLACE['USAGE_COMPONENTS_CACHE_TIMEOUT'])
+        result.update(loaded)
+
+    return result
+
+
+def clear_usage_components_cache(offering_id):
+    cache.delete(get_usage_components_cache_key(offering_id))
+
+
+@transaction.atomic
+def save_component_usages(usages):
+    """
+    Component usages are upserted by resource, component and date
+    so that usage report may be safely submitted again.
+    """
+    objects = [
+        models.ComponentUsage(
+            resource=usage['resource'],
+            component_id=usage['component_id'],
+            date=usage['date'],
+            usage=usage['amount'],
+        )
+        for usage in usages
+    ]
+    return core_utils.bulk_upsert(
+        models.ComponentUsage,
+        objects,
+        key_fields=('resource_id', 'component_id', 'date'),
+        update_fields=('usage',),
+    )
+
+
 def check_api_signature(data, api_secret_code, signature):
     return signature == get_api_signature(data, api_secret_code)
 
@@ -60,14 +178,22 @@ def get_api_signature(data, api_secret_code):
     return hashlib.sha512(concatenate_string).hexdigest()
 
 
-def create_order_pdf(order):
-    logo_path = settings.WALDUR_CORE['SITE_LOGO']
-    if logo_path:
-        with open(logo_path, 'r') as image_file:
-            deployment_logo = base64.b64encode(image_file.read())
-    else:
-        deployment_logo = None
+@lru_cache(maxsize=1)
+def get_deployment_logo(logo_path):
+    if not logo_path:
+        return None
+
+    with open(logo_path, 'r') as image_file:
+        return base64.b64encode(image_file.read())
+
 
+@lru_cache(maxsize=1)
+def get_pdfkit_configuration():
+    # Lookup of wkhtmltopdf binary spawns a subprocess, so it is resolved once per process.
+    return pdfkit.configuration()
+
+
+def render_order_html(order):
     context = dict(
         order=order,
         currency=settings.WALDUR_CORE['CURRENCY_NAME'],
@@ -75,12 +201,58 @@ def create_order_pdf(order):
         deployment_address=settings.WALDUR_CORE['SITE_ADDRESS'],
         deployment_email=settings.WALDUR_CORE['SITE_EMAIL'],
         deployment_phone=settings.WALDUR_CORE['SITE_PHONE'],
-        deployment_logo=deployment_logo,
+        deployment_logo=get_deployment_logo(settings.WALDUR_CORE['SITE_LOGO']),
     )
-    html = render_to_string('marketplace/order.html', context)
-    pdf = pdfkit.from_string(html, False)
-    order.file = base64.b64encode(pdf)
-    order.save()
+    return render_to_string('marketplace/order.html', context)
+
+
+def render_pdf(html):
+    return pdfkit.from_string(html, False, configuration=get_pdfkit_configuration())
+
+
+def save_order_pdf(order, pdf):
+    if order.file:
+        order.file.delete(save=False)
+    order.file.save(order.get_filename(), ContentFile(pdf), save=False)
+    order.save(update_fields=['file'])
+
+
+def create_order_pdf(order):
+    html = render_order_html(order)
+    save_order_pdf(order, render_pdf(html))
+
+
+def _render_pdf_or_none(html):
+    try:
+        return render_pdf(html)
+    except (IOError, OSError):
+        logger.exception('Unable to render PDF document.')
+        return None
+
+
+def create_order_pdfs(orders, workers=None):
+    """
+    Render PDF documents for several orders using pool of wkhtmltopdf processes.
+    HTML is rendered in the calling thread because template accesses database,
+    whereas PDF conversion is offloaded to external processes running in parallel.
+    Documents are stored in file storage in chunks so that memory usage is bounded.
+    """
+    workers = workers or settings.WALDUR_MARKETPLACE['PDF_RENDERING_WORKERS']
+    chunk_size = workers * 4
+    pool = ThreadPool(processes=workers)
+
+    def process_chunk(chunk):
+        htmls = [render_order_html(order) for order in chunk]
+        for order, pdf in zip(chunk, pool.map(_render_pdf_or_none, htmls)):
+            if pdf is not None:
+                save_order_pdf(order, pdf)
+
+    try:
+        for chunk in core_utils.chunked(orders, chunk_size):
+            process_chunk(chunk)
+    finally:
+        pool.close()
+        pool.join()
 
 
 class BaseOrderItemProcessor(object):
@@ -1,7 +1,7 @@
 from __future__ import unicode_literals
 
 from django.conf import settings
-from django.http import Http404, HttpResponse
+from django.http import Http404, FileResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
@@ -22,7 +22,7 @@ from waldur_core.structure import filters as structure_filters
 from waldur_core.structure import permissions as structure_permissions
 from waldur_core.structure import views as structure_views
 
-from . import serializers, models, filters, tasks, plugins
+from . import serializers, models, filters, tasks, plugins, utils
 
 
 class BaseMarketplaceView(core_views.ActionsViewSet):
@@ -86,6 +86,15 @@ class OfferingViewSet(BaseMarketplaceView):
     filter_class = filters.OfferingFilter
     filter_backends = (DjangoFilterBackend, filters.OfferingCustomersFilterBackend)
 
+    @list_route()
+    def facets(self, request):
+        """
+        Return number of offerings for each attribute value.
+        Offerings are filtered using the same query parameters as offering list.
+        """
+        offerings = self.filter_queryset(self.get_queryset())
+        return Response(utils.get_offering_attribute_facets(offerings), status=status.HTTP_200_OK)
+
     @detail_route(methods=['post'])
     def activate(self, request, uuid=None):
         return self._update_state('activate')
@@ -183,7 +192,8 @@ class OrderViewSet(BaseMarketplaceView):
         if not order.has_file():
             raise Http404()
 
-        file_response = HttpResponse(order.file, content_type='application/pdf')
+        order.file.open('rb')
+        file_response = FileResponse(order.file, content_type='application/pdf')
         filename = order.get_filename()
         file_response['Content-Disposition'] = 'attachment; filename="{filename}"'.format(filename=filename)
         return file_response
@@ -309,14 +319,7 @@ class MarketplaceAPIViewSet(rf_viewsets.ViewSet):
         validated_data, dry_run = self.get_validated_data(request)
 
         if not dry_run:
-            usages = []
-            for usage in validated_data['usages']:
-                usages.append(models.ComponentUsage(resource=usage['resource'],
-                                                    component=usage['component'],
-                                                    date=usage['date'],
-                                                    usage=usage['amount']))
-
-            models.ComponentUsage.objects.bulk_create(usages)
+            utils.save_component_usages(validated_data['usages'])
 
         return Response(status=status.HTTP_201_CREATED)
 
@@ -63,3 +63,15 @@ class OpenStackConfig(AppConfig):
             sender=Tenant,
             dispatch_uid='openstack.handlers.update_service_settings_name',
         )
+
+        signals.post_save.connect(
+            handlers.invalidate_clients_on_credentials_change,
+            sender=structure_models.ServiceSettings,
+            dispatch_uid='openstack.handlers.invalidate_clients_on_credentials_change',
+        )
+
+        signals.post_delete.connect(
+            handlers.invalidate_clients_on_service_settings_deletion,
+            sender=structure_models.ServiceSettings,
+            dispatch_uid='openstack.handlers.invalidate_clients_on_service_settings_deletion',
+        )
@@ -1,24 +1,189 @@
 from itertools import groupby
 import logging
+from operator import itemgetter
 import re
 
 from cinderclient import exceptions as cinder_exceptions
+from django.conf import settings as django_settings
 from django.db import transaction
 from django.utils import timezone
 from keystoneclient import exceptions as keystone_exceptions
 from neutronclient.client import exceptions as neutron_exceptions
 from novaclient import exceptions as nova_exceptions
 
+from waldur_core.core import utils as core_utils
 from waldur_core.structure import log_backend_action, SupportedServices
 from waldur_core.structure.utils import (
     update_pulled_fields, handle_resource_not_found, handle_resource_update_success)
-from waldur_openstack.openstack_base.backend import OpenStackBackendError, BaseOpenStackBackend, reraise
+from waldur_openstack.openstack_base.backend import (
+    OpenStackBackendError, BaseOpenStackBackend, get_fingerprint, reraise)
 
 from . import models
 
 logger = logging.getLogger(__name__)
 
 
+class TenantResourcesCleaner(object):
+    """
+    Deletes remote objects of tenant.
+    Objects are deleted in tiers, so that objects of the next tier are deleted
+    only after objects which depend on them are gone. Each object type is listed once
+    and deletion requests for all objects of the tier are issued concurrently.
+    """
+    TIERS = (
+        ('floating_ips', 'snapshots'),
+        ('ports', 'instances'),
+        ('routers', 'volumes'),
+        ('networks', 'security_groups'),
+    )
+    # Nova and Cinder delete objects asynchronously, so that tier is complete only when their listing is empty
+    POLLED_TYPES = ('snapshots', 'instances', 'volumes')
+
+    def __init__(self, backend, tenant):
+        self.backend = backend
+        self.tenant_id = tenant.backend_id
+        self.workers = django_settings.WALDUR_OPENSTACK.get('MAX_CONCURRENT_DELETE_REQUESTS', 8)
+
+    def list(self, resource_type):
+        try:
+            return getattr(self, 'list_%s' % resource_type)()
+        except (nova_exceptions.ClientException,
+                cinder_exceptions.ClientException,
+                neutron_exceptions.NeutronClientException) as e:
+            reraise(e)
+
+    def delete(self, resource_types):
+        listings = core_utils.concurrent_map(self.list, resource_types, self.workers)
+        requests = [(resource_type, item)
+                    for resource_type, items in zip(resource_types, listings)
+                    for item in items]
+        core_utils.concurrent_map(self.delete_item, requests, self.workers)
+
+    def delete_item(self, request):
+        resource_type, item = request
+        # Resource type is plural, for example, floating IP is deleted by delete_floating_ip method
+        getattr(self, 'delete_%s' % resource_type[:-1])(item)
+
+    def get_remaining(self, resource_types):
+        """
+        Returns number of remaining objects of each type which is not empty yet.
+        """
+        listings = core_utils.concurrent_map(self.list, resource_types, self.workers)
+        return {resource_type: len(items) for resource_type, items in zip(resource_types, listings) if items}
+
+    def list_floating_ips(self):
+        return self.backend.neutron_admin_client.list_floatingips(tenant_id=self.tenant_id)['floatingips']
+
+    def list_ports(self):
+        return self.backend.neutron_admin_client.list_ports(tenant_id=self.tenant_id)['ports']
+
+    def list_routers(self):
+        return self.backend.neutron_admin_client.list_routers(tenant_id=self.tenant_id)['routers']
+
+    def list_networks(self):
+        networks = self.backend.neutron_admin_client.list_networks(tenant_id=self.tenant_id)['networks']
+        return [network for network in networks if not network['router:external']]
+
+    def list_security_groups(self):
+        return self.backend.neutron_client.list_security_groups(tenant_id=self.tenant_id)['security_groups']
+
+    def list_instances(self):
+        return self.backend.nova_client.servers.list()
+
+    def list_snapshots(self):
+        return self.backend.cinder_client.volume_snapshots.list()
+
+    def list_volumes(self):
+        return self.backend.cinder_client.volumes.list()
+
+    def delete_floating_ip(self, floating_ip):
+        self.backend._delete_backend_floating_ip(floating_ip['id'], self.tenant_id)
+
+    def delete_port(self, port):
+        neutron = self.backend.neutron_admin_client
+
+        logger.info("Deleting port %s interface_router from tenant %s", port['id'], self.tenant_id)
+        try:
+            neutron.remove_interface_router(port['device_id'], {'port_id': port['id']})
+        except neutron_exceptions.NotFound:
+            logger.debug("Port %s interface_router is already gone from tenant %s", port['id'], self.tenant_id)
+        except neutron_exceptions.NeutronClientException as e:
+            reraise(e)
+
+        logger.info("Deleting port %s from tenant %s", port['id'], self.tenant_id)
+        try:
+            neutron.delete_port(port['id'])
+        except neutron_exceptions.NotFound:
+            logger.debug("Port %s is already gone from tenant %s", port['id'], self.tenant_id)
+        except neutron_exceptions.NeutronClientException as e:
+            reraise(e)
+
+    def delete_router(self, router):
+        logger.info("Deleting router %s from tenant %s", router['id'], self.tenant_id)
+        try:
+            self.backend.neutron_admin_client.delete_router(router['id'])
+        except neutron_exceptions.NotFound:
+            logger.debug("Router %s is already gone from tenant %s", router['id'], self.tenant_id)
+        except neutron_exceptions.NeutronClientException as e:
+            reraise(e)
+
+    def delete_network(self, network):
+        neutron = self.backend.neutron_admin_client
+
+        for subnet in network['subnets']:
+            logger.info("Deleting subnetwork %s from tenant %s", subnet, self.tenant_id)
+            try:
+                neutron.delete_subnet(subnet)
+            except neutron_exceptions.NotFound:
+                logger.info("Subnetwork %s is already gone from tenant %s", subnet, self.tenant_id)
+            except neutron_exceptions.NeutronClientException as e:
+                reraise(e)
+
+        logger.info("Deleting network %s from tenant %s", network['id'], self.tenant_id)
+        try:
+            neutron.delete_network(network['id'])
+        except neutron_exceptions.NotFound:
+            logger.debug("Network %s is already gone from tenant %s", network['id'], self.tenant_id)
+        except neutron_exceptions.NeutronClientException as e:
+            reraise(e)
+
+    def delete_security_group(self, sgroup):
+        logger.info("Deleting security group %s from tenant %s", sgroup['id'], self.tenant_id)
+        try:
+            self.backend.neutron_client.delete_security_group(sgroup['id'])
+        except neutron_exceptions.NotFound:
+            logger.debug("Security group %s is already gone from tenant %s", sgroup['id'], self.tenant_id)
+        except neutron_exceptions.NeutronClientException as e:
+            reraise(e)
+
+    def delete_instance(self, server):
+        logger.info("Deleting instance %s from tenant %s", server.id, self.tenant_id)
+        try:
+            server.delete()
+        except nova_exceptions.NotFound:
+            logger.debug("Instance %s is already gone from tenant %s", server.id, self.tenant_id)
+        except nova_exceptions.ClientException as e:
+            reraise(e)
+
+    def delete_snapshot(self, snapshot):
+        logger.info("Deleting snapshot %s from tenant %s", snapshot.id, self.tenant_id)
+        try:
+            snapshot.delete()
+        except cinder_exceptions.NotFound:
+            logger.debug("Snapshot %s is already gone from tenant %s", snapshot.id, self.tenant_id)
+        except cinder_exceptions.ClientException as e:
+            reraise(e)
+
+    def delete_volume(self, volume):
+        logger.info("Deleting volume %s from tenant %s", volume.id, self.tenant_id)
+        try:
+            volume.force_delete()
+        except cinder_exceptions.NotFound:
+            logger.debug("Volume %s is already gone from tenant %s", volume.id, self.tenant_id)
+        except cinder_exceptions.ClientException as e:
+            reraise(e)
+
+
 class OpenStackBackend(BaseOpenStackBackend):
     DEFAULTS = {
         'tenant_name': 'admin',
@@ -61,20 +226,42 @@ class OpenStackBackend(BaseOpenStackBackend):
             state__in=[models.Tenant.States.OK, models.Tenant.States.ERRED],
             service_project_link__service__settings=self.settings,
         )
+        changed, unchanged = 0, 0
         for tenant in tenants:
             backend_tenant = backend_tenants_mapping.get(tenant.backend_id)
             if backend_tenant is None:
                 handle_resource_not_found(tenant)
                 continue
 
+            fingerprint = get_fingerprint(backend_tenant.name, backend_tenant.description)
+            if self._is_unchanged(tenant, fingerprint):
+                unchanged += 1
+                continue
+
             imported_backend_tenant = models.Tenant(
                 name=backend_tenant.name,
                 description=backend_tenant.description,
                 backend_id=backend_tenant.id,
                 state=models.Tenant.States.OK,
+                backend_fingerprint=fingerprint,
             )
-            update_pulled_fields(tenant, imported_backend_tenant, models.Tenant.get_backend_fields())
+            update_pulled_fields(tenant, imported_backend_tenant,
+                                 models.Tenant.get_backend_fields() + ('backend_fingerprint',))
             handle_resource_update_success(tenant)
+            changed += 1
+
+        logger.info('Tenants of service settings %s are pulled: %s changed, %s unchanged.',
+                    self.settings, changed, unchanged)
+        return changed, unchanged
+
+    def _is_unchanged(self, resource, fingerprint):
+        """
+        Resource is not updated if its backend representation has the same fingerprint as during previous pull.
+        Erred resources are updated anyway so that they are recovered.
+        """
+        return (resource.backend_fingerprint == fingerprint and
+                resource.state == resource.States.OK and
+                not resource.error_message)
 
     def _get_domain(self):
         """ Get current domain """
@@ -258,6 +445,14 @@ class OpenStackBackend(BaseOpenStackBackend):
         return floating_ip
 
     def pull_security_groups(self, tenants=None):
+        """
+        Pull security groups of all tenants using one listing request.
+        Unchanged security groups are detected using stored fingerprint.
+        Neutron supports changed_since filter for security groups, but only if
+        optional standard-attr timestamp extension is enabled. Also, it does not report
+        deleted security groups, so full listing is required in order to remove stale ones anyway.
+        :return: number of changed and unchanged security groups
+        """
         neutron = self.neutron_admin_client
 
         if tenants is None:
@@ -267,7 +462,7 @@ class OpenStackBackend(BaseOpenStackBackend):
             ).prefetch_related('security_groups')
         tenant_mappings = {tenant.backend_id: tenant for tenant in tenants}
         if not tenant_mappings:
-            return
+            return 0, 0
 
         try:
             backend_security_groups = neutron.list_security_groups(
@@ -275,15 +470,22 @@ class OpenStackBackend(BaseOpenStackBackend):
         except neutron_exceptions.NeutronClientException as e:
             reraise(e)
 
-        tenant_security_groups = dict()
-        for tenant_id, security_groups in groupby(backend_security_groups, lambda x: x['tenant_id']):
-            tenant_security_groups[tenant_mappings[tenant_id]] = security_groups
-
+        get_tenant_id = itemgetter('tenant_id')
+        changed, unchanged = 0, 0
         with transaction.atomic():
-            for tenant, security_groups in tenant_security_groups.items():
-                self._update_tenant_security_groups(tenant, security_groups)
+            pending_security_groups = self._get_security_groups_with_local_rules(tenants)
+            for tenant_id, security_groups in groupby(sorted(backend_security_groups, key=get_tenant_id),
+                                                      get_tenant_id):
+                tenant_changed, tenant_unchanged = self._update_tenant_security_groups(
+                    tenant_mappings[tenant_id], security_groups, pending_security_groups)
+                changed += tenant_changed
+                unchanged += tenant_unchanged
             self._remove_stale_security_groups(tenants, backend_security_groups)
 
+        logger.info('Security groups of service settings %s are pulled: %s changed, %s unchanged.',
+                    self.settings, changed, unchanged)
+        return changed, unchanged
+
     @log_backend_action('pull security groups for tenant')
     def pull_tenant_security_groups(self, tenant):
         neutron = self.neutron_client
@@ -293,8 +495,11 @@ class OpenStackBackend(BaseOpenStackBackend):
             reraise(e)
 
         with transaction.atomic():
-            self._update_tenant_security_groups(tenant, backend_security_groups)
+            pending_security_groups = self._get_security_groups_with_local_rules([tenant])
+            changed, unchanged = self._update_tenant_security_groups(
+                tenant, backend_security_groups, pending_security_groups)
             self._remove_stale_security_groups([tenant], backend_security_groups)
+        return changed, unchanged
 
     def _remove_stale_security_groups(self, tenants, backend_security_groups):
         remote_ids = {ip['id'] for ip in backend_security_groups}
@@ -304,24 +509,58 @@ class OpenStackBackend(BaseOpenStackBackend):
         ).exclude(backend_id__in=remote_ids)
         stale_ips.delete()
 
-    def _update_tenant_security_groups(self, tenant, backend_security_groups):
-        security_group_uuids = []
+    def _get_security_groups_with_local_rules(self, tenants):
+        """
+        Rules without backend ID have not been pulled from backend yet,
+        therefore their security groups could not be skipped even if their fingerprint is the same.
+        """
+        return set(models.SecurityGroupRule.objects.filter(
+            security_group__tenant__in=tenants, backend_id='').values_list('security_group_id', flat=True))
+
+    def _update_tenant_security_groups(self, tenant, backend_security_groups, pending_security_groups):
+        """
+        Update security groups of tenant and their rules.
+        Security groups which have not changed since previous pull are skipped.
+        :param pending_security_groups: IDs of security groups which should be updated anyway
+        :return: number of changed and unchanged security groups
+        """
+        current_security_groups = {security_group.backend_id: security_group
+                                   for security_group in tenant.security_groups.all()}
+        changed_security_groups = []
+        unchanged = 0
         for backend_security_group in backend_security_groups:
+            fingerprint = self._get_security_group_fingerprint(backend_security_group)
+            security_group = current_security_groups.get(backend_security_group['id'])
+            if (security_group and security_group.pk not in pending_security_groups and
+                    self._is_unchanged(security_group, fingerprint)):
+                unchanged += 1
+                continue
+
             imported_security_group = self._backend_security_group_to_security_group(
-                backend_security_group, tenant=tenant, service_project_link=tenant.service_project_link)
+                backend_security_group, tenant=tenant, service_project_link=tenant.service_project_link,
+                backend_fingerprint=fingerprint)
 
-            try:
-                security_group = tenant.security_groups.get(backend_id=imported_security_group.backend_id)
-            except models.SecurityGroup.DoesNotExist:
+            if security_group is None:
                 imported_security_group.save()
                 security_group = imported_security_group
             else:
                 update_pulled_fields(security_group, imported_security_group,
-                                     models.SecurityGroup.get_backend_fields())
+                                     models.SecurityGroup.get_backend_fields() + ('backend_fingerprint',))
                 handle_resource_update_success(security_group)
 
-            security_group_uuids.append(security_group.uuid)
-            self._extract_security_group_rules(security_group, backend_security_group)
+            changed_security_groups.append((security_group, backend_security_group))
+
+        self._pull_security_group_rules(changed_security_groups)
+        return len(changed_security_groups), unchanged
+
+    def _get_security_group_fingerprint(self, backend_security_group):
+        rules = sorted(
+            (rule['id'], rule['protocol'], rule['port_range_min'], rule['port_range_max'], rule['remote_ip_prefix'])
+            for rule in map(self._normalize_security_group_rule, backend_security_group['security_group_rules'])
+            # Currently we support only rules for incoming traffic
+            if rule['direction'] == 'ingress'
+        )
+        return get_fingerprint(backend_security_group['name'], backend_security_group['description'], rules)
 
     def _backend_security_group_to_security_group(self, backend_security_group, **kwargs):
         security_group = models.SecurityGroup(
@@ -595,214 +834,59 @@ class OpenStackBackend(BaseOpenStackBackend):
         return []
 
     @log_backend_action()
-    def delete_tenant_floating_ips(self, tenant):
+    def delete_tenant_resources(self, tenant, *resource_types):
         if not tenant.backend_id:
-            # This method will remove all floating IPs if tenant `backend_id` is not defined.
+            # Listings of admin client would contain objects of all tenants if tenant `backend_id` is not defined.
             raise OpenStackBackendError('This method should not be called if tenant has no backend_id')
 
-        neutron = self.neutron_admin_client
-
-        try:
-            floatingips = neutron.list_floatingips(tenant_id=tenant.backend_id)
-        except neutron_exceptions.NeutronClientException as e:
-            reraise(e)
+        TenantResourcesCleaner(self, tenant).delete(resource_types)
 
-        for floating_ip in floatingips.get('floatingips', []):
-            self._delete_backend_floating_ip(floating_ip['id'], tenant.backend_id)
+        if 'networks' in resource_types:
+            tenant.set_quota_usage(tenant.Quotas.network_count, 0)
+            tenant.set_quota_usage(tenant.Quotas.subnet_count, 0)
 
-    @log_backend_action()
-    def delete_tenant_ports(self, tenant):
-        if not tenant.backend_id:
-            # This method will remove all ports if tenant `backend_id` is not defined.
-            raise OpenStackBackendError('This method should not be called if tenant has no backend_id')
+    @log_backend_action('check are all tenant resources deleted')
+    def are_all_tenant_resources_deleted(self, tenant, *resource_types):
+        remaining = TenantResourcesCleaner(self, tenant).get_remaining(resource_types)
+        for resource_type, count in remaining.items():
+            logger.info('Waiting for deletion of %s %s from tenant %s', count, resource_type, tenant.backend_id)
+        return not remaining
 
-        neutron = self.neutron_admin_client
+    # Methods below are kept for tasks which have been scheduled before tenant resources
+    # have been deleted in tiers.
 
-        try:
-            ports = neutron.list_ports(tenant_id=tenant.backend_id)
-        except neutron_exceptions.NeutronClientException as e:
-            reraise(e)
-
-        for port in ports.get('ports', []):
-            logger.info("Deleting port %s interface_router from tenant %s", port['id'], tenant.backend_id)
-            try:
-                neutron.remove_interface_router(port['device_id'], {'port_id': port['id']})
-            except neutron_exceptions.NotFound:
-                logger.debug("Port %s interface_router is already gone from tenant %s", port['id'],
-                             tenant.backend_id)
-            except neutron_exceptions.NeutronClientException as e:
-                reraise(e)
+    def delete_tenant_floating_ips(self, tenant):
+        self.delete_tenant_resources(tenant, 'floating_ips')
 
-            logger.info("Deleting port %s from tenant %s", port['id'], tenant.backend_id)
-            try:
-                neutron.delete_port(port['id'])
-            except neutron_exceptions.NotFound:
-                logger.debug("Port %s is already gone from tenant %s", port['id'], tenant.backend_id)
-            except neutron_exceptions.NeutronClientException as e:
-                reraise(e)
+    def delete_tenant_ports(self, tenant):
+        self.delete_tenant_resources(tenant, 'ports')
 
-    @log_backend_action()
     def delete_tenant_routers(self, tenant):
-        if not tenant.backend_id:
-            # This method will remove all routers if tenant `backend_id` is not defined.
-            raise OpenStackBackendError('This method should not be called if tenant has no backend_id')
-
-        neutron = self.neutron_admin_client
-
-        try:
-            routers = neutron.list_routers(tenant_id=tenant.backend_id)
-        except neutron_exceptions.NeutronClientException as e:
-            reraise(e)
-
-        for router in routers.get('routers', []):
-            logger.info("Deleting router %s from tenant %s", router['id'], tenant.backend_id)
-            try:
-                neutron.delete_router(router['id'])
-            except neutron_exceptions.NotFound:
-                logger.debug("Router %s is already gone from tenant %s", router['id'], tenant.backend_id)
-            except neutron_exceptions.NeutronClientException as e:
-                reraise(e)
+        self.delete_tenant_resources(tenant, 'routers')
 
-    @log_backend_action()
     def delete_tenant_networks(self, tenant):
-        if not tenant.backend_id:
-            # This method will remove all networks if tenant `backend_id` is not defined.
-            raise OpenStackBackendError('This method should not be called if tenant has no backend_id')
-
-        neutron = self.neutron_admin_client
+        self.delete_tenant_resources(tenant, 'networks')
 
-        try:
-            networks = neutron.list_networks(tenant_id=tenant.backend_id)
-        except neutron_exceptions.NeutronClientException as e:
-            reraise(e)
-
-        for network in networks.get('networks', []):
-            if network['router:external']:
-                continue
-            for subnet in network['subnets']:
-                logger.info("Deleting subnetwork %s from tenant %s", subnet, tenant.backend_id)
-                try:
-                    neutron.delete_subnet(subnet)
-                except neutron_exceptions.NotFound:
-                    logger.info("Subnetwork %s is already gone from tenant %s", subnet, tenant.backend_id)
-                except neutron_exceptions.NeutronClientException as e:
-                    reraise(e)
-
-            logger.info("Deleting network %s from tenant %s", network['id'], tenant.backend_id)
-            try:
-                neutron.delete_network(network['id'])
-            except neutron_exceptions.NotFound:
-                logger.debug("Network %s is already gone from tenant %s", network['id'], tenant.backend_id)
-            except neutron_exceptions.NeutronClientException as e:
-                reraise(e)
-
-        tenant.set_quota_usage(tenant.Quotas.network_count, 0)
-        tenant.set_quota_usage(tenant.Quotas.subnet_count, 0)
-
-    @log_backend_action()
     def delete_tenant_security_groups(self, tenant):
-        neutron = self.neutron_client
+        self.delete_tenant_resources(tenant, 'security_groups')
 
-        try:
-            sgroups = neutron.list_security_groups(tenant_id=tenant.backend_id)['security_groups']
-        except neutron_exceptions.NeutronClientException as e:
-            reraise(e)
-
-        for sgroup in sgroups:
-            logger.info("Deleting security group %s from tenant %s", sgroup['id'], tenant.backend_id)
-            try:
-                neutron.delete_security_group(sgroup['id'])
-            except neutron_exceptions.NotFound:
-                logger.debug("Security group %s is already gone from tenant %s", sgroup['id'], tenant.backend_id)
-            except neutron_exceptions.NeutronClientException as e:
-                reraise(e)
-
-    @log_backend_action()
     def delete_tenant_instances(self, tenant):
-        nova = self.nova_client
+        self.delete_tenant_resources(tenant, 'instances')
 
-        try:
-            servers = nova.servers.list()
-        except nova_exceptions.ClientException as e:
-            reraise(e)
-
-        for server in servers:
-            logger.info("Deleting instance %s from tenant %s", server.id, tenant.backend_id)
-            try:
-                server.delete()
-            except nova_exceptions.NotFound:
-                logger.debug("Instance %s is already gone from tenant %s", server.id, tenant.backend_id)
-            except nova_exceptions.ClientException as e:
-                reraise(e)
-
-    @log_backend_action()
     def are_all_tenant_instances_deleted(self, tenant):
-        nova = self.nova_client
+        return self.are_all_tenant_resources_deleted(tenant, 'instances')
 
-        try:
-            servers = nova.servers.list()
-        except nova_exceptions.ClientException as e:
-            reraise(e)
-        else:
-            return not servers
-
-    @log_backend_action()
     def delete_tenant_snapshots(self, tenant):
-        cinder = self.cinder_client
-
-        try:
-            snapshots = cinder.volume_snapshots.list()
-        except cinder_exceptions.ClientException as e:
-            reraise(e)
-
-        for snapshot in snapshots:
-            logger.info("Deleting snapshot %s from tenant %s", snapshot.id, tenant.backend_id)
-            try:
-                snapshot.delete()
-            except cinder_exceptions.NotFound:
-                logger.debug("Snapshot %s is already gone from tenant %s", snapshot.id, tenant.backend_id)
-            except cinder_exceptions.ClientException as e:
-                reraise(e)
+        self.delete_tenant_resources(tenant, 'snapshots')
 
-    @log_backend_action()
     def are_all_tenant_snapshots_deleted(self, tenant):
-        cinder = self.cinder_client
-
-        try:
-            snapshots = cinder.volume_snapshots.list()
-        except cinder_exceptions.ClientException as e:
-            reraise(e)
-        else:
-            return not snapshots
+        return self.are_all_tenant_resources_deleted(tenant, 'snapshots')
 
-    @log_backend_action()
     def delete_tenant_volumes(self, tenant):
-        cinder = self.cinder_client
+        self.delete_tenant_resources(tenant, 'volumes')
 
-        try:
-            volumes = cinder.volumes.list()
-        except cinder_exceptions.ClientException as e:
-            reraise(e)
-
-        for volume in volumes:
-            logger.info("Deleting volume %s from tenant %s", volume.id, tenant.backend_id)
-            try:
-                volume.force_delete()
-            except cinder_exceptions.NotFound:
-                logger.debug("Volume %s is already gone from tenant %s", volume.id, tenant.backend_id)
-            except cinder_exceptions.ClientException as e:
-                reraise(e)
-
-    @log_backend_action()
     def are_all_tenant_volumes_deleted(self, tenant):
-        cinder = self.cinder_client
-
-        try:
-            volumes = cinder.volumes.list()
-        except cinder_exceptions.ClientException as e:
-            reraise(e)
-        else:
-            return not volumes
+        return self.are_all_tenant_resources_deleted(tenant, 'volumes')
 
     @log_backend_action()
     def delete_tenant_user(self, tenant):
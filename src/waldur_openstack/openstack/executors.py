@@ -8,7 +8,7 @@ from waldur_core.core import utils as core_utils
 from waldur_core.structure import executors as structure_executors
 from waldur_core.structure import models as structure_models
 
-from . import models, tasks
+from . import backend, models, tasks
 
 
 logger = logging.getLogger(__name__)
@@ -164,57 +164,28 @@ class TenantDeleteExecutor(core_executors.DeleteExecutor):
         if not tenant.backend_id:
             return state_transition
 
-        cleanup_networks = cls.get_networks_cleanup_tasks(serialized_tenant)
-        cleanup_instances = cls.get_instances_cleanup_tasks(serialized_tenant)
+        cleanup_resources = cls.get_resources_cleanup_tasks(serialized_tenant)
         cleanup_identities = cls.get_identity_cleanup_tasks(serialized_tenant)
 
-        return chain([state_transition] + cleanup_networks + cleanup_instances + cleanup_identities)
-
-    @classmethod
-    def get_networks_cleanup_tasks(cls, serialized_tenant):
-        return [
-            core_tasks.BackendMethodTask().si(
-                serialized_tenant, backend_method='delete_tenant_floating_ips',
-            ),
-            core_tasks.BackendMethodTask().si(
-                serialized_tenant, backend_method='delete_tenant_ports',
-            ),
-            core_tasks.BackendMethodTask().si(
-                serialized_tenant, backend_method='delete_tenant_routers',
-            ),
-            core_tasks.BackendMethodTask().si(
-                serialized_tenant, backend_method='delete_tenant_networks',
-            ),
-        ]
-
-    @classmethod
-    def get_instances_cleanup_tasks(cls, serialized_tenant):
-        return [
-            core_tasks.BackendMethodTask().si(
-                serialized_tenant, backend_method='delete_tenant_security_groups',
-            ),
-            core_tasks.BackendMethodTask().si(
-                serialized_tenant, backend_method='delete_tenant_snapshots',
-            ),
-            core_tasks.PollBackendCheckTask().si(
-                serialized_tenant,
-                backend_check_method='are_all_tenant_snapshots_deleted'
-            ),
-            core_tasks.BackendMethodTask().si(
-                serialized_tenant, backend_method='delete_tenant_instances',
-            ),
-            core_tasks.PollBackendCheckTask().si(
-                serialized_tenant,
-                backend_check_method='are_all_tenant_instances_deleted'
-            ),
-            core_tasks.BackendMethodTask().si(
-                serialized_tenant, backend_method='delete_tenant_volumes',
-            ),
-            core_tasks.PollBackendCheckTask().si(
-                serialized_tenant,
-                backend_check_method='are_all_tenant_volumes_deleted'
-            ),
-        ]
+        return chain([state_transition] + cleanup_resources + cleanup_identities)
+
+    @classmethod
+    def get_resources_cleanup_tasks(cls, serialized_tenant):
+        """
+        Resources of each tier are deleted concurrently.
+        Next tier is processed only when asynchronously deleted resources of current tier are gone.
+        """
+        _tasks = []
+        for tier in backend.TenantResourcesCleaner.TIERS:
+            _tasks.append(core_tasks.BackendMethodTask().si(
+                serialized_tenant, 'delete_tenant_resources', *tier))
+
+            polled_types = [resource_type for resource_type in tier
+                            if resource_type in backend.TenantResourcesCleaner.POLLED_TYPES]
+            if polled_types:
+                _tasks.append(core_tasks.PollBackendCheckTask().si(
+                    serialized_tenant, 'are_all_tenant_resources_deleted', *polled_types))
+        return _tasks
 
     @classmethod
     def get_identity_cleanup_tasks(cls, serialized_tenant):
@@ -91,7 +91,13 @@ class OpenStackExtension(WaldurExtension):
             # If this flag is true - manager can execute actions that will
             # change cost of the project: delete tenants, change their configuration
             'MANAGER_CAN_MANAGE_TENANTS': False,
-            'TENANT_CREDENTIALS_VISIBLE': True
+            'TENANT_CREDENTIALS_VISIBLE': True,
+            # Maximum number of OpenStack clients cached by each worker process
+            'CLIENT_CACHE_SIZE': 100,
+            # Maximum number of concurrent requests issued to calculate tenant quotas usage
+            'MAX_CONCURRENT_QUOTA_REQUESTS': 4,
+            # Maximum number of concurrent requests issued to delete resources of tenant
+            'MAX_CONCURRENT_DELETE_REQUESTS': 8,
         }
 
     @staticmethod
@@ -7,6 +7,7 @@ from waldur_core.core import models as core_models, tasks as core_tasks, utils a
 from waldur_core.structure import (filters as structure_filters, permissions as structure_permissions,
                                    models as structure_models)
 from waldur_openstack.openstack import apps
+from waldur_openstack.openstack_base.backend import client_registry
 
 from .log import event_logger
 from .models import Tenant
@@ -78,3 +79,15 @@ def update_service_settings_name(sender, instance, created=False, **kwargs):
     else:
         service_settings.name = tenant.name
         service_settings.save()
+
+
+def invalidate_clients_on_credentials_change(sender, instance, created=False, **kwargs):
+    credentials_fields = ('backend_url', 'username', 'password', 'domain', 'options')
+    if created or not any(instance.tracker.has_changed(field) for field in credentials_fields):
+        return
+
+    client_registry.invalidate(instance.uuid.hex)
+
+
+def invalidate_clients_on_service_settings_deletion(sender, instance, **kwargs):
+    client_registry.invalidate(instance.uuid.hex)
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.7 on 2018-08-06 12:14
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openstack', '0040_unique_floating_ip'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='securitygroup',
+            name='backend_fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='tenant',
+            name='backend_fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+    ]
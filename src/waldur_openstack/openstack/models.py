@@ -99,6 +99,8 @@ class SecurityGroup(structure_models.SubResource):
     service_project_link = models.ForeignKey(
         OpenStackServiceProjectLink, related_name='security_groups')
     tenant = models.ForeignKey('Tenant', related_name='security_groups')
+    # Digest of backend representation which allows to skip pull of unchanged objects
+    backend_fingerprint = models.CharField(max_length=32, blank=True, editable=False)
 
     def get_backend(self):
         return self.tenant.get_backend()
@@ -197,6 +199,8 @@ class Tenant(structure_models.PrivateCloud):
     )
     user_username = models.CharField(max_length=50, blank=True)
     user_password = models.CharField(max_length=50, blank=True)
+    # Digest of backend representation which allows to skip pull of unchanged objects
+    backend_fingerprint = models.CharField(max_length=32, blank=True, editable=False)
 
     tracker = FieldTracker()
 
@@ -5,8 +5,10 @@ from rest_framework import test
 from keystoneclient import exceptions as keystone_exceptions
 
 from waldur_openstack.openstack import models
-from waldur_openstack.openstack.backend import OpenStackBackend
+from waldur_openstack.openstack.backend import OpenStackBackend, TenantResourcesCleaner
 from waldur_openstack.openstack.tests import fixtures, factories
+from waldur_openstack.openstack_base.backend import OpenStackBackendError
+from waldur_openstack.openstack_base.fake_cloud import FakeCloud
 
 
 class MockedSession(mock.MagicMock):
@@ -187,6 +189,69 @@ class PullSecurityGroupsTest(BaseBackendTestCase):
         actual_security_groups_count = models.SecurityGroup.objects.filter(backend_id__in=backend_ids).count()
         self.assertEqual(actual_security_groups_count, len(security_groups))
 
+    @data(True, False)
+    def test_unchanged_security_groups_are_skipped(self, is_admin):
+        security_group = self.fixture.security_group
+        factories.SecurityGroupRuleFactory(security_group=security_group)
+        self.setup_client(is_admin, self._form_backend_security_groups([security_group]))
+
+        self.assertEqual(self.call_backend(is_admin), (1, 0))
+        with mock.patch('waldur_core.core.utils.bulk_sync') as bulk_sync:
+            self.assertEqual(self.call_backend(is_admin), (0, 1))
+            self.assertFalse(bulk_sync.called)
+
+    @data(True, False)
+    def test_security_group_is_updated_if_its_rules_have_changed(self, is_admin):
+        security_group = self.fixture.security_group
+        rule = factories.SecurityGroupRuleFactory(security_group=security_group, from_port=22, to_port=22)
+        self.setup_client(is_admin, self._form_backend_security_groups([security_group]))
+        self.call_backend(is_admin)
+
+        models.SecurityGroupRule.objects.filter(pk=rule.pk).update(from_port=80, to_port=80)
+        self.setup_client(is_admin, self._form_backend_security_groups([security_group]))
+        models.SecurityGroupRule.objects.filter(pk=rule.pk).update(from_port=22, to_port=22)
+
+        self.assertEqual(self.call_backend(is_admin), (1, 0))
+        rule.refresh_from_db()
+        self.assertEqual(rule.from_port, 80)
+
+    @data(True, False)
+    def test_all_local_rules_are_deleted_if_they_are_not_returned_by_neutron(self, is_admin):
+        security_group = self.fixture.security_group
+        self.setup_client(is_admin, self._form_backend_security_groups([security_group]))
+        factories.SecurityGroupRuleFactory.create_batch(2, security_group=security_group, backend_id='')
+
+        self.call_backend(is_admin)
+
+        self.assertFalse(security_group.rules.exists())
+
+    @data(True, False)
+    def test_security_group_with_local_rules_is_updated_even_if_it_is_unchanged(self, is_admin):
+        security_group = self.fixture.security_group
+        factories.SecurityGroupRuleFactory(security_group=security_group)
+        self.setup_client(is_admin, self._form_backend_security_groups([security_group]))
+        self.call_backend(is_admin)
+
+        factories.SecurityGroupRuleFactory.create_batch(2, security_group=security_group, backend_id='')
+
+        self.assertEqual(self.call_backend(is_admin), (1, 0))
+        self.assertEqual(security_group.rules.count(), 1)
+        self.assertFalse(security_group.rules.filter(backend_id='').exists())
+
+    @data(True, False)
+    def test_erred_security_group_is_recovered_even_if_it_is_unchanged(self, is_admin):
+        security_group = self.fixture.security_group
+        self.setup_client(is_admin, self._form_backend_security_groups([security_group]))
+        self.call_backend(is_admin)
+
+        models.SecurityGroup.objects.filter(pk=security_group.pk).update(
+            state=models.SecurityGroup.States.ERRED, error_message='Failed')
+        self.call_backend(is_admin)
+
+        security_group.refresh_from_db()
+        self.assertEqual(security_group.state, models.SecurityGroup.States.OK)
+        self.assertEqual(security_group.error_message, '')
+
     def _form_backend_security_groups(self, security_groups):
         result = []
 
@@ -217,6 +282,49 @@ class PullSecurityGroupsTest(BaseBackendTestCase):
         return result
 
 
+class PullTenantsTest(BaseBackendTestCase):
+
+    def setUp(self):
+        super(PullTenantsTest, self).setUp()
+        self.backend_tenant = mock.Mock(id=self.tenant.backend_id, description='Tenant description')
+        self.backend_tenant.name = 'Tenant name'
+        self.mocked_keystone().projects.list.return_value = [self.backend_tenant]
+
+    def test_tenant_is_updated(self):
+        self.assertEqual(self.backend.pull_tenants(), (1, 0))
+
+        self.tenant.refresh_from_db()
+        self.assertEqual(self.tenant.name, 'Tenant name')
+        self.assertEqual(self.tenant.description, 'Tenant description')
+
+    def test_unchanged_tenant_is_not_saved(self):
+        self.backend.pull_tenants()
+
+        with mock.patch('django.db.models.signals.post_save.send') as post_save:
+            self.assertEqual(self.backend.pull_tenants(), (0, 1))
+            self.assertFalse(post_save.called)
+
+    def test_tenant_is_updated_if_its_name_has_changed(self):
+        self.backend.pull_tenants()
+
+        self.backend_tenant.name = 'New tenant name'
+        self.assertEqual(self.backend.pull_tenants(), (1, 0))
+
+        self.tenant.refresh_from_db()
+        self.assertEqual(self.tenant.name, 'New tenant name')
+
+    def test_erred_tenant_is_recovered_even_if_it_is_unchanged(self):
+        self.backend.pull_tenants()
+        models.Tenant.objects.filter(pk=self.tenant.pk).update(
+            state=models.Tenant.States.ERRED, error_message='Failed')
+
+        self.backend.pull_tenants()
+
+        self.tenant.refresh_from_db()
+        self.assertEqual(self.tenant.state, models.Tenant.States.OK)
+        self.assertEqual(self.tenant.error_message, '')
+
+
 class PullNetworksTest(BaseBackendTestCase):
 
     def setUp(self):
@@ -530,3 +638,48 @@ class PullImagesTest(BaseBackendTestCase):
         self.mocked_glance().images.list.return_value[0]['status'] = 'deleted'
         self.backend.pull_images()
         self.assertEqual(models.Image.objects.count(), 0)
+
+
+class TenantResourcesCleanupTest(BaseBackendTestCase):
+    def setUp(self):
+        super(TenantResourcesCleanupTest, self).setUp()
+        self.cloud = FakeCloud(tenant_id=self.tenant.backend_id).seed(
+            flavors=1, images=0, security_groups=2, networks=2, routers=1,
+            servers=3, volumes=2, snapshots=2, floating_ips=2)
+        self.cloud.install(self.backend)
+
+    def test_all_resources_are_deleted_tier_by_tier(self):
+        for tier in TenantResourcesCleaner.TIERS:
+            self.backend.delete_tenant_resources(self.tenant, *tier)
+
+        for items in (self.cloud.floating_ips, self.cloud.snapshots, self.cloud.ports, self.cloud.servers,
+                      self.cloud.routers, self.cloud.volumes, self.cloud.networks, self.cloud.security_groups):
+            self.assertEqual(items, [])
+
+    def test_each_resource_type_is_listed_once(self):
+        self.backend.delete_tenant_resources(self.tenant, 'floating_ips', 'snapshots')
+
+        self.assertEqual(self.cloud.calls.count('neutron.list_floatingips'), 1)
+        self.assertEqual(self.cloud.calls.count('cinder.volume_snapshots.list'), 1)
+        self.assertEqual(self.cloud.calls.count('neutron.delete_floatingip'), 2)
+        self.assertEqual(self.cloud.calls.count('cinder.volume_snapshots.delete'), 2)
+
+    def test_external_networks_are_not_deleted(self):
+        self.cloud.networks[0]['router:external'] = True
+        self.backend.delete_tenant_resources(self.tenant, 'networks')
+        self.assertEqual(len(self.cloud.networks), 1)
+
+    def test_resources_are_not_deleted_if_tenant_has_no_backend_id(self):
+        self.tenant.backend_id = ''
+        self.assertRaises(OpenStackBackendError, self.backend.delete_tenant_resources, self.tenant, 'ports')
+        self.assertEqual(self.cloud.calls, [])
+
+    def test_tier_is_complete_only_when_polled_resources_are_gone(self):
+        self.assertFalse(self.backend.are_all_tenant_resources_deleted(self.tenant, 'instances', 'volumes'))
+
+        self.backend.delete_tenant_resources(self.tenant, 'instances')
+        self.backend.delete_tenant_resources(self.tenant, 'volumes')
+        self.cloud.calls = []
+
+        self.assertTrue(self.backend.are_all_tenant_resources_deleted(self.tenant, 'instances', 'volumes'))
+        self.assertEqual(sorted(self.cloud.calls), ['cinder.volumes.list', 'nova.servers.list'])
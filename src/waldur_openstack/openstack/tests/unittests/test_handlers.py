@@ -142,3 +142,20 @@ class UpdateServiceSettingsNameHandlerTest(TestCase):
 
         service_settings.refresh_from_db()
         self.assertEqual(service_settings.name, tenant.name)
+
+
+class InvalidateClientsHandlerTest(TestCase):
+    def setUp(self):
+        self.service_settings = structure_factories.ServiceSettingsFactory(type=apps.OpenStackConfig.service_name)
+
+    @patch('waldur_openstack.openstack.handlers.client_registry')
+    def test_clients_are_invalidated_if_credentials_are_changed(self, client_registry):
+        self.service_settings.password = 'new password'
+        self.service_settings.save()
+        client_registry.invalidate.assert_called_once_with(self.service_settings.uuid.hex)
+
+    @patch('waldur_openstack.openstack.handlers.client_registry')
+    def test_clients_are_not_invalidated_if_other_fields_are_changed(self, client_registry):
+        self.service_settings.name = 'new name'
+        self.service_settings.save()
+        self.assertFalse(client_registry.invalidate.called)
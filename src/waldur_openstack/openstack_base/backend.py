@@ -1,15 +1,20 @@
+from collections import OrderedDict
 import datetime
 import hashlib
+import json
 import logging
 import sys
+import threading
+import time
 
 from ceilometerclient import client as ceilometer_client
 from ceilometerclient import exc as ceilometer_exceptions
 from cinderclient import exceptions as cinder_exceptions
 from cinderclient.v2 import client as cinder_client
+from django.conf import settings as django_settings
 from django.core.cache import cache
-from django.db import transaction
 from django.utils import timezone
+from django.utils.functional import cached_property
 from glanceclient import exc as glance_exceptions
 from glanceclient.v2 import client as glance_client
 from keystoneauth1 import session as keystone_session
@@ -23,6 +28,7 @@ from novaclient import exceptions as nova_exceptions
 from requests import ConnectionError
 import six
 
+from waldur_core.core import utils as core_utils
 from waldur_core.structure import ServiceBackend
 from waldur_core.structure.exceptions import SerializableBackendError
 from waldur_openstack.openstack.models import Tenant
@@ -49,6 +55,15 @@ def reraise(exc):
     six.reraise(OpenStackBackendError, exc, sys.exc_info()[2])
 
 
+def get_fingerprint(*values):
+    """
+    Calculate digest of backend object representation.
+    It is stored alongside pulled object in order to detect whether it has changed since previous pull.
+    """
+    content = json.dumps(values, sort_keys=True)
+    return hashlib.md5(content.encode('utf-8')).hexdigest()  # nosec
+
+
 class OpenStackSession(dict):
     """ Serializable session """
 
@@ -89,17 +104,20 @@ class OpenStackSession(dict):
         return cls(ks_session=ks_session)
 
     def validate(self):
-        if self.auth.auth_ref.expires > timezone.now() + datetime.timedelta(minutes=10):
+        if not self.is_expiring():
             return True
 
         raise OpenStackSessionExpired('OpenStack session is expired')
 
+    def is_expiring(self):
+        return self.auth.auth_ref.expires <= timezone.now() + datetime.timedelta(minutes=10)
+
     def __str__(self):
         return str({k: v if k != 'password' else '***' for k, v in self.items()})
 
 
 class OpenStackClient(object):
-    """ Generic OpenStack client. """
+    """ Generic OpenStack client. API clients are constructed once and reused. """
 
     def __init__(self, session=None, verify_ssl=False, **credentials):
         self.verify_ssl = verify_ssl
@@ -117,11 +135,11 @@ class OpenStackClient(object):
                 logger.error('Failed to create OpenStack session.')
                 reraise(e)
 
-    @property
+    @cached_property
     def keystone(self):
         return keystone_client.Client(session=self.session.keystone_session, interface='public')
 
-    @property
+    @cached_property
     def nova(self):
         try:
             return nova_client.Client(version='2', session=self.session.keystone_session, endpoint_type='publicURL')
@@ -129,7 +147,7 @@ class OpenStackClient(object):
             logger.exception('Failed to create nova client: %s', e)
             reraise(e)
 
-    @property
+    @cached_property
     def neutron(self):
         try:
             return neutron_client.Client(session=self.session.keystone_session)
@@ -137,7 +155,7 @@ class OpenStackClient(object):
             logger.exception('Failed to create neutron client: %s', e)
             reraise(e)
 
-    @property
+    @cached_property
     def cinder(self):
         try:
             return cinder_client.Client(session=self.session.keystone_session)
@@ -145,7 +163,7 @@ class OpenStackClient(object):
             logger.exception('Failed to create cinder client: %s', e)
             reraise(e)
 
-    @property
+    @cached_property
     def glance(self):
         try:
             return glance_client.Client(session=self.session.keystone_session)
@@ -153,7 +171,7 @@ class OpenStackClient(object):
             logger.exception('Failed to create glance client: %s', e)
             reraise(e)
 
-    @property
+    @cached_property
     def ceilometer(self):
         try:
             return ceilometer_client.Client('2', session=self.session.keystone_session)
@@ -162,17 +180,189 @@ class OpenStackClient(object):
             reraise(e)
 
 
+class OpenStackClientRegistry(object):
+    """
+    Per-process LRU cache of OpenStack clients.
+    It allows to reuse keystone session and API clients between backends and tasks.
+    Client is created again if its token is about to expire.
+    """
+
+    def __init__(self, max_size=None):
+        self._max_size = max_size
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_size(self):
+        if self._max_size is not None:
+            return self._max_size
+        return django_settings.WALDUR_OPENSTACK.get('CLIENT_CACHE_SIZE', 100)
+
+    def get(self, key, factory):
+        """
+        :param key: tuple of service settings UUID, tenant scope and credentials hash
+        :param factory: callable which creates new client on cache miss
+        """
+        with self._lock:
+            client = self._clients.pop(key, None)
+            if client is not None and not client.session.is_expiring():
+                # Move client to the end of queue as the most recently used one
+                self._clients[key] = client
+                self.hits += 1
+                return client
+            self.misses += 1
+
+        # Client is created outside of the lock, because authentication takes a while
+        client = factory()
+        with self._lock:
+            self._clients[key] = client
+            while len(self._clients) > self.max_size:
+                self._clients.popitem(last=False)
+                self.evictions += 1
+        return client
+
+    def invalidate(self, settings_uuid):
+        """ Drop clients of given service settings, for example, if credentials have been changed. """
+        with self._lock:
+            for key in list(self._clients.keys()):
+                if key[0] == settings_uuid:
+                    del self._clients[key]
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def get_stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._clients),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': float(self.hits) / total if total else 0.0,
+            }
+
+
+client_registry = OpenStackClientRegistry()
+
+
+class TenantQuotasUsageCollector(object):
+    """
+    Calculates tenant quotas usage from listings of remote objects.
+    Listings are issued concurrently and duration of each call is stored in timings.
+    """
+
+    def __init__(self, backend, tenant_backend_id):
+        self.backend = backend
+        self.tenant_backend_id = tenant_backend_id
+        self.timings = OrderedDict()
+
+    def get_listings(self):
+        nova = self.backend.nova_client
+        neutron = self.backend.neutron_client
+        cinder = self.backend.cinder_client
+        tenant_id = self.tenant_backend_id
+        return OrderedDict([
+            ('volumes', cinder.volumes.list),
+            ('snapshots', cinder.volume_snapshots.list),
+            ('instances', nova.servers.list),
+            ('flavors', nova.flavors.list),
+            ('security_groups', lambda: neutron.list_security_groups(tenant_id=tenant_id)['security_groups']),
+            ('floating_ips', lambda: neutron.list_floatingips(tenant_id=tenant_id)['floatingips']),
+            ('networks', lambda: neutron.list_networks(tenant_id=tenant_id)['networks']),
+            ('subnets', lambda: neutron.list_subnets(tenant_id=tenant_id)['subnets']),
+        ])
+
+    def call(self, name, func, *args):
+        start = time.time()
+        try:
+            return func(*args)
+        except (nova_exceptions.ClientException,
+                cinder_exceptions.ClientException,
+                neutron_exceptions.NeutronClientException) as e:
+            reraise(e)
+        finally:
+            self.timings[name] = time.time() - start
+
+    def collect(self):
+        listings = self.get_listings()
+        workers = django_settings.WALDUR_OPENSTACK.get('MAX_CONCURRENT_QUOTA_REQUESTS', 4)
+        results = core_utils.concurrent_map(lambda item: self.call(*item), listings.items(), workers)
+        # Timings are stored in order of listings rather than in order of completion
+        self.timings = OrderedDict((name, self.timings[name]) for name in listings)
+        objects = dict(zip(listings.keys(), results))
+
+        instances = objects['instances']
+        flavors = self.get_flavors([instance.flavor['id'] for instance in instances], objects['flavors'])
+        ram, vcpu = 0, 0
+        for instance in instances:
+            flavor = flavors.get(instance.flavor['id'])
+            ram += getattr(flavor, 'ram', 0)
+            vcpu += getattr(flavor, 'vcpus', 0)
+
+        volumes = objects['volumes']
+        snapshots = objects['snapshots']
+        security_groups = objects['security_groups']
+        volumes_size = sum(self.backend.gb2mb(v.size) for v in volumes)
+        snapshots_size = sum(self.backend.gb2mb(v.size) for v in snapshots)
+        storage = volumes_size + snapshots_size
+
+        return {
+            Tenant.Quotas.ram: ram,
+            Tenant.Quotas.vcpu: vcpu,
+            Tenant.Quotas.storage: storage,
+            Tenant.Quotas.volumes: len(volumes),
+            Tenant.Quotas.volumes_size: volumes_size,
+            Tenant.Quotas.snapshots: len(snapshots),
+            Tenant.Quotas.snapshots_size: snapshots_size,
+            Tenant.Quotas.instances: len(instances),
+            Tenant.Quotas.security_group_count: len(security_groups),
+            Tenant.Quotas.security_group_rule_count: sum(len(sg['security_group_rules']) for sg in security_groups),
+            Tenant.Quotas.floating_ip_count: len(objects['floating_ips']),
+            Tenant.Quotas.network_count: len(objects['networks']),
+            Tenant.Quotas.subnet_count: len(objects['subnets']),
+        }
+
+    def get_flavors(self, flavor_ids, listed_flavors):
+        """
+        Listing contains only public flavors, so that other flavors of instances
+        are fetched one by one, but each of them is fetched only once.
+        """
+        nova = self.backend.nova_client
+        flavors = {flavor.id: flavor for flavor in listed_flavors}
+        for flavor_id in set(flavor_ids) - set(flavors):
+            start = time.time()
+            try:
+                flavors[flavor_id] = nova.flavors.get(flavor_id)
+            except nova_exceptions.NotFound:
+                logger.warning('Cannot find flavor with id %s', flavor_id)
+            except nova_exceptions.ClientException as e:
+                reraise(e)
+            finally:
+                self.timings['flavor %s' % flavor_id] = time.time() - start
+        return flavors
+
+
 class BaseOpenStackBackend(ServiceBackend):
 
     def __init__(self, settings, tenant_id=None):
         self.settings = settings
         self.tenant_id = tenant_id
 
-    def _get_cached_session_key(self, admin):
-        key = 'OPENSTACK_ADMIN_SESSION' if admin else 'OPENSTACK_SESSION_%s' % self.tenant_id
+    def _get_client_key(self, admin):
+        scope = 'OPENSTACK_ADMIN_SESSION' if admin else 'OPENSTACK_SESSION_%s' % self.tenant_id
         settings_key = str(self.settings.backend_url) + str(self.settings.password) + str(self.settings.username)
         hashed_settings_key = hashlib.sha256(settings_key).hexdigest()
-        return '%s_%s_%s' % (self.settings.uuid.hex, hashed_settings_key, key)
+        return self.settings.uuid.hex, scope, hashed_settings_key
+
+    def _get_cached_session_key(self, admin):
+        settings_uuid, scope, hashed_settings_key = self._get_client_key(admin)
+        return '%s_%s_%s' % (settings_uuid, hashed_settings_key, scope)
 
     def get_client(self, name=None, admin=False):
         domain_name = self.settings.domain or 'Default'
@@ -190,30 +380,30 @@ class BaseOpenStackBackend(ServiceBackend):
 
         # Skip cache if service settings do no exist
         if not self.settings.uuid:
-            return OpenStackClient(**credentials)
-
-        client = None
-        attr_name = 'admin_session' if admin else 'session'
-        key = self._get_cached_session_key(admin)
-        if hasattr(self, attr_name):  # try to get client from object
-            client = getattr(self, attr_name)
-        elif key in cache:  # try to get session from cache
-            session = cache.get(key)
-            try:
-                client = OpenStackClient(session=session)
-            except (OpenStackSessionExpired, OpenStackAuthorizationFailed):
-                pass
-
-        if client is None:  # create new token if session is not cached or expired
             client = OpenStackClient(**credentials)
-            setattr(self, attr_name, client)  # Cache client in the object
-            cache.set(key, dict(client.session), 24 * 60 * 60)  # Add session to cache
+        else:
+            client = client_registry.get(
+                self._get_client_key(admin), lambda: self._create_client(admin, credentials))
 
         if name:
             return getattr(client, name)
         else:
             return client
 
+    def _create_client(self, admin, credentials):
+        key = self._get_cached_session_key(admin)
+        session = cache.get(key)
+        if session:  # try to recover session created by another process
+            try:
+                return OpenStackClient(session=session)
+            except (OpenStackSessionExpired, OpenStackAuthorizationFailed):
+                pass
+
+        # create new token if session is not cached or expired
+        client = OpenStackClient(**credentials)
+        cache.set(key, dict(client.session), 24 * 60 * 60)
+        return client
+
     def __getattr__(self, name):
         clients = 'keystone', 'nova', 'neutron', 'cinder', 'glance', 'ceilometer'
         for client in clients:
@@ -244,12 +434,19 @@ class BaseOpenStackBackend(ServiceBackend):
         else:
             return True
 
-    def _pull_tenant_quotas(self, backend_id, scope):
-        for quota_name, limit in self.get_tenant_quotas_limits(backend_id).items():
+    def _pull_tenant_quotas(self, backend_id, scope, quotas=None):
+        """
+        :param quotas: tuple of quota limits and usage if they have been fetched already
+        """
+        limits, usage = quotas or self.get_tenant_quotas(backend_id)
+        for quota_name, limit in limits.items():
             scope.set_quota_limit(quota_name, limit)
-        for quota_name, usage in self.get_tenant_quotas_usage(backend_id).items():
+        for quota_name, usage in usage.items():
             scope.set_quota_usage(quota_name, usage, fail_silently=True)
 
+    def get_tenant_quotas(self, tenant_backend_id):
+        return self.get_tenant_quotas_limits(tenant_backend_id), self.get_tenant_quotas_usage(tenant_backend_id)
+
     def get_tenant_quotas_limits(self, tenant_backend_id):
         nova = self.nova_client
         neutron = self.neutron_client
@@ -279,56 +476,11 @@ class BaseOpenStackBackend(ServiceBackend):
         }
 
     def get_tenant_quotas_usage(self, tenant_backend_id):
-        nova = self.nova_client
-        neutron = self.neutron_client
-        cinder = self.cinder_client
-        try:
-            volumes = cinder.volumes.list()
-            snapshots = cinder.volume_snapshots.list()
-            instances = nova.servers.list()
-            security_groups = neutron.list_security_groups(tenant_id=tenant_backend_id)['security_groups']
-            floating_ips = neutron.list_floatingips(tenant_id=tenant_backend_id)['floatingips']
-            networks = neutron.list_networks(tenant_id=tenant_backend_id)['networks']
-            subnets = neutron.list_subnets(tenant_id=tenant_backend_id)['subnets']
-
-            flavors = {flavor.id: flavor for flavor in nova.flavors.list()}
-
-            ram, vcpu = 0, 0
-            for flavor_id in (instance.flavor['id'] for instance in instances):
-                try:
-                    flavor = flavors.get(flavor_id, nova.flavors.get(flavor_id))
-                except nova_exceptions.NotFound:
-                    logger.warning('Cannot find flavor with id %s', flavor_id)
-                    continue
-
-                ram += getattr(flavor, 'ram', 0)
-                vcpu += getattr(flavor, 'vcpus', 0)
-
-        except (nova_exceptions.ClientException,
-                cinder_exceptions.ClientException,
-                neutron_exceptions.NeutronClientException) as e:
-            reraise(e)
-
-        volumes_size = sum(self.gb2mb(v.size) for v in volumes)
-        snapshots_size = sum(self.gb2mb(v.size) for v in snapshots)
-        storage = volumes_size + snapshots_size
-
-        return {
-            Tenant.Quotas.ram: ram,
-            Tenant.Quotas.vcpu: vcpu,
-            Tenant.Quotas.storage: storage,
-            Tenant.Quotas.volumes: len(volumes),
-            Tenant.Quotas.volumes_size: volumes_size,
-            Tenant.Quotas.snapshots: len(snapshots),
-            Tenant.Quotas.snapshots_size: snapshots_size,
-            Tenant.Quotas.instances: len(instances),
-            Tenant.Quotas.security_group_count: len(security_groups),
-            Tenant.Quotas.security_group_rule_count: len(sum([sg['security_group_rules']
-                                                              for sg in security_groups], [])),
-            Tenant.Quotas.floating_ip_count: len(floating_ips),
-            Tenant.Quotas.network_count: len(networks),
-            Tenant.Quotas.subnet_count: len(subnets),
-        }
+        collector = TenantQuotasUsageCollector(self, tenant_backend_id)
+        usage = collector.collect()
+        logger.info('Quotas usage of tenant %s is collected. Duration of calls: %s', tenant_backend_id, ', '.join(
+            '%s %.3f' % (name, duration) for name, duration in collector.timings.items()))
+        return usage
 
     def _normalize_security_group_rule(self, rule):
         if rule['protocol'] is None:
@@ -346,51 +498,73 @@ class BaseOpenStackBackend(ServiceBackend):
         return rule
 
     def _extract_security_group_rules(self, security_group, backend_security_group):
-        backend_rules = backend_security_group['security_group_rules']
-        cur_rules = {rule.backend_id: rule for rule in security_group.rules.all()}
-        for backend_rule in backend_rules:
-            # Currently we support only rules for incoming traffic
-            if backend_rule['direction'] != 'ingress':
-                continue
-            cur_rules.pop(backend_rule['id'], None)
-            backend_rule = self._normalize_security_group_rule(backend_rule)
-            security_group.rules.update_or_create(
-                backend_id=backend_rule['id'],
-                defaults={
-                    'from_port': backend_rule['port_range_min'],
-                    'to_port': backend_rule['port_range_max'],
-                    'protocol': backend_rule['protocol'],
-                    'cidr': backend_rule['remote_ip_prefix'],
-                })
-        security_group.rules.filter(backend_id__in=cur_rules.keys()).delete()
+        self._pull_security_group_rules([(security_group, backend_security_group)])
+
+    def _pull_security_group_rules(self, security_groups):
+        """
+        Synchronize rules of several security groups using constant number of queries.
+        :param security_groups: list of pairs of security group and its backend representation
+        """
+        if not security_groups:
+            return
+
+        rule_model = security_groups[0][0].rules.model
+        rules = []
+        for security_group, backend_security_group in security_groups:
+            for backend_rule in backend_security_group['security_group_rules']:
+                # Currently we support only rules for incoming traffic
+                if backend_rule['direction'] != 'ingress':
+                    continue
+                backend_rule = self._normalize_security_group_rule(backend_rule)
+                rules.append(rule_model(
+                    security_group=security_group,
+                    backend_id=backend_rule['id'],
+                    from_port=backend_rule['port_range_min'],
+                    to_port=backend_rule['port_range_max'],
+                    protocol=backend_rule['protocol'],
+                    cidr=backend_rule['remote_ip_prefix'],
+                ))
+
+        current_rules = rule_model.objects.filter(
+            security_group__in=[security_group for security_group, _ in security_groups])
+        core_utils.bulk_sync(current_rules, rules,
+                             key_fields=('security_group_id', 'backend_id'),
+                             update_fields=('from_port', 'to_port', 'protocol', 'cidr'))
 
     def _get_current_properties(self, model):
         return {p.backend_id: p for p in model.objects.filter(settings=self.settings)}
 
-    def _pull_images(self, model_class, filter_function=None):
+    def _get_images(self, filter_function=None):
         glance = self.glance_client
         try:
             images = glance.images.list()
+            images = [image for image in images if not image['status'] == 'deleted']
         except glance_exceptions.ClientException as e:
             reraise(e)
 
-        images = [image for image in images if not image['status'] == 'deleted']
         if filter_function:
             images = filter(filter_function, images)
-
-        with transaction.atomic():
-            cur_images = self._get_current_properties(model_class)
-            for backend_image in images:
-                cur_images.pop(backend_image['id'], None)
-                model_class.objects.update_or_create(
-                    settings=self.settings,
-                    backend_id=backend_image['id'],
-                    defaults={
-                        'name': backend_image['name'],
-                        'min_ram': backend_image['min_ram'],
-                        'min_disk': self.gb2mb(backend_image['min_disk']),
-                    })
-            model_class.objects.filter(backend_id__in=cur_images.keys(), settings=self.settings).delete()
+        return images
+
+    def _pull_images(self, model_class, filter_function=None, images=None):
+        """
+        :param images: list of backend images if they have been fetched already
+        """
+        if images is None:
+            images = self._get_images(filter_function)
+
+        imported_images = [
+            model_class(
+                settings=self.settings,
+                backend_id=backend_image['id'],
+                name=backend_image['name'],
+                min_ram=backend_image['min_ram'],
+                min_disk=self.gb2mb(backend_image['min_disk']),
+            )
+            for backend_image in images
+        ]
+        core_utils.bulk_sync(model_class.objects.filter(settings=self.settings), imported_images,
+                             key_fields=('backend_id',), update_fields=('name', 'min_ram', 'min_disk'))
 
     def _delete_backend_floating_ip(self, backend_id, tenant_backend_id):
         neutron = self.neutron_client
@@ -0,0 +1,509 @@
+"""
+In-memory stand-in for OpenStack API clients.
+
+Clients expose the subset of Keystone, Nova, Neutron, Cinder and Glance client methods used
+by backends. Each API call sleeps for configured latency to simulate network round trip,
+so that fake cloud is suitable for benchmarks of synchronization and provisioning.
+Created resources become active and deleted resources disappear immediately.
+"""
+from __future__ import unicode_literals
+
+from contextlib import contextmanager
+import threading
+import time
+import uuid
+
+from cinderclient import exceptions as cinder_exceptions
+from keystoneclient import exceptions as keystone_exceptions
+from neutronclient.client import exceptions as neutron_exceptions
+from novaclient import exceptions as nova_exceptions
+import six
+
+from waldur_openstack.openstack_base.backend import BaseOpenStackBackend
+
+
+class Resource(object):
+    """
+    Mimics resource of Keystone, Nova and Cinder clients.
+    """
+    def __init__(self, **info):
+        self._info = info
+        self.__dict__.update(info)
+
+    def to_dict(self):
+        return dict(self._info)
+
+    def delete(self):
+        self.manager.delete(self)
+
+    def force_delete(self):
+        self.manager.delete(self)
+
+
+class FakeCloud(object):
+    def __init__(self, tenant_id=None, latency=0):
+        self.tenant_id = tenant_id or uuid.uuid4().hex
+        self.latency = latency
+        self.calls = []
+        self._lock = threading.Lock()
+
+        self.tenants = []
+        self.flavors = []
+        # Private flavors are not listed, but they can be fetched by ID
+        self.private_flavors = []
+        self.images = []
+        self.security_groups = []
+        self.networks = []
+        self.subnets = []
+        self.routers = []
+        self.ports = []
+        self.floating_ips = []
+        self.volumes = []
+        self.snapshots = []
+        self.servers = []
+        self.keypairs = []
+
+    def call(self, name):
+        with self._lock:
+            self.calls.append(name)
+        if self.latency:
+            time.sleep(self.latency)
+
+    def seed(self, flavors=10, images=10, security_groups=5, rules=5, networks=2,
+             servers=10, volumes=10, snapshots=5, floating_ips=5, tenants=0, routers=0):
+        for index in range(tenants):
+            # The first tenant is the one which owns other resources
+            self.tenants.append(Resource(
+                id=self.tenant_id if index == 0 else new_id(), name='tenant-%s' % index, description='',
+                domain_id='default', enabled=True))
+
+        for index in range(flavors):
+            self.flavors.append(Resource(
+                id=new_id(), name='flavor-%s' % index, vcpus=index % 8 + 1, ram=1024 * (index % 8 + 1), disk=20))
+
+        for index in range(images):
+            self.images.append(dict(
+                id=new_id(), name='image-%s' % index, status='active', visibility='public', min_ram=0, min_disk=1))
+
+        for index in range(security_groups):
+            self.security_groups.append(dict(
+                id=new_id(), name='group-%s' % index, description='', tenant_id=self.tenant_id,
+                security_group_rules=[dict(
+                    id=new_id(), direction='ingress', protocol='tcp', port_range_min=port,
+                    port_range_max=port, remote_ip_prefix='0.0.0.0/0',
+                ) for port in range(22, 22 + rules)]))
+
+        for index in range(networks):
+            network_id = new_id()
+            subnet_id = new_id()
+            self.networks.append(dict(
+                id=network_id, name='network-%s' % index, description='', tenant_id=self.tenant_id,
+                subnets=[subnet_id], **{'router:external': False}))
+            self.subnets.append(dict(
+                id=subnet_id, name='subnet-%s' % index, description='', network_id=network_id,
+                allocation_pools=[{'start': '10.0.%s.10' % index, 'end': '10.0.%s.200' % index}],
+                cidr='10.0.%s.0/24' % index, ip_version=4, gateway_ip='10.0.%s.1' % index, enable_dhcp=True,
+            ))
+
+        for index in range(routers):
+            router_id = new_id()
+            self.routers.append(dict(id=router_id, name='router-%s' % index, tenant_id=self.tenant_id))
+            if self.subnets:
+                port = self.new_port(self.subnets[0], [])
+                port.update(device_id=router_id, device_owner='network:router_interface')
+                self.ports.append(port)
+
+        for index in range(servers):
+            flavor = self.flavors[index % len(self.flavors)] if self.flavors else None
+            server = self.new_server('server-%s' % index, flavor)
+            self.servers.append(server)
+            if self.subnets:
+                port = self.new_port(self.subnets[index % len(self.subnets)],
+                                     [group['id'] for group in self.security_groups[:1]])
+                port.update(device_id=server.id, device_owner='compute:nova')
+                self.ports.append(port)
+
+        for index in range(floating_ips):
+            port = self.ports[index] if index < len(self.ports) else None
+            self.floating_ips.append(dict(
+                id=new_id(), floating_ip_address='192.168.0.%s' % (index % 250 + 2), floating_network_id=new_id(),
+                status='ACTIVE' if port else 'DOWN', port_id=port and port['id']))
+
+        for index in range(volumes):
+            self.volumes.append(self.new_volume('volume-%s' % index, size=10))
+
+        for index in range(snapshots):
+            volume = self.volumes[index % len(self.volumes)] if self.volumes else None
+            self.snapshots.append(Resource(
+                id=new_id(), name='snapshot-%s' % index, description='', size=10, metadata={},
+                status='available', volume_id=volume and volume.id))
+        return self
+
+    def new_server(self, name, flavor, key_name=None):
+        return Resource(**{
+            'id': new_id(), 'name': name, 'status': 'ACTIVE', 'key_name': key_name or '',
+            'created': '2018-01-01T10:00:00Z', 'OS-SRV-USG:launched_at': '2018-01-01T10:05:00',
+            'flavor': {'id': flavor.id} if flavor else {},
+        })
+
+    def new_volume(self, name, size, description='', volume_type=None, image_id=None):
+        info = dict(
+            id=new_id(), name=name, description=description or '', size=size, metadata={},
+            volume_type=volume_type or '', bootable='true' if image_id else 'false',
+            status='available', attachments=[])
+        if image_id:
+            info['volume_image_metadata'] = {'image_id': image_id}
+        return Resource(**info)
+
+    def new_port(self, subnet, security_groups):
+        index = len(self.ports)
+        return dict(
+            id=new_id(), mac_address='fa:16:3e:00:%02x:%02x' % (index // 256 % 256, index % 256),
+            network_id=subnet['network_id'], device_id='', device_owner='',
+            fixed_ips=[{'ip_address': '10.0.%s.%s' % (index // 250 % 250, index % 250 + 2),
+                        'subnet_id': subnet['id']}],
+            security_groups=list(security_groups),
+        )
+
+    @property
+    def keystone(self):
+        return FakeKeystoneClient(self)
+
+    @property
+    def nova(self):
+        return FakeNovaClient(self)
+
+    @property
+    def neutron(self):
+        return FakeNeutronClient(self)
+
+    @property
+    def cinder(self):
+        return FakeCinderClient(self)
+
+    @property
+    def glance(self):
+        return FakeGlanceClient(self)
+
+    def install(self, backend):
+        """
+        Replace clients of OpenStack backend with fake ones.
+        """
+        for name in ('keystone', 'nova', 'neutron', 'cinder', 'glance'):
+            setattr(backend, '%s_client' % name, getattr(self, name))
+            setattr(backend, '%s_admin_client' % name, getattr(self, name))
+        return backend
+
+    @contextmanager
+    def patch(self):
+        """
+        Replace clients of all OpenStack backends with fake ones within context.
+        It is needed when backends are created by executors and tasks.
+        """
+        def get_client(backend, name=None, admin=False):
+            return getattr(self, name) if name else self
+
+        original = BaseOpenStackBackend.__dict__['get_client']
+        BaseOpenStackBackend.get_client = get_client
+        try:
+            yield self
+        finally:
+            BaseOpenStackBackend.get_client = original
+
+
+def new_id():
+    return uuid.uuid4().hex
+
+
+def matches(item, filters):
+    """
+    Filters on attributes which item does not have are ignored.
+    If filter value is a list, item matches any of its values.
+    """
+    for name, value in filters.items():
+        if isinstance(item, dict):
+            if name not in item:
+                continue
+            actual = item[name]
+        else:
+            if not hasattr(item, name):
+                continue
+            actual = getattr(item, name)
+
+        if isinstance(value, six.string_types) or not hasattr(value, '__iter__'):
+            value = [value]
+        if actual not in list(value):
+            return False
+    return True
+
+
+class FakeManager(object):
+    not_found = nova_exceptions.NotFound
+
+    def __init__(self, cloud, name, items=None, hidden_items=(), **quotas):
+        self.cloud = cloud
+        self.name = name
+        self.items = items
+        self.hidden_items = hidden_items
+        self.quotas = quotas
+
+    def list(self, *args, **kwargs):
+        self.cloud.call('%s.list' % self.name)
+        return [self._bind(item) for item in self.items]
+
+    def findall(self, **kwargs):
+        self.cloud.call('%s.findall' % self.name)
+        return [self._bind(item) for item in self.items if matches(item, kwargs)]
+
+    def find(self, **kwargs):
+        self.cloud.call('%s.find' % self.name)
+        for item in self.items:
+            if matches(item, kwargs):
+                return self._bind(item)
+        raise self.not_found(404)
+
+    def get(self, resource_id=None, tenant_id=None):
+        self.cloud.call('%s.get' % self.name)
+        if self.quotas:
+            return Resource(**self.quotas)
+        return self._get(resource_id)
+
+    def update(self, resource_id, **kwargs):
+        self.cloud.call('%s.update' % self.name)
+        self._get(resource_id).__dict__.update(kwargs)
+
+    def delete(self, resource_id):
+        self.cloud.call('%s.delete' % self.name)
+        self.items.remove(self._get(resource_id))
+
+    def _get(self, resource_id):
+        # Clients accept either resource or its ID
+        resource_id = getattr(resource_id, 'id', resource_id)
+        for item in list(self.items) + list(self.hidden_items):
+            if item.id == resource_id:
+                return self._bind(item)
+        raise self.not_found(404)
+
+    def _bind(self, item):
+        # Resources could be deleted using their own methods
+        item.manager = self
+        return item
+
+
+class FakeServerManager(FakeManager):
+    def create(self, name, image, flavor, block_device_mapping_v2=(), nics=(), key_name=None, **kwargs):
+        self.cloud.call('%s.create' % self.name)
+        server = self.cloud.new_server(name, flavor, key_name)
+
+        for index, mapping in enumerate(block_device_mapping_v2):
+            volume = FakeVolumeManager(self.cloud, 'cinder.volumes', self.cloud.volumes)._get(mapping['uuid'])
+            volume.status = 'in-use'
+            volume.attachments = [{'server_id': server.id, 'device': '/dev/vd%s' % chr(ord('a') + index)}]
+
+        port_ids = {nic['port-id'] for nic in nics}
+        for port in self.cloud.ports:
+            if port['id'] in port_ids:
+                port.update(device_id=server.id, device_owner='compute:nova')
+
+        self.items.append(server)
+        return server
+
+    def delete(self, server_id):
+        super(FakeServerManager, self).delete(server_id)
+        server_id = getattr(server_id, 'id', server_id)
+        # Volumes are attached with delete_on_termination flag
+        self.cloud.volumes[:] = [volume for volume in self.cloud.volumes if not any(
+            attachment['server_id'] == server_id for attachment in volume.attachments)]
+        for port in self.cloud.ports:
+            if port['device_id'] == server_id:
+                port.update(device_id='', device_owner='')
+
+    def list_security_group(self, server_id):
+        self.cloud.call('%s.list_security_group' % self.name)
+        group_ids = set()
+        for port in self.cloud.ports:
+            if port['device_id'] == server_id:
+                group_ids.update(port['security_groups'])
+        return [Resource(id=group_id) for group_id in group_ids]
+
+
+class FakeKeypairManager(FakeManager):
+    def create(self, name, public_key):
+        self.cloud.call('%s.create' % self.name)
+        keypair = Resource(id=name, name=name, public_key=public_key, fingerprint='')
+        self.items.append(keypair)
+        return keypair
+
+
+class FakeServerVolumeManager(object):
+    def __init__(self, cloud):
+        self.cloud = cloud
+
+    def get_server_volumes(self, server_id):
+        self.cloud.call('nova.volumes.get_server_volumes')
+        return [Resource(id=volume.id, volumeId=volume.id) for volume in self.cloud.volumes if any(
+            attachment['server_id'] == server_id for attachment in volume.attachments)]
+
+
+class FakeNovaClient(object):
+    def __init__(self, cloud):
+        self.flavors = FakeManager(cloud, 'nova.flavors', cloud.flavors, cloud.private_flavors)
+        self.servers = FakeServerManager(cloud, 'nova.servers', cloud.servers)
+        self.keypairs = FakeKeypairManager(cloud, 'nova.keypairs', cloud.keypairs)
+        self.volumes = FakeServerVolumeManager(cloud)
+        self.quotas = FakeManager(cloud, 'nova.quotas', ram=-1, cores=-1, instances=-1)
+
+
+class FakeVolumeManager(FakeManager):
+    not_found = cinder_exceptions.NotFound
+
+    def create(self, size, name='', description='', volume_type=None, imageRef=None, **kwargs):
+        self.cloud.call('%s.create' % self.name)
+        volume = self.cloud.new_volume(name, size, description, volume_type, image_id=imageRef)
+        self.items.append(volume)
+        return volume
+
+    def set_bootable(self, volume, flag):
+        self.cloud.call('%s.set_bootable' % self.name)
+        self._get(volume).bootable = 'true' if flag else 'false'
+
+    def extend(self, volume, size):
+        self.cloud.call('%s.extend' % self.name)
+        self._get(volume).size = size
+
+
+class FakeSnapshotManager(FakeManager):
+    not_found = cinder_exceptions.NotFound
+
+    def create(self, volume_id, name='', description='', force=False, **kwargs):
+        self.cloud.call('%s.create' % self.name)
+        volume = FakeVolumeManager(self.cloud, 'cinder.volumes', self.cloud.volumes)._get(volume_id)
+        snapshot = Resource(id=new_id(), name=name, description=description or '', size=volume.size,
+                            metadata={}, status='available', volume_id=volume.id)
+        self.items.append(snapshot)
+        return snapshot
+
+
+class FakeCinderClient(object):
+    def __init__(self, cloud):
+        self.volumes = FakeVolumeManager(cloud, 'cinder.volumes', cloud.volumes)
+        self.volume_snapshots = FakeSnapshotManager(cloud, 'cinder.volume_snapshots', cloud.snapshots)
+        self.quotas = FakeManager(cloud, 'cinder.quotas', gigabytes=-1, snapshots=-1, volumes=-1)
+
+
+class FakeGlanceClient(object):
+    def __init__(self, cloud):
+        self.images = FakeManager(cloud, 'glance.images', cloud.images)
+
+
+class FakeKeystoneManager(FakeManager):
+    not_found = keystone_exceptions.NotFound
+
+
+class FakeKeystoneClient(object):
+    def __init__(self, cloud):
+        self.projects = FakeKeystoneManager(cloud, 'keystone.projects', cloud.tenants)
+        self.users = FakeKeystoneManager(cloud, 'keystone.users', [])
+        self.domains = FakeKeystoneManager(cloud, 'keystone.domains', [Resource(id='default', name='Default')])
+
+
+class FakeNeutronClient(object):
+    def __init__(self, cloud):
+        self.cloud = cloud
+
+    def _list(self, name, items, filters):
+        self.cloud.call('neutron.list_%s' % name)
+        return {name: [item for item in list(items) if matches(item, filters)]}
+
+    def _get(self, items, item_id):
+        # Items are copied, because they could be deleted concurrently
+        for item in list(items):
+            if item['id'] == item_id:
+                return item
+        raise neutron_exceptions.NotFound()
+
+    def list_security_groups(self, **kwargs):
+        return self._list('security_groups', self.cloud.security_groups, kwargs)
+
+    def list_networks(self, **kwargs):
+        return self._list('networks', self.cloud.networks, kwargs)
+
+    def list_subnets(self, **kwargs):
+        return self._list('subnets', self.cloud.subnets, kwargs)
+
+    def list_ports(self, **kwargs):
+        return self._list('ports', self.cloud.ports, kwargs)
+
+    def list_floatingips(self, **kwargs):
+        return self._list('floatingips', self.cloud.floating_ips, kwargs)
+
+    def list_routers(self, **kwargs):
+        return self._list('routers', self.cloud.routers, kwargs)
+
+    def remove_interface_router(self, router_id, body):
+        self.cloud.call('neutron.remove_interface_router')
+        port = self._get(self.cloud.ports, body['port_id'])
+        if port['device_id'] != router_id:
+            raise neutron_exceptions.NotFound()
+        self.cloud.ports.remove(port)
+
+    def delete_router(self, router_id):
+        self.cloud.call('neutron.delete_router')
+        self.cloud.routers.remove(self._get(self.cloud.routers, router_id))
+
+    def delete_network(self, network_id):
+        self.cloud.call('neutron.delete_network')
+        self.cloud.networks.remove(self._get(self.cloud.networks, network_id))
+
+    def delete_subnet(self, subnet_id):
+        self.cloud.call('neutron.delete_subnet')
+        self.cloud.subnets.remove(self._get(self.cloud.subnets, subnet_id))
+
+    def delete_security_group(self, security_group_id):
+        self.cloud.call('neutron.delete_security_group')
+        self.cloud.security_groups.remove(self._get(self.cloud.security_groups, security_group_id))
+
+    def create_port(self, body):
+        self.cloud.call('neutron.create_port')
+        subnet = self._get(self.cloud.subnets, body['port']['fixed_ips'][0]['subnet_id'])
+        port = self.cloud.new_port(subnet, body['port'].get('security_groups', []))
+        self.cloud.ports.append(port)
+        return {'port': port}
+
+    def delete_port(self, port_id):
+        self.cloud.call('neutron.delete_port')
+        self.cloud.ports.remove(self._get(self.cloud.ports, port_id))
+
+    def create_floatingip(self, body):
+        self.cloud.call('neutron.create_floatingip')
+        index = len(self.cloud.floating_ips)
+        floating_ip = dict(
+            id=new_id(), floating_ip_address='192.168.%s.%s' % (index // 250 % 250, index % 250 + 2),
+            floating_network_id=body['floatingip']['floating_network_id'], status='DOWN', port_id=None)
+        self.cloud.floating_ips.append(floating_ip)
+        return {'floatingip': floating_ip}
+
+    def update_floatingip(self, floating_ip_id, body):
+        self.cloud.call('neutron.update_floatingip')
+        floating_ip = self._get(self.cloud.floating_ips, floating_ip_id)
+        port_id = body['floatingip'].get('port_id')
+        floating_ip.update(port_id=port_id, status='ACTIVE' if port_id else 'DOWN')
+        return {'floatingip': floating_ip}
+
+    def show_floatingip(self, floating_ip_id):
+        self.cloud.call('neutron.show_floatingip')
+        return {'floatingip': self._get(self.cloud.floating_ips, floating_ip_id)}
+
+    def delete_floatingip(self, floating_ip_id):
+        self.cloud.call('neutron.delete_floatingip')
+        self.cloud.floating_ips.remove(self._get(self.cloud.floating_ips, floating_ip_id))
+
+    def show_quota(self, tenant_id):
+        self.cloud.call('neutron.show_quota')
+        return {'quota': {
+            'security_group': -1,
+            'security_group_rule': -1,
+            'floatingip': -1,
+            'network': -1,
+            'subnet': -1,
+        }}
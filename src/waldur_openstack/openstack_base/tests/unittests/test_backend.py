@@ -9,8 +9,12 @@ from glanceclient import exc as glance_exceptions
 from keystoneclient import exceptions as keystone_exceptions
 from neutronclient.client import exceptions as neutron_exceptions
 from novaclient import exceptions as nova_exceptions
+import mock
 
-from waldur_openstack.openstack_base.backend import OpenStackBackendError
+from waldur_openstack.openstack.models import Tenant
+from waldur_openstack.openstack_base.backend import (
+    BaseOpenStackBackend, OpenStackBackendError, OpenStackClientRegistry, TenantQuotasUsageCollector)
+from waldur_openstack.openstack_base.fake_cloud import FakeCloud
 
 
 @ddt
@@ -38,3 +42,95 @@ class TestOpenStackBackendError(TestCase):
             pickle.loads(pickle.dumps(exc))
         except Exception as e:
             self.fail('Reraised exception is not serializable: %s' % str(e))
+
+
+class FakeSession(object):
+    def __init__(self, expiring=False):
+        self.expiring = expiring
+
+    def is_expiring(self):
+        return self.expiring
+
+
+class FakeClient(object):
+    def __init__(self, expiring=False):
+        self.session = FakeSession(expiring)
+
+
+class TestOpenStackClientRegistry(TestCase):
+    def setUp(self):
+        self.registry = OpenStackClientRegistry(max_size=2)
+
+    def test_client_is_reused(self):
+        client = self.registry.get(('settings', 'tenant', 'hash'), FakeClient)
+        self.assertIs(self.registry.get(('settings', 'tenant', 'hash'), FakeClient), client)
+        self.assertEqual(self.registry.get_stats()['hits'], 1)
+        self.assertEqual(self.registry.get_stats()['misses'], 1)
+
+    def test_client_is_created_again_if_token_is_expiring(self):
+        client = self.registry.get(('settings', 'tenant', 'hash'), FakeClient)
+        client.session.expiring = True
+        self.assertIsNot(self.registry.get(('settings', 'tenant', 'hash'), FakeClient), client)
+
+    def test_least_recently_used_client_is_evicted(self):
+        first = self.registry.get(('settings', 'first', 'hash'), FakeClient)
+        self.registry.get(('settings', 'second', 'hash'), FakeClient)
+        self.registry.get(('settings', 'first', 'hash'), FakeClient)
+        self.registry.get(('settings', 'third', 'hash'), FakeClient)
+
+        self.assertIs(self.registry.get(('settings', 'first', 'hash'), FakeClient), first)
+        self.assertEqual(self.registry.get_stats()['evictions'], 1)
+        self.assertEqual(self.registry.get_stats()['size'], 2)
+
+    def test_clients_of_service_settings_are_invalidated(self):
+        client = self.registry.get(('settings', 'tenant', 'hash'), FakeClient)
+        other_client = self.registry.get(('other', 'tenant', 'hash'), FakeClient)
+
+        self.registry.invalidate('settings')
+
+        self.assertIsNot(self.registry.get(('settings', 'tenant', 'hash'), FakeClient), client)
+        self.assertIs(self.registry.get(('other', 'tenant', 'hash'), FakeClient), other_client)
+
+
+class TestTenantQuotasUsageCollector(TestCase):
+    def setUp(self):
+        self.cloud = FakeCloud().seed(flavors=2, servers=4, volumes=3, snapshots=1, security_groups=2, rules=3)
+        self.backend = self.cloud.install(BaseOpenStackBackend(settings=mock.Mock()))
+
+    def collect(self):
+        return TenantQuotasUsageCollector(self.backend, self.cloud.tenant_id).collect()
+
+    def test_usage_is_calculated(self):
+        usage = self.collect()
+
+        self.assertEqual(usage[Tenant.Quotas.instances], 4)
+        self.assertEqual(usage[Tenant.Quotas.vcpu], sum(flavor.vcpus for flavor in self.cloud.flavors) * 2)
+        self.assertEqual(usage[Tenant.Quotas.volumes_size], 3 * 10 * 1024)
+        self.assertEqual(usage[Tenant.Quotas.storage], 4 * 10 * 1024)
+        self.assertEqual(usage[Tenant.Quotas.security_group_rule_count], 6)
+
+    def test_listed_flavors_are_not_fetched_one_by_one(self):
+        self.collect()
+        self.assertNotIn('nova.flavors.get', self.cloud.calls)
+
+    def test_unknown_flavor_is_fetched_only_once(self):
+        private_flavor = self.cloud.flavors.pop()
+        self.cloud.private_flavors.append(private_flavor)
+
+        usage = self.collect()
+
+        self.assertEqual(self.cloud.calls.count('nova.flavors.get'), 1)
+        self.assertEqual(usage[Tenant.Quotas.ram], sum(server_flavor.ram for server_flavor in (
+            self.cloud.flavors + self.cloud.private_flavors)) * 2)
+
+    def test_missing_flavor_is_skipped(self):
+        self.cloud.flavors.pop()
+
+        usage = self.collect()
+
+        self.assertEqual(usage[Tenant.Quotas.vcpu], self.cloud.flavors[0].vcpus * 2)
+
+    def test_duration_of_each_call_is_reported(self):
+        collector = TenantQuotasUsageCollector(self.backend, self.cloud.tenant_id)
+        collector.collect()
+        self.assertEqual(set(collector.timings), set(collector.get_listings()))
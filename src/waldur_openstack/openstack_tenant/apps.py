@@ -14,6 +14,7 @@ class OpenStackTenantConfig(AppConfig):
     service_name = 'OpenStackTenant'
 
     def ready(self):
+        from waldur_core.core import signals as core_signals
         from waldur_core.quotas.fields import QuotaField, TotalQuotaField
         from waldur_core.structure.models import ServiceSettings, Project, Customer
         from waldur_core.structure import SupportedServices
@@ -200,3 +201,9 @@ class OpenStackTenantConfig(AppConfig):
             sender=models.Flavor,
             dispatch_uid='openstack_tenant.handlers.sync_price_list_item_for_flavor',
         )
+
+        core_signals.bulk_synchronized.connect(
+            handlers.sync_price_list_items_for_pulled_flavors,
+            sender=models.Flavor,
+            dispatch_uid='openstack_tenant.handlers.sync_price_list_items_for_pulled_flavors',
+        )
@@ -1,9 +1,12 @@
+from collections import OrderedDict
 import json
 import logging
 import re
+import time
 
 from ceilometerclient import exc as ceilometer_exceptions
 from cinderclient import exceptions as cinder_exceptions
+from django.conf import settings as django_settings
 from django.db import transaction, IntegrityError
 from django.utils import timezone, dateparse
 from django.utils.functional import cached_property
@@ -11,6 +14,7 @@ from keystoneclient import exceptions as keystone_exceptions
 from neutronclient.client import exceptions as neutron_exceptions
 from novaclient import exceptions as nova_exceptions
 
+from waldur_core.core import signals as core_signals, utils as core_utils
 from waldur_core.structure import log_backend_action
 from waldur_core.structure.utils import (
     update_pulled_fields, handle_resource_not_found, handle_resource_update_success)
@@ -46,21 +50,24 @@ class InternalIPSynchronizer(object):
     It is assumed that all subnets for the current tenant have been successfully synchronized.
     """
 
-    def __init__(self, neutron_client, tenant_id, settings):
+    def __init__(self, neutron_client, tenant_id, settings, backend_ports=None):
         self.neutron_client = neutron_client
         self.tenant_id = tenant_id
         self.settings = settings
+        self.backend_ports = backend_ports
 
     @cached_property
     def remote_ips(self):
         """
-        Fetch all Neutron ports for the current tenant.
+        Fetch all Neutron ports for the current tenant unless they have been fetched already.
         Convert Neutron port to local internal IP model.
         """
-        try:
-            ips = self.neutron_client.list_ports(tenant_id=self.tenant_id)['ports']
-        except neutron_exceptions.NeutronClientException as e:
-            reraise(e)
+        ips = self.backend_ports
+        if ips is None:
+            try:
+                ips = self.neutron_client.list_ports(tenant_id=self.tenant_id)['ports']
+            except neutron_exceptions.NeutronClientException as e:
+                reraise(e)
 
         return [backend_internal_ip_to_internal_ip(ip) for ip in ips]
 
@@ -167,24 +174,61 @@ class OpenStackTenantBackend(BaseOpenStackBackend):
     def external_network_id(self):
         return self.settings.options['external_network_id']
 
+    def get_sync_stages(self):
+        """
+        Each stage consists of name, method fetching remote objects and method storing them.
+        Fetching methods do not access database, so that they are called concurrently.
+        Stages are ordered by dependencies: for example, subnets refer to networks,
+        floating IPs refer to internal IPs and volumes refer to images and instances.
+        """
+        return [
+            # service properties
+            ('flavors', self.list_flavors, self.pull_flavors),
+            ('images', self._get_images, self.pull_images),
+            ('security_groups', self.list_security_groups, self.pull_security_groups),
+            ('quotas', self.get_quotas, self.pull_quotas),
+            ('networks', self.list_networks, self.pull_networks),
+            ('subnets', self.list_subnets, self.pull_subnets),
+            ('internal_ips', self.list_ports, self.pull_internal_ips),
+            ('floating_ips', self.list_floating_ips, self.pull_floating_ips),
+
+            # resources
+            ('volumes', self.list_volumes, self.pull_volumes),
+            ('snapshots', self.list_snapshots, self.pull_snapshots),
+            ('instances', self.get_instances_with_ports, lambda result: self.pull_instances(*result)),
+        ]
+
     def sync(self):
-        # pull service properties
-        self.pull_flavors()
-        self.pull_images()
-        self.pull_security_groups()
-        self.pull_quotas()
-        self.pull_networks()
-        self.pull_subnets()
-        self.pull_internal_ips()
-        self.pull_floating_ips()
-
-        # pull resources
-        self.pull_volumes()
-        self.pull_snapshots()
-        self.pull_instances()
-
-    def pull_volumes(self):
-        backend_volumes = self.get_volumes()
+        """
+        Remote objects are fetched by bounded pool of threads,
+        then database is updated in the calling thread stage by stage.
+        :return: dict mapping stage name to tuple of fetch and update duration in seconds
+        """
+        stages = self.get_sync_stages()
+        workers = django_settings.WALDUR_OPENSTACK_TENANT.get('MAX_CONCURRENT_PULL', 4)
+
+        def fetch(stage):
+            start = time.time()
+            result = stage[1]()
+            return result, time.time() - start
+
+        # Session is initialized in the calling thread, so that it is reused by worker threads
+        self.nova_client
+        results = core_utils.concurrent_map(fetch, stages, workers)
+
+        timings = OrderedDict()
+        for (name, _, pull), (result, fetch_time) in zip(stages, results):
+            start = time.time()
+            pull(result)
+            timings[name] = (fetch_time, time.time() - start)
+
+        logger.info('Tenant %s is synchronized. Fetch and update time per stage: %s', self.settings, ', '.join(
+            '%s %.3f/%.3f' % (name, fetch_time, update_time)
+            for name, (fetch_time, update_time) in timings.items()))
+        return timings
+
+    def pull_volumes(self, backend_volumes=None):
+        backend_volumes = self.get_volumes(backend_volumes)
         volumes = models.Volume.objects.filter(
             service_project_link__service__settings=self.settings,
             state__in=[models.Volume.States.OK, models.Volume.States.ERRED]
@@ -199,8 +243,8 @@ class OpenStackTenantBackend(BaseOpenStackBackend):
                 update_pulled_fields(volume, backend_volume, models.Volume.get_backend_fields())
                 handle_resource_update_success(volume)
 
-    def pull_snapshots(self):
-        backend_snapshots = self.get_snapshots()
+    def pull_snapshots(self, backend_snapshots=None):
+        backend_snapshots = self.get_snapshots(backend_snapshots)
         snapshots = models.Snapshot.objects.filter(
             service_project_link__service__settings=self.settings,
             state__in=[models.Snapshot.States.OK, models.Snapshot.States.ERRED])
@@ -215,14 +259,24 @@ class OpenStackTenantBackend(BaseOpenStackBackend):
                 update_pulled_fields(snapshot, backend_snapshot, models.Snapshot.get_backend_fields())
                 handle_resource_update_success(snapshot)
 
-    def pull_instances(self):
-        backend_instances = self.get_instances()
+    def get_instances_with_ports(self):
+        return self.get_instances(), self.list_ports()
+
+    def pull_instances(self, backend_instances=None, backend_ports=None):
+        """
+        :param backend_ports: list of backend ports, security groups of instances are resolved from them
+        """
+        if backend_instances is None:
+            backend_instances = self.get_instances()
+        if backend_ports is None:
+            backend_ports = self.list_ports()
         instances = models.Instance.objects.filter(
             service_project_link__service__settings=self.settings,
             state__in=[models.Instance.States.OK, models.Instance.States.ERRED],
         )
         backend_instances_map = {backend_instance.backend_id: backend_instance
                                  for backend_instance in backend_instances}
+        pulled_instances = []
         for instance in instances:
             try:
                 backend_instance = backend_instances_map[instance.backend_id]
@@ -230,9 +284,48 @@ class OpenStackTenantBackend(BaseOpenStackBackend):
                 handle_resource_not_found(instance)
             else:
                 self.update_instance_fields(instance, backend_instance)
-                # XXX: can be optimized after https://goo.gl/BZKo8Y will be resolved.
-                self.pull_instance_security_groups(instance)
                 handle_resource_update_success(instance)
+                pulled_instances.append(instance)
+
+        self._pull_instances_security_groups(pulled_instances, backend_ports)
+
+    def _pull_instances_security_groups(self, instances, backend_ports):
+        """
+        Security groups of instance are the union of security groups of its ports.
+        Memberships are updated with constant number of queries regardless of number of instances.
+        """
+        backend_groups = {instance.backend_id: set() for instance in instances}
+        for backend_port in backend_ports:
+            if backend_port['device_id'] in backend_groups:
+                backend_groups[backend_port['device_id']].update(backend_port.get('security_groups', []))
+
+        # Groups which are not created in OpenStack yet are not touched.
+        groups = {group.backend_id: group.pk for group in models.SecurityGroup.objects.filter(
+            settings=self.settings).exclude(backend_id='')}
+        through = models.Instance.security_groups.through
+        current_memberships = {
+            (instance_id, group_id): pk
+            for pk, instance_id, group_id in through.objects.filter(
+                instance__in=instances, securitygroup__in=groups.values(),
+            ).values_list('pk', 'instance_id', 'securitygroup_id')
+        }
+
+        memberships_to_create = []
+        for instance in instances:
+            for group_id in backend_groups[instance.backend_id]:
+                if group_id not in groups:
+                    logger.warning('Security group with id %s does not exist at Waldur. Service settings: %s',
+                                   group_id, self.settings)
+                    continue
+                if current_memberships.pop((instance.pk, groups[group_id]), None) is None:
+                    memberships_to_create.append(through(instance_id=instance.pk, securitygroup_id=groups[group_id]))
+
+        if not (current_memberships or memberships_to_create):
+            return
+
+        with transaction.atomic():
+            through.objects.filter(pk__in=current_memberships.values()).delete()
+            through.objects.bulk_create(memberships_to_create)
 
     def update_instance_fields(self, instance, backend_instance):
         # Preserve flavor fields in Waldur database if flavor is deleted in OpenStack
@@ -244,48 +337,53 @@ class OpenStackTenantBackend(BaseOpenStackBackend):
 
         update_pulled_fields(instance, backend_instance, fields)
 
-    def pull_flavors(self):
+    def list_flavors(self):
         nova = self.nova_client
         try:
-            flavors = nova.flavors.findall()
+            return nova.flavors.findall()
         except nova_exceptions.ClientException as e:
             reraise(e)
 
+    def pull_flavors(self, flavors=None):
+        if flavors is None:
+            flavors = self.list_flavors()
+
         flavor_exclude_regex = self.settings.options.get('flavor_exclude_regex', '')
         name_pattern = re.compile(flavor_exclude_regex) if flavor_exclude_regex else None
-        with transaction.atomic():
-            cur_flavors = self._get_current_properties(models.Flavor)
-            for backend_flavor in flavors:
-                if name_pattern is not None and name_pattern.match(backend_flavor.name) is not None:
-                    logger.debug('Skipping pull of %s flavor as it matches %s regex pattern.',
-                                 backend_flavor.name, flavor_exclude_regex)
-                    continue
+        imported_flavors = []
+        for backend_flavor in flavors:
+            if name_pattern is not None and name_pattern.match(backend_flavor.name) is not None:
+                logger.debug('Skipping pull of %s flavor as it matches %s regex pattern.',
+                             backend_flavor.name, flavor_exclude_regex)
+                continue
 
-                cur_flavors.pop(backend_flavor.id, None)
-                models.Flavor.objects.update_or_create(
-                    settings=self.settings,
-                    backend_id=backend_flavor.id,
-                    defaults={
-                        'name': backend_flavor.name,
-                        'cores': backend_flavor.vcpus,
-                        'ram': backend_flavor.ram,
-                        'disk': self.gb2mb(backend_flavor.disk),
-                    })
+            imported_flavors.append(models.Flavor(
+                settings=self.settings,
+                backend_id=backend_flavor.id,
+                name=backend_flavor.name,
+                cores=backend_flavor.vcpus,
+                ram=backend_flavor.ram,
+                disk=self.gb2mb(backend_flavor.disk),
+            ))
 
-            models.Flavor.objects.filter(backend_id__in=cur_flavors.keys(), settings=self.settings).delete()
+        core_utils.bulk_sync(models.Flavor.objects.filter(settings=self.settings), imported_flavors,
+                             key_fields=('backend_id',), update_fields=('name', 'cores', 'ram', 'disk'))
 
-    def pull_images(self):
-        self._pull_images(models.Image)
+    def pull_images(self, images=None):
+        self._pull_images(models.Image, images=images)
 
-    def pull_floating_ips(self):
-        # method assumes that instance internal IPs is up to date.
+    def list_floating_ips(self):
         neutron = self.neutron_client
-
         try:
-            backend_floating_ips = neutron.list_floatingips(tenant_id=self.tenant_id)['floatingips']
+            return neutron.list_floatingips(tenant_id=self.tenant_id)['floatingips']
         except neutron_exceptions.NeutronClientException as e:
             reraise(e)
 
+    def pull_floating_ips(self, backend_floating_ips=None):
+        # method assumes that instance internal IPs is up to date.
+        if backend_floating_ips is None:
+            backend_floating_ips = self.list_floating_ips()
+
         # Step 1. Prepare data
         imported_ips = {ip.backend_id: ip
                         for ip in (self._backend_floating_ip_to_floating_ip(ip)
@@ -309,6 +407,9 @@ class OpenStackTenantBackend(BaseOpenStackBackend):
             subnet__settings=self.settings).exclude(backend_id=None)}
 
         # Step 2. Update or create imported IPs
+        fields_to_update = models.FloatingIP.get_backend_fields() + ('internal_ip_id',)
+        ips_to_create = []
+        ips_to_save = []
         for backend_id in ips_to_update:
             imported_ip = imported_ips[backend_id]
             floating_ip = floating_ips.get(backend_id) or floating_ips_map.get(imported_ip.address)
@@ -320,21 +421,37 @@ class OpenStackTenantBackend(BaseOpenStackBackend):
 
             imported_ip.internal_ip = internal_ip
             if not floating_ip:
-                imported_ip.save()
-            else:
-                fields_to_update = models.FloatingIP.get_backend_fields() + ('internal_ip',)
-                if floating_ip.address != floating_ip.name:
-                    # Don't update user defined name.
-                    fields_to_update = [field for field in fields_to_update if field != 'name']
+                ips_to_create.append(imported_ip)
+                continue
 
-                update_pulled_fields(floating_ip, imported_ip, fields_to_update)
+            if floating_ip.address != floating_ip.name:
+                # Don't update user defined name.
+                imported_ip.name = floating_ip.name
+            changed_fields = [field for field in fields_to_update
+                              if getattr(floating_ip, field) != getattr(imported_ip, field)]
+            if changed_fields:
+                logger.info('Floating IP with PK %s fields %s are updated.', floating_ip.pk, ', '.join(changed_fields))
+                for field in changed_fields:
+                    setattr(floating_ip, field, getattr(imported_ip, field))
+                ips_to_save.append(floating_ip)
 
         # Step 3. Delete stale IPs
-        ips_to_delete = set(floating_ips) - set(imported_ips)
+        # Floating IP matched by address keeps its row even if it has stale backend ID.
+        updated_pks = {ip.pk for ip in ips_to_save}
+        ips_to_delete = [ip for backend_id, ip in floating_ips.items()
+                         if backend_id not in imported_ips and ip.pk not in updated_pks]
         if ips_to_delete:
-            logger.info('About to delete stale floating IPs: %s', ips_to_delete)
-            models.FloatingIP.objects.filter(settings=self.settings,
-                                             backend_id__in=ips_to_delete).delete()
+            logger.info('About to delete stale floating IPs: %s', [ip.backend_id for ip in ips_to_delete])
+
+        with transaction.atomic():
+            if ips_to_delete:
+                models.FloatingIP.objects.filter(pk__in=[ip.pk for ip in ips_to_delete]).delete()
+            models.FloatingIP.objects.bulk_create(ips_to_create)
+            core_utils.bulk_update(models.FloatingIP, ips_to_save, fields_to_update)
+
+        if ips_to_create or ips_to_save or ips_to_delete:
+            core_signals.bulk_synchronized.send(
+                sender=models.FloatingIP, created=ips_to_create, updated=ips_to_save, deleted=ips_to_delete)
 
     def _backend_floating_ip_to_floating_ip(self, backend_floating_ip, **kwargs):
         floating_ip = models.FloatingIP(
@@ -362,44 +479,59 @@ class OpenStackTenantBackend(BaseOpenStackBackend):
             if stale_ids:
                 model.objects.filter(settings=self.settings, backend_id__in=stale_ids).delete()
 
-    def pull_security_groups(self):
+    def list_security_groups(self):
         neutron = self.neutron_client
         try:
-            security_groups = neutron.list_security_groups(tenant_id=self.tenant_id)['security_groups']
+            return neutron.list_security_groups(tenant_id=self.tenant_id)['security_groups']
         except neutron_exceptions.NeutronClientException as e:
             reraise(e)
 
-        for backend_security_group in security_groups:
-            backend_id = backend_security_group['id']
-            defaults = {
-                'name': backend_security_group['name'],
-                'description': backend_security_group['description']
-            }
-            try:
-                with transaction.atomic():
-                    security_group, _ = models.SecurityGroup.objects.update_or_create(
-                        settings=self.settings,
-                        backend_id=backend_id,
-                        defaults=defaults
-                    )
-                    self._extract_security_group_rules(security_group, backend_security_group)
-            except IntegrityError:
-                logger.warning('Could not create security group with backend ID %s '
-                               'and service settings %s due to concurrent update.',
-                               backend_id, self.settings)
-
-        self._delete_stale_properties(models.SecurityGroup, security_groups)
+    def pull_security_groups(self, security_groups=None):
+        if security_groups is None:
+            security_groups = self.list_security_groups()
 
-    def pull_quotas(self):
-        self._pull_tenant_quotas(self.tenant_id, self.settings)
+        imported_groups = [
+            models.SecurityGroup(
+                settings=self.settings,
+                backend_id=backend_security_group['id'],
+                name=backend_security_group['name'],
+                description=backend_security_group['description'],
+            )
+            for backend_security_group in security_groups
+        ]
+        current_groups = models.SecurityGroup.objects.filter(settings=self.settings)
 
-    def pull_networks(self):
+        try:
+            with transaction.atomic():
+                core_utils.bulk_sync(current_groups, imported_groups,
+                                     key_fields=('backend_id',), update_fields=('name', 'description'))
+                # Primary keys of created groups are not returned by all database backends.
+                groups_map = {group.backend_id: group for group in current_groups.all()}
+                self._pull_security_group_rules([
+                    (groups_map[backend_security_group['id']], backend_security_group)
+                    for backend_security_group in security_groups
+                ])
+        except IntegrityError:
+            logger.warning('Could not pull security groups for service settings %s '
+                           'due to concurrent update.', self.settings)
+
+    def get_quotas(self):
+        return self.get_tenant_quotas(self.tenant_id)
+
+    def pull_quotas(self, quotas=None):
+        self._pull_tenant_quotas(self.tenant_id, self.settings, quotas)
+
+    def list_networks(self):
         neutron = self.neutron_client
         try:
-            networks = neutron.list_networks(tenant_id=self.tenant_id)['networks']
+            return neutron.list_networks(tenant_id=self.tenant_id)['networks']
         except neutron_exceptions.NeutronClientException as e:
             reraise(e)
 
+    def pull_networks(self, networks=None):
+        if networks is None:
+            networks = self.list_networks()
+
         for backend_network in networks:
             defaults = {
                 'name': backend_network['name'],
@@ -423,13 +555,17 @@ class OpenStackTenantBackend(BaseOpenStackBackend):
 
         self._delete_stale_properties(models.Network, networks)
 
-    def pull_subnets(self):
+    def list_subnets(self):
         neutron = self.neutron_client
         try:
-            subnets = neutron.list_subnets(tenant_id=self.tenant_id)['subnets']
+            return neutron.list_subnets(tenant_id=self.tenant_id)['subnets']
         except neutron_exceptions.NeutronClientException as e:
             reraise(e)
 
+    def pull_subnets(self, subnets=None):
+        if subnets is None:
+            subnets = self.list_subnets()
+
         current_networks = {
             network.backend_id: network.id
             for network in models.Network.objects.filter(settings=self.settings).only('id', 'backend_id')
@@ -591,12 +727,16 @@ class OpenStackTenantBackend(BaseOpenStackBackend):
                 ).first()
         return volume
 
-    def get_volumes(self):
+    def list_volumes(self):
         cinder = self.cinder_client
         try:
-            backend_volumes = cinder.volumes.list()
+            return cinder.volumes.list()
         except cinder_exceptions.ClientException as e:
             reraise(e)
+
+    def get_volumes(self, backend_volumes=None):
+        if backend_volumes is None:
+            backend_volumes = self.list_volumes()
         return [self._backend_volume_to_volume(backend_volume) for backend_volume in backend_volumes]
 
     def get_volumes_for_import(self):
@@ -694,12 +834,16 @@ class OpenStackTenantBackend(BaseOpenStackBackend):
                 service_project_link__service__settings=self.settings, backend_id=backend_snapshot.volume_id).first()
         return snapshot
 
-    def get_snapshots(self):
+    def list_snapshots(self):
         cinder = self.cinder_client
         try:
-            backend_snapshots = cinder.volume_snapshots.list()
+            return cinder.volume_snapshots.list()
         except cinder_exceptions.ClientException as e:
             reraise(e)
+
+    def get_snapshots(self, backend_snapshots=None):
+        if backend_snapshots is None:
+            backend_snapshots = self.list_snapshots()
         return [self._backend_snapshot_to_snapshot(backend_snapshot) for backend_snapshot in backend_snapshots]
 
     def get_snapshots_for_import(self):
@@ -1127,8 +1271,15 @@ class OpenStackTenantBackend(BaseOpenStackBackend):
                 logger.info('About to delete internal IPs with IDs %s', stale_ids)
                 instance.internal_ips_set.filter(backend_id__in=stale_ids).delete()
 
-    def pull_internal_ips(self):
-        synchronizer = InternalIPSynchronizer(self.neutron_client, self.tenant_id, self.settings)
+    def list_ports(self):
+        neutron = self.neutron_client
+        try:
+            return neutron.list_ports(tenant_id=self.tenant_id)['ports']
+        except neutron_exceptions.NeutronClientException as e:
+            reraise(e)
+
+    def pull_internal_ips(self, backend_ports=None):
+        synchronizer = InternalIPSynchronizer(self.neutron_client, self.tenant_id, self.settings, backend_ports)
         synchronizer.execute()
 
     @log_backend_action()
@@ -11,6 +11,10 @@ class OpenStackTenantExtension(WaldurExtension):
                 'OpenStackTenant.Volume': 4,
                 'OpenStackTenant.Snapshot': 4,
             },
+            # Number of OpenStack API requests issued concurrently during tenant synchronization
+            'MAX_CONCURRENT_PULL': 4,
+            # Number of expired backups or snapshots marked for deletion in one transaction
+            'EXPIRED_RESOURCES_DELETION_BATCH_SIZE': 100,
         }
 
     @staticmethod
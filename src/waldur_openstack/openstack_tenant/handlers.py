@@ -450,3 +450,10 @@ def update_service_settings(sender, instance, created=False, **kwargs):
 def sync_price_list_item_for_flavor(sender, instance, created=False, **kwargs):
     if created:
         utils.sync_price_list_item(instance)
+
+
+def sync_price_list_items_for_pulled_flavors(sender, created, **kwargs):
+    # Price list item depends only on flavor name
+    flavors = {flavor.name: flavor for flavor in created}
+    for flavor in flavors.values():
+        utils.sync_price_list_item(flavor)
@@ -0,0 +1,195 @@
+from __future__ import unicode_literals
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from waldur_core.structure import models as structure_models
+from waldur_openstack.openstack import executors as openstack_executors, models as openstack_models
+from waldur_openstack.openstack.apps import OpenStackConfig
+from waldur_openstack.openstack_base.fake_cloud import FakeCloud
+from waldur_openstack.openstack_tenant import executors, models
+from waldur_openstack.openstack_tenant.apps import OpenStackTenantConfig
+
+
+class Command(BaseCommand):
+    help = ('Measure duration and number of database queries of OpenStack operations '
+            'against fake OpenStack cloud with configurable API latency. '
+            'Synthetic data is created in transaction which is rolled back afterwards.')
+
+    SCENARIOS = ('sync', 'pull_tenants', 'provisioning', 'cleanup', 'tenant_deletion')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--latency', type=float, default=0.05,
+                            help='Duration of each OpenStack API call in seconds.')
+        parser.add_argument('--tenants', type=int, default=20,
+                            help='Number of tenants in OpenStack cloud.')
+        parser.add_argument('--servers', type=int, default=20,
+                            help='Number of servers, volumes and floating IPs in tenant.')
+        parser.add_argument('--instances', type=int, default=5,
+                            help='Number of instances provisioned and deleted.')
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Number of concurrent API calls during tenant synchronization.')
+        parser.add_argument('--scenario', action='append', choices=self.SCENARIOS,
+                            help='Scenario to run. By default all scenarios are run.')
+
+    def handle(self, *args, **options):
+        scenarios = options['scenario'] or self.SCENARIOS
+        self.cloud = FakeCloud().seed(
+            tenants=options['tenants'],
+            servers=options['servers'],
+            volumes=options['servers'],
+            floating_ips=options['servers'],
+            routers=1,
+        )
+
+        with transaction.atomic(), self.cloud.patch():
+            self.create_fixture()
+            # Catalog objects are pulled beforehand, because they are needed for provisioning
+            self.tenant_settings.get_backend().sync()
+
+            self.cloud.latency = options['latency']
+            if 'sync' in scenarios:
+                for title, workers in (('sequential', 1), ('concurrent', options['workers'])):
+                    self.measure_sync('Tenant synchronization (%s)' % title, workers)
+
+            if 'pull_tenants' in scenarios:
+                self.measure('Pull of %s tenants' % options['tenants'], self.admin_settings.get_backend().pull_tenants)
+
+            if 'provisioning' in scenarios or 'cleanup' in scenarios:
+                instances = [self.create_instance(index) for index in range(options['instances'])]
+                self.run_scenario('provisioning' in scenarios, 'Provisioning of %s instances' % len(instances),
+                                  self.provision, instances)
+
+                # Project resources are deleted before tenant deletion in any case
+                self.create_snapshots()
+                self.run_scenario('cleanup' in scenarios, 'Cleanup of project resources', self.cleanup)
+
+            if 'tenant_deletion' in scenarios:
+                self.measure('Deletion of tenant', self.delete_tenant)
+
+            transaction.set_rollback(True)
+
+    def run_scenario(self, is_measured, title, func, *args):
+        if is_measured:
+            self.measure(title, func, *args)
+        else:
+            latency, self.cloud.latency = self.cloud.latency, 0
+            func(*args)
+            self.cloud.latency = latency
+
+    def measure(self, title, func, *args):
+        self.cloud.calls = []
+        with CaptureQueriesContext(connection) as context:
+            start = time.time()
+            result = func(*args)
+            elapsed = time.time() - start
+
+        self.stdout.write('%s: %.3f seconds, %s API calls, %s queries' % (
+            title, elapsed, len(self.cloud.calls), len(context.captured_queries)))
+        return result
+
+    def measure_sync(self, title, workers):
+        tenant_settings = dict(settings.WALDUR_OPENSTACK_TENANT, MAX_CONCURRENT_PULL=workers)
+        with override_settings(WALDUR_OPENSTACK_TENANT=tenant_settings):
+            timings = self.measure(title, self.tenant_settings.get_backend().sync)
+
+        for name, (fetch_time, update_time) in timings.items():
+            self.stdout.write('    %-16s fetch %.3f, update %.3f' % (name, fetch_time, update_time))
+
+    def create_fixture(self):
+        customer = structure_models.Customer.objects.create(name='Benchmark customer')
+        self.project = structure_models.Project.objects.create(name='Benchmark project', customer=customer)
+
+        self.admin_settings = structure_models.ServiceSettings.objects.create(
+            name='Benchmark cloud',
+            customer=customer,
+            type=OpenStackConfig.service_name,
+            backend_url='http://keystone.example.com/v3',
+            username='admin',
+            password='secret',
+            options={'tenant_name': 'admin'},
+        )
+        service = openstack_models.OpenStackService.objects.create(customer=customer, settings=self.admin_settings)
+        link = openstack_models.OpenStackServiceProjectLink.objects.create(service=service, project=self.project)
+
+        # Service settings of tenant are created by signal handler
+        self.tenants = [
+            openstack_models.Tenant.objects.create(
+                name=backend_tenant.name,
+                backend_id=backend_tenant.id,
+                service_project_link=link,
+                state=openstack_models.Tenant.States.OK,
+                external_network_id=self.cloud.networks[0]['id'],
+            )
+            for backend_tenant in self.cloud.tenants
+        ]
+        self.tenant_settings = structure_models.ServiceSettings.objects.get(
+            scope=self.tenants[0], type=OpenStackTenantConfig.service_name)
+        self.tenant_settings.options['external_network_id'] = self.tenants[0].external_network_id
+        self.tenant_settings.save()
+        self.link = models.OpenStackTenantServiceProjectLink.objects.get(
+            service__settings=self.tenant_settings, project=self.project)
+
+    def create_instance(self, index):
+        flavor = models.Flavor.objects.filter(settings=self.tenant_settings).first()
+        image = models.Image.objects.filter(settings=self.tenant_settings).first()
+        subnet = models.SubNet.objects.filter(settings=self.tenant_settings).first()
+
+        instance = models.Instance.objects.create(
+            name='benchmark-%s' % index,
+            service_project_link=self.link,
+            flavor_name=flavor.name,
+            flavor_disk=flavor.disk,
+            cores=flavor.cores,
+            ram=flavor.ram,
+            image_name=image.name,
+            disk=20 * 1024,
+        )
+        instance.security_groups.add(*models.SecurityGroup.objects.filter(settings=self.tenant_settings)[:1])
+        instance.volumes.add(
+            models.Volume.objects.create(
+                name='benchmark-%s-system' % index, service_project_link=self.link, size=10 * 1024,
+                image=image, image_name=image.name, bootable=True),
+            models.Volume.objects.create(
+                name='benchmark-%s-data' % index, service_project_link=self.link, size=10 * 1024),
+        )
+        internal_ip = models.InternalIP.objects.create(
+            instance=instance, subnet=subnet, settings=self.tenant_settings, backend_id=None)
+        models.FloatingIP.objects.create(
+            settings=self.tenant_settings,
+            backend_network_id=self.tenant_settings.options['external_network_id'],
+            is_booked=True,
+            internal_ip=internal_ip,
+        )
+        return instance, flavor
+
+    def provision(self, instances):
+        with override_settings(CELERY_ALWAYS_EAGER=True, CELERY_EAGER_PROPAGATES_EXCEPTIONS=True):
+            for instance, flavor in instances:
+                executors.InstanceCreateExecutor.execute(instance, async=False, flavor=flavor)
+
+    def create_snapshots(self):
+        cinder = self.cloud.cinder
+        for volume in models.Volume.objects.filter(service_project_link=self.link, bootable=False):
+            backend_snapshot = cinder.volume_snapshots.create(volume.backend_id, name=volume.name)
+            models.Snapshot.objects.create(
+                name=volume.name,
+                service_project_link=self.link,
+                source_volume=volume,
+                size=volume.size,
+                backend_id=backend_snapshot.id,
+                state=models.Snapshot.States.OK,
+            )
+
+    def cleanup(self):
+        with override_settings(CELERY_ALWAYS_EAGER=True, CELERY_EAGER_PROPAGATES_EXCEPTIONS=True):
+            executors.OpenStackTenantCleanupExecutor.execute(self.project, async=False)
+
+    def delete_tenant(self):
+        # The first tenant owns all resources of fake cloud
+        with override_settings(CELERY_ALWAYS_EAGER=True, CELERY_EAGER_PROPAGATES_EXCEPTIONS=True):
+            openstack_executors.TenantDeleteExecutor.execute(self.tenants[0], async=False)
@@ -9,6 +9,7 @@ from django.utils import timezone
 
 from waldur_core.core import tasks as core_tasks
 from waldur_core.core import models as core_models
+from waldur_core.core import utils as core_utils
 from waldur_core.quotas import exceptions as quotas_exceptions
 from waldur_core.structure import (tasks as structure_tasks,
                                    SupportedServices)
@@ -125,11 +126,17 @@ class BaseScheduleTask(core_tasks.BackgroundTask):
        Please note that last resource for deletion is chosen by value of *created* attribute.
        It means that oldest resource is selected for deletion.
 
-    4. Database records for resources are created and deleted synchronously,
+    4. Due schedules are claimed atomically: rows locked by concurrent run are skipped and
+       value of next_trigger_at attribute is advanced before resources are created.
+       Therefore each trigger of schedule is executed only once, even if schedule task is run concurrently.
+       However, if execution of claimed schedule fails, it is not retried until next trigger.
+       If new resource is not created because number of resources has reached limit,
+       schedule is kept due so that it is executed again by next run of schedule task.
+
+       Database records for resources are created and deleted in separate subtask for each schedule,
        but actual backend API task are scheduled asynchronously.
        Therefore, next iteration of schedule task does not wait
        until previous iteration tasks are completed.
-       That's why there may several concurrent execution of the same schedule.
 
     5. Actual execution of schedule depends on number of Celery workers and their load.
        For example, even if schedule is expected to create new resources each hour,
@@ -145,47 +152,82 @@ class BaseScheduleTask(core_tasks.BackgroundTask):
     """
 
     model = NotImplemented
-    resource_attribute = NotImplemented
+    execute_task = NotImplemented
 
     def is_equal(self, other_task):
         return self.name == other_task.get('name')
 
-    @transaction.atomic()
     def run(self):
-        schedules = self.model.objects.filter(is_active=True, next_trigger_at__lt=timezone.now())
-        for schedule in schedules:
-            existing_resources = self._get_number_of_resources(schedule)
-            if existing_resources > schedule.maximal_number_of_resources:
-                self._schedule_exceeding_resources_deletion(schedule, existing_resources)
-                continue
-            elif existing_resources == schedule.maximal_number_of_resources:
-                logger.debug('Skipping schedule %s because number of resources %s has reached limit %s.',
-                             schedule, existing_resources, schedule.maximal_number_of_resources)
-                continue
-
-            kept_until = None
-            if schedule.retention_time:
-                kept_until = timezone.now() + timezone.timedelta(days=schedule.retention_time)
-
-            try:
-                # Value of call_count attribute is used as suffix of new resource name
-                schedule.call_count += 1
-                schedule.save()
-                resource = self._create_resource(schedule, kept_until=kept_until)
-            except quotas_exceptions.QuotaValidationError as e:
-                message = 'Failed to schedule "%s" creation. Error: %s' % (self.model.__name__, e)
-                logger.debug(
-                    'Resource schedule (PK: %s), (Name: %s) execution failed. %s' % (schedule.pk,
-                                                                                     schedule.name,
-                                                                                     message))
-                schedule.is_active = False
-                schedule.error_message = message
-                schedule.save()
-            else:
-                executor = self._get_create_executor()
-                executor.execute(resource)
+        with transaction.atomic():
+            schedules = list(self.model.objects.select_for_update(skip_locked=True).filter(
+                is_active=True, next_trigger_at__lt=timezone.now()))
+            for schedule in schedules:
                 schedule.update_next_trigger_at()
-                schedule.save()
+            core_utils.bulk_update(self.model, schedules, ['next_trigger_at'])
+
+        # Subtasks are started after claim is committed so that they could not be claimed again
+        for schedule in schedules:
+            self.execute_task().delay(core_utils.serialize_instance(schedule))
+        logger.info('%s schedules of model %s are claimed for execution.', len(schedules), self.model.__name__)
+
+
+class BaseExecuteScheduleTask(core_tasks.Task):
+    """
+    Create resource for one schedule claimed by schedule task.
+    See also caveats described in BaseScheduleTask.
+    """
+    resource_attribute = NotImplemented
+
+    @classmethod
+    def get_description(cls, schedule, *args, **kwargs):
+        return 'Execute schedule "%s".' % schedule
+
+    @transaction.atomic()
+    def execute(self, schedule):
+        # Lock prevents concurrent execution of different triggers of the same schedule
+        schedule = schedule.__class__.objects.select_for_update().get(pk=schedule.pk)
+        if not schedule.is_active:
+            logger.debug('Skipping schedule %s because it has been deactivated.', schedule)
+            return
+
+        existing_resources = self._get_number_of_resources(schedule)
+        if existing_resources > schedule.maximal_number_of_resources:
+            self._schedule_exceeding_resources_deletion(schedule, existing_resources)
+            self._keep_schedule_due(schedule)
+            return
+        elif existing_resources == schedule.maximal_number_of_resources:
+            logger.debug('Skipping schedule %s because number of resources %s has reached limit %s.',
+                         schedule, existing_resources, schedule.maximal_number_of_resources)
+            self._keep_schedule_due(schedule)
+            return
+
+        kept_until = None
+        if schedule.retention_time:
+            kept_until = timezone.now() + timezone.timedelta(days=schedule.retention_time)
+
+        model_name = schedule.__class__.__name__
+        try:
+            # Value of call_count attribute is used as suffix of new resource name
+            schedule.call_count += 1
+            schedule.save(update_fields=['call_count'])
+            resource = self._create_resource(schedule, kept_until=kept_until)
+        except quotas_exceptions.QuotaValidationError as e:
+            message = 'Failed to schedule "%s" creation. Error: %s' % (model_name, e)
+            logger.debug(
+                'Resource schedule (PK: %s), (Name: %s) execution failed. %s' % (schedule.pk,
+                                                                                 schedule.name,
+                                                                                 message))
+            schedule.is_active = False
+            schedule.error_message = message
+            schedule.save()
+        else:
+            executor = self._get_create_executor()
+            executor.execute(resource)
+
+    def _keep_schedule_due(self, schedule):
+        # Trigger has been advanced during claim, but it is consumed only when resource is created
+        schedule.next_trigger_at = timezone.now()
+        schedule.save(update_fields=['next_trigger_at'])
 
     def _schedule_exceeding_resources_deletion(self, schedule, resources_count):
         amount_to_remove = resources_count - schedule.maximal_number_of_resources
@@ -215,9 +257,7 @@ class BaseScheduleTask(core_tasks.BackgroundTask):
         return resources.count()
 
 
-class ScheduleBackups(BaseScheduleTask):
-    name = 'openstack_tenant.ScheduleBackups'
-    model = models.BackupSchedule
+class ExecuteBackupSchedule(BaseExecuteScheduleTask):
     resource_attribute = 'backups'
 
     @transaction.atomic()
@@ -252,22 +292,48 @@ class ScheduleBackups(BaseScheduleTask):
         )
 
 
+class ScheduleBackups(BaseScheduleTask):
+    name = 'openstack_tenant.ScheduleBackups'
+    model = models.BackupSchedule
+    execute_task = ExecuteBackupSchedule
+
+
 class BaseDeleteExpiredResourcesTask(core_tasks.BackgroundTask):
+    """
+    Schedule deletion of expired resources in batches.
+    Each batch is claimed and marked for deletion using constant number of queries,
+    backend tasks are started after batch is committed.
+    """
     model = NotImplemented
 
     def is_equal(self, other_task):
         return self.name == other_task.get('name')
 
-    def _get_executor(self):
+    def _get_delete_executor(self):
         raise NotImplementedError()
 
-    @transaction.atomic
     def run(self):
         executor = self._get_delete_executor()
-        resources = self.model.objects.filter(kept_until__lt=timezone.now(),
-                                              state=core_models.StateMixin.States.OK)
+        batch_size = settings.WALDUR_OPENSTACK_TENANT.get('EXPIRED_RESOURCES_DELETION_BATCH_SIZE', 100)
+        while True:
+            with transaction.atomic():
+                # Resources locked by concurrent run are skipped so that deletion is scheduled only once
+                resources = list(self._get_expired_resources().select_for_update(skip_locked=True)[:batch_size])
+                self._schedule_deletion(resources)
+
+            for resource in resources:
+                executor.apply_signature(resource)
+
+            if len(resources) < batch_size:
+                break
+
+    def _get_expired_resources(self):
+        return self.model.objects.filter(kept_until__lt=timezone.now(), state=core_models.StateMixin.States.OK)
+
+    def _schedule_deletion(self, resources):
         for resource in resources:
-            executor.execute(resource)
+            resource.schedule_deleting()
+        core_utils.bulk_update(self.model, resources, ['state'])
 
 
 class DeleteExpiredBackups(BaseDeleteExpiredResourcesTask):
@@ -278,10 +344,18 @@ class DeleteExpiredBackups(BaseDeleteExpiredResourcesTask):
         from . import executors
         return executors.BackupDeleteExecutor
 
+    def _get_expired_resources(self):
+        return super(DeleteExpiredBackups, self)._get_expired_resources().prefetch_related('snapshots')
 
-class ScheduleSnapshots(BaseScheduleTask):
-    name = 'openstack_tenant.ScheduleSnapshots'
-    model = models.SnapshotSchedule
+    def _schedule_deletion(self, backups):
+        snapshots = [snapshot for backup in backups for snapshot in backup.snapshots.all()]
+        for snapshot in snapshots:
+            snapshot.schedule_deleting()
+        core_utils.bulk_update(models.Snapshot, snapshots, ['state'])
+        super(DeleteExpiredBackups, self)._schedule_deletion(backups)
+
+
+class ExecuteSnapshotSchedule(BaseExecuteScheduleTask):
     resource_attribute = 'snapshots'
 
     @transaction.atomic()
@@ -316,6 +390,12 @@ class ScheduleSnapshots(BaseScheduleTask):
         )
 
 
+class ScheduleSnapshots(BaseScheduleTask):
+    name = 'openstack_tenant.ScheduleSnapshots'
+    model = models.SnapshotSchedule
+    execute_task = ExecuteSnapshotSchedule
+
+
 class DeleteExpiredSnapshots(BaseDeleteExpiredResourcesTask):
     name = 'openstack_tenant.DeleteExpiredSnapshots'
     model = models.Snapshot
@@ -1,12 +1,17 @@
 from __future__ import unicode_literals
 
 from ddt import data, ddt
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from cinderclient.v2.volumes import Volume
 from novaclient.v2.servers import Server
 from novaclient.v2.flavors import Flavor
 import mock
 
+from waldur_core.core import signals as core_signals
+from waldur_openstack.openstack_base.backend import OpenStackBackendError
+from waldur_openstack.openstack_base.fake_cloud import FakeCloud
 from waldur_openstack.openstack_tenant.backend import OpenStackTenantBackend
 from waldur_openstack.openstack_tenant import models
 
@@ -519,6 +524,65 @@ class PullInstanceTest(BaseBackendTest):
         self.assertEqual(instance.error_message, 'Waldur error.')
 
 
+class PullInstancesSecurityGroupsTest(BaseBackendTest):
+    def setUp(self):
+        super(PullInstancesSecurityGroupsTest, self).setUp()
+        self.groups = [factories.SecurityGroupFactory(settings=self.settings) for _ in range(3)]
+        self.instances = [factories.InstanceFactory(
+            service_project_link=self.fixture.spl,
+            state=models.Instance.States.OK,
+        ) for _ in range(3)]
+
+    def get_port(self, instance, *groups):
+        return {
+            'id': 'port-%s' % instance.backend_id,
+            'device_id': instance.backend_id,
+            'security_groups': [group.backend_id for group in groups],
+        }
+
+    def pull_instances(self, ports):
+        backend_instances = list(models.Instance.objects.filter(pk__in=[instance.pk for instance in self.instances]))
+        self.tenant_backend.pull_instances(backend_instances, ports)
+
+    def get_groups(self, instance):
+        return set(instance.security_groups.all())
+
+    def test_security_groups_are_resolved_from_ports(self):
+        self.pull_instances([
+            self.get_port(self.instances[0], self.groups[0]),
+            self.get_port(self.instances[0], self.groups[1]),
+            self.get_port(self.instances[1], self.groups[2]),
+        ])
+
+        self.assertEqual(self.get_groups(self.instances[0]), {self.groups[0], self.groups[1]})
+        self.assertEqual(self.get_groups(self.instances[1]), {self.groups[2]})
+        self.assertEqual(self.get_groups(self.instances[2]), set())
+        self.assertFalse(self.nova_client_mock.servers.list_security_group.called)
+
+    def test_stale_memberships_are_removed(self):
+        self.instances[0].security_groups.add(self.groups[0], self.groups[1])
+
+        self.pull_instances([self.get_port(self.instances[0], self.groups[1])])
+
+        self.assertEqual(self.get_groups(self.instances[0]), {self.groups[1]})
+
+    def test_groups_without_backend_id_are_preserved(self):
+        pending_group = factories.SecurityGroupFactory(settings=self.settings, backend_id='')
+        self.instances[0].security_groups.add(pending_group)
+
+        self.pull_instances([])
+
+        self.assertEqual(self.get_groups(self.instances[0]), {pending_group})
+
+    def test_unknown_groups_are_skipped(self):
+        port = self.get_port(self.instances[0], self.groups[0])
+        port['security_groups'].append('unknown')
+
+        self.pull_instances([port])
+
+        self.assertEqual(self.get_groups(self.instances[0]), {self.groups[0]})
+
+
 class PullInstanceInternalIpsTest(BaseBackendTest):
     def setup_neutron(self, port_id, device_id, subnet_id):
         self.neutron_client_mock.list_ports.return_value = {
@@ -965,3 +1029,106 @@ class PullInstanceFloatingIpsTest(BaseBackendTest):
 
         fip.refresh_from_db()
         self.assertEqual(ip2, fip.internal_ip)
+
+
+class SyncTest(BaseBackendTest):
+    def setUp(self):
+        super(SyncTest, self).setUp()
+        self.cloud = FakeCloud(tenant_id=self.settings.options['tenant_id'])
+        self.cloud.seed(flavors=3, images=2, security_groups=2, rules=3, networks=2,
+                        servers=3, volumes=2, snapshots=1, floating_ips=2)
+        self.cloud.install(self.tenant_backend)
+
+    def test_remote_objects_are_pulled(self):
+        self.tenant_backend.sync()
+
+        self.assertEqual(models.Flavor.objects.filter(settings=self.settings).count(), 3)
+        self.assertEqual(models.Image.objects.filter(settings=self.settings).count(), 2)
+        self.assertEqual(models.SecurityGroupRule.objects.filter(security_group__settings=self.settings).count(), 6)
+        self.assertEqual(models.FloatingIP.objects.filter(settings=self.settings).count(), 2)
+
+    def test_dependent_objects_are_stored_after_objects_they_refer_to(self):
+        self.tenant_backend.sync()
+
+        # Subnets refer to networks and internal IPs refer to subnets
+        self.assertEqual(models.SubNet.objects.filter(settings=self.settings).count(), 2)
+        self.assertEqual(models.InternalIP.objects.filter(subnet__settings=self.settings).count(), 3)
+
+    def test_timings_are_reported_for_each_stage(self):
+        timings = self.tenant_backend.sync()
+        self.assertEqual(list(timings.keys()), [stage[0] for stage in self.tenant_backend.get_sync_stages()])
+
+    @mock.patch('waldur_openstack.openstack_tenant.backend.OpenStackTenantBackend.list_volumes')
+    def test_database_is_not_updated_if_remote_objects_are_not_fetched(self, list_volumes):
+        list_volumes.side_effect = OpenStackBackendError()
+        self.assertRaises(OpenStackBackendError, self.tenant_backend.sync)
+        self.assertFalse(models.Flavor.objects.filter(settings=self.settings).exists())
+
+
+class BulkPullTest(BaseBackendTest):
+    def setUp(self):
+        super(BulkPullTest, self).setUp()
+        self.cloud = FakeCloud(tenant_id=self.settings.options['tenant_id'])
+        self.cloud.install(self.tenant_backend)
+
+    def get_queries_count(self, func):
+        with CaptureQueriesContext(connection) as context:
+            func()
+        return len(context.captured_queries)
+
+    def get_flavors_update_queries_count(self, flavors_count):
+        models.Flavor.objects.filter(settings=self.settings).delete()
+        self.cloud.flavors = []
+        self.cloud.seed(flavors=flavors_count)
+        self.tenant_backend.pull_flavors()
+
+        for flavor in self.cloud.flavors:
+            flavor.ram *= 2
+        return self.get_queries_count(self.tenant_backend.pull_flavors)
+
+    def test_number_of_queries_does_not_depend_on_number_of_flavors(self):
+        self.assertEqual(self.get_flavors_update_queries_count(5), self.get_flavors_update_queries_count(50))
+        self.assertEqual(models.Flavor.objects.filter(settings=self.settings).count(), 50)
+
+    def test_number_of_queries_does_not_depend_on_number_of_rules(self):
+        self.cloud.seed(security_groups=2, rules=2)
+        few_rules_queries = self.get_queries_count(self.tenant_backend.pull_security_groups)
+
+        models.SecurityGroup.objects.filter(settings=self.settings).delete()
+        self.cloud.security_groups = []
+        self.cloud.seed(security_groups=10, rules=20)
+        many_rules_queries = self.get_queries_count(self.tenant_backend.pull_security_groups)
+
+        self.assertEqual(few_rules_queries, many_rules_queries)
+        self.assertEqual(models.SecurityGroupRule.objects.filter(
+            security_group__settings=self.settings).count(), 200)
+
+    def test_unchanged_objects_are_not_written(self):
+        self.cloud.seed(flavors=10)
+        self.tenant_backend.pull_flavors()
+
+        with CaptureQueriesContext(connection) as context:
+            self.tenant_backend.pull_flavors()
+        self.assertEqual(len(context.captured_queries), 1)
+
+    def test_flavors_are_updated_and_deleted(self):
+        self.cloud.seed(flavors=2)
+        self.tenant_backend.pull_flavors()
+
+        self.cloud.flavors[0].name = 'Updated flavor'
+        del self.cloud.flavors[1]
+        self.tenant_backend.pull_flavors()
+
+        self.assertEqual(list(models.Flavor.objects.filter(settings=self.settings).values_list('name', flat=True)),
+                         ['Updated flavor'])
+
+    def test_aggregated_signal_is_sent_once(self):
+        self.cloud.seed(flavors=3)
+        receiver = mock.Mock()
+        core_signals.bulk_synchronized.connect(receiver, sender=models.Flavor)
+        self.addCleanup(core_signals.bulk_synchronized.disconnect, receiver, sender=models.Flavor)
+
+        self.tenant_backend.pull_flavors()
+
+        self.assertEqual(receiver.call_count, 1)
+        self.assertEqual(len(receiver.call_args[1]['created']), 3)
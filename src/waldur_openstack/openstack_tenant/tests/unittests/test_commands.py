@@ -0,0 +1,28 @@
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import six
+
+from waldur_core.structure import models as structure_models
+from waldur_openstack.openstack_tenant import models
+
+
+class BenchmarkOpenStackCommandTest(TestCase):
+
+    def run_benchmark(self, *scenarios):
+        stdout = six.StringIO()
+        call_command('benchmark_openstack', latency=0, tenants=2, servers=2, instances=2,
+                     scenario=list(scenarios) or None, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_all_scenarios_are_measured(self):
+        output = self.run_benchmark()
+
+        for title in ('Tenant synchronization', 'Pull of 2 tenants', 'Provisioning of 2 instances',
+                      'Cleanup of project resources', 'Deletion of tenant'):
+            self.assertIn(title, output)
+
+    def test_synthetic_data_is_rolled_back(self):
+        self.run_benchmark('provisioning')
+
+        self.assertFalse(structure_models.Project.objects.filter(name='Benchmark project').exists())
+        self.assertFalse(models.Instance.objects.exists())
@@ -3,6 +3,7 @@ import mock
 import unittest
 
 from croniter import croniter
+from django.conf import settings
 from django.test import TestCase
 from django.utils import timezone
 from freezegun import freeze_time
@@ -16,6 +17,10 @@ from ...tests import factories
 TenantQuotas = openstack_models.Tenant.Quotas
 
 
+def run_synchronously(task, *args):
+    return task.run(*args)
+
+
 class DeleteExpiredBackupsTaskTest(TestCase):
 
     def setUp(self):
@@ -24,14 +29,35 @@ class DeleteExpiredBackupsTaskTest(TestCase):
         self.expired_backup2 = factories.BackupFactory(
             state=models.Backup.States.OK, kept_until=timezone.now() - timedelta(minutes=10))
 
-    @mock.patch('waldur_openstack.openstack_tenant.executors.BackupDeleteExecutor.execute')
-    def test_command_starts_backend_deletion(self, mocked_execute):
+    @mock.patch('waldur_openstack.openstack_tenant.executors.BackupDeleteExecutor.apply_signature')
+    def test_command_starts_backend_deletion(self, mocked_apply):
         tasks.DeleteExpiredBackups().run()
-        mocked_execute.assert_has_calls([
+        mocked_apply.assert_has_calls([
             mock.call(self.expired_backup1),
             mock.call(self.expired_backup2),
         ], any_order=True)
 
+    @mock.patch('waldur_openstack.openstack_tenant.executors.BackupDeleteExecutor.apply_signature')
+    def test_backups_and_their_snapshots_are_scheduled_for_deletion(self, mocked_apply):
+        snapshot = factories.SnapshotFactory(state=models.Snapshot.States.OK)
+        self.expired_backup1.snapshots.add(snapshot)
+
+        tasks.DeleteExpiredBackups().run()
+
+        self.expired_backup1.refresh_from_db()
+        snapshot.refresh_from_db()
+        self.assertEqual(self.expired_backup1.state, models.Backup.States.DELETION_SCHEDULED)
+        self.assertEqual(snapshot.state, models.Snapshot.States.DELETION_SCHEDULED)
+
+    @mock.patch('waldur_openstack.openstack_tenant.executors.BackupDeleteExecutor.apply_signature')
+    def test_backups_are_processed_in_batches(self, mocked_apply):
+        with self.settings(WALDUR_OPENSTACK_TENANT=dict(settings.WALDUR_OPENSTACK_TENANT,
+                                                        EXPIRED_RESOURCES_DELETION_BATCH_SIZE=1)):
+            tasks.DeleteExpiredBackups().run()
+
+        self.assertEqual(mocked_apply.call_count, 2)
+        self.assertFalse(models.Backup.objects.filter(state=models.Backup.States.OK).exists())
+
 
 class DeleteExpiredSnapshotsTaskTest(TestCase):
 
@@ -41,18 +67,25 @@ class DeleteExpiredSnapshotsTaskTest(TestCase):
         self.expired_snapshot2 = factories.SnapshotFactory(
             state=models.Snapshot.States.OK, kept_until=timezone.now() - timedelta(minutes=10))
 
-    @mock.patch('waldur_openstack.openstack_tenant.executors.SnapshotDeleteExecutor.execute')
-    def test_command_starts_snapshot_deletion(self, mocked_execute):
+    @mock.patch('waldur_openstack.openstack_tenant.executors.SnapshotDeleteExecutor.apply_signature')
+    def test_command_starts_snapshot_deletion(self, mocked_apply):
         tasks.DeleteExpiredSnapshots().run()
-        mocked_execute.assert_has_calls([
+        mocked_apply.assert_has_calls([
             mock.call(self.expired_snapshot1),
             mock.call(self.expired_snapshot2),
         ], any_order=True)
+        self.expired_snapshot1.refresh_from_db()
+        self.assertEqual(self.expired_snapshot1.state, models.Snapshot.States.DELETION_SCHEDULED)
 
 
 class BackupScheduleTaskTest(TestCase):
 
     def setUp(self):
+        # Schedules are executed by subtasks which are run synchronously in tests
+        patcher = mock.patch.object(tasks.ExecuteBackupSchedule, 'delay', run_synchronously)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
         self.disabled_schedule = factories.BackupScheduleFactory(is_active=False)
 
         self.instance = factories.InstanceFactory(
@@ -196,6 +229,39 @@ class BackupScheduleTaskTest(TestCase):
         self.assertTrue(models.Backup.objects.filter(id=todays_backup.id).exists())
         self.assertEqual(self.overdue_schedule.backups.count(), 3)
 
+    def test_schedule_is_kept_due_if_limit_is_reached(self):
+        self.overdue_schedule.maximal_number_of_resources = 1
+        self.overdue_schedule.save()
+        self.overdue_schedule.backups.add(factories.BackupFactory(instance=self.instance))
+
+        tasks.ScheduleBackups().run()
+
+        self.overdue_schedule.refresh_from_db()
+        self.assertLessEqual(self.overdue_schedule.next_trigger_at, timezone.now())
+        self.assertEqual(self.overdue_schedule.backups.count(), 1)
+
+    def test_backup_is_created_by_next_run_when_limit_is_increased(self):
+        self.overdue_schedule.maximal_number_of_resources = 1
+        self.overdue_schedule.save()
+        self.overdue_schedule.backups.add(factories.BackupFactory(instance=self.instance))
+        tasks.ScheduleBackups().run()
+
+        self.overdue_schedule.maximal_number_of_resources = 2
+        self.overdue_schedule.save()
+        tasks.ScheduleBackups().run()
+
+        self.assertEqual(self.overdue_schedule.backups.count(), 2)
+
+    def test_schedule_deactivated_after_claim_is_skipped(self):
+        with mock.patch.object(tasks.ExecuteBackupSchedule, 'delay') as mocked_delay:
+            tasks.ScheduleBackups().run()
+
+        self.overdue_schedule.is_active = False
+        self.overdue_schedule.save()
+        run_synchronously(tasks.ExecuteBackupSchedule(), *mocked_delay.call_args[0])
+
+        self.assertEqual(self.overdue_schedule.backups.count(), 0)
+
     def _trigger_next_backup(self, base_dt):
         tz = pytz.timezone(self.overdue_schedule.timezone)
         dt = tz.normalize(base_dt)
@@ -209,6 +275,12 @@ class BackupScheduleTaskTest(TestCase):
 
 class SnapshotScheduleTaskTest(TestCase):
 
+    def setUp(self):
+        # Schedules are executed by subtasks which are run synchronously in tests
+        patcher = mock.patch.object(tasks.ExecuteSnapshotSchedule, 'delay', run_synchronously)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
     def test_command_does_not_create_snapshots_created_for_not_active_schedules(self):
         self.not_active_schedule = factories.SnapshotScheduleFactory(is_active=False)
 
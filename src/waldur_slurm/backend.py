@@ -4,16 +4,18 @@ import operator
 
 from django.conf import settings as django_settings
 from django.db import transaction
+from django.db.models import signals
 from django.utils import timezone
 import six
 
+from waldur_core.core import utils as core_utils
 from waldur_core.structure import ServiceBackend, ServiceBackendError
 from waldur_freeipa import models as freeipa_models
 from waldur_slurm.client import SlurmClient
 from waldur_slurm.client_moab import MoabClient
 from waldur_slurm.structures import Quotas
 
-from . import models, base
+from . import models, base, utils
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +36,8 @@ class SlurmBackend(ServiceBackend):
             port=settings.options.get('port', 22),
             key_path=django_settings.WALDUR_SLURM['PRIVATE_KEY_PATH'],
             use_sudo=settings.options.get('use_sudo', False),
+            control_path=django_settings.WALDUR_SLURM['SSH_CONTROL_PATH'],
+            control_persist=django_settings.WALDUR_SLURM['SSH_CONTROL_PERSIST'],
         )
 
     def sync(self):
@@ -55,40 +59,43 @@ class SlurmBackend(ServiceBackend):
         project_account = self.get_project_name(project)
         allocation_account = self.get_allocation_name(allocation)
 
-        if not self.client.get_account(customer_account):
-            self.create_customer(project.customer)
-
-        if not self.client.get_account(project_account):
-            self.create_project(project)
-
-        self.client.create_account(
-            name=allocation_account,
-            description=allocation.name,
-            organization=project_account,
-        )
-        self.set_resource_limits(allocation)
-
         freeipa_profiles = {
             profile.user: profile.username
             for profile in freeipa_models.Profile.objects.all()
         }
 
-        for user in allocation.service_project_link.project.customer.get_users():
-            username = freeipa_profiles.get(user)
-            if username:
-                self.add_user(allocation, username.lower())
+        with self.client.batch():
+            if not self.client.get_account(customer_account):
+                self.create_customer(project.customer)
+
+            if not self.client.get_account(project_account):
+                self.create_project(project)
+
+            self.client.create_account(
+                name=allocation_account,
+                description=allocation.name,
+                organization=project_account,
+            )
+            self.set_resource_limits(allocation)
+
+            for user in allocation.service_project_link.project.customer.get_users():
+                username = freeipa_profiles.get(user)
+                if username:
+                    self.add_user(allocation, username.lower())
 
     def delete_allocation(self, allocation):
         account = self.get_allocation_name(allocation)
-        if self.client.get_account(account):
-            self.client.delete_account(account)
-
         project = allocation.service_project_link.project
-        if self.get_allocation_queryset().filter(project=project).count() == 0:
-            self.delete_project(project)
 
-        if self.get_allocation_queryset().filter(project__customer=project.customer).count() == 0:
-            self.delete_customer(project.customer)
+        with self.client.batch():
+            if self.client.get_account(account):
+                self.client.delete_account(account)
+
+            if self.get_allocation_queryset().filter(project=project).count() == 0:
+                self.delete_project(project)
+
+            if self.get_allocation_queryset().filter(project__customer=project.customer).count() == 0:
+                self.delete_customer(project.customer)
 
     def add_user(self, allocation, username):
         """
@@ -134,30 +141,29 @@ class SlurmBackend(ServiceBackend):
             for allocation in self.get_allocation_queryset()
         }
 
-        report = self.get_usage_report(waldur_allocations.keys())
-        for account, usage in report.items():
-            allocation = waldur_allocations.get(account)
-            if not allocation:
-                logger.debug('Skipping usage report for account %s because it is not managed under Waldur', account)
-                continue
-            self._update_quotas(allocation, usage)
+        usage = self.get_usage(waldur_allocations.keys())
+        self._update_quotas(waldur_allocations, usage)
 
     def pull_allocation(self, allocation):
         account = self.get_allocation_name(allocation)
-        report = self.get_usage_report([account])
-        usage = report.get(account)
-        if not usage:
+        usage = self.get_usage([account])
+        if not any(usage_account == account for usage_account, _ in usage):
             logger.debug('Skipping usage report for account %s because it is not managed under Waldur', account)
             return
-        self._update_quotas(allocation, usage)
+        self._update_quotas({account: allocation}, usage)
+
+    def get_usage(self, accounts):
+        """
+        Aggregate usage report while it is being received from batch system.
+        :return: dict mapping (account, user) to [cpu, gpu, ram, deposit] list
+        """
+        return utils.aggregate_usage(self.client.get_usage_records(accounts))
 
     def get_usage_report(self, accounts):
         report = {}
-        lines = self.client.get_usage_report(accounts)
 
-        for line in lines:
-            report.setdefault(line.account, {}).setdefault(line.user, Quotas())
-            report[line.account][line.user] += line.quotas
+        for (account, user), values in self.get_usage(accounts).items():
+            report.setdefault(account, {})[user] = Quotas(*values)
 
         for usage in report.values():
             quotas = usage.values()
@@ -167,33 +173,64 @@ class SlurmBackend(ServiceBackend):
         return report
 
     @transaction.atomic()
-    def _update_quotas(self, allocation, usage):
-        quotas = usage.pop('TOTAL_ACCOUNT_USAGE')
-        allocation.cpu_usage = quotas.cpu
-        allocation.gpu_usage = quotas.gpu
-        allocation.ram_usage = quotas.ram
-        allocation.deposit_usage = quotas.deposit
-        allocation.save(update_fields=['cpu_usage', 'gpu_usage', 'ram_usage', 'deposit_usage'])
-
-        usernames = usage.keys()
-        usermap = {
-            profile.username: profile.user
-            for profile in freeipa_models.Profile.objects.filter(username__in=usernames)
-        }
+    def _update_quotas(self, allocations, usage):
+        """
+        Store total usage of allocations and upsert usage of allocation users in bulk.
+        :param allocations: dict mapping account name to allocation
+        :param usage: dict mapping (account, user) to [cpu, gpu, ram, deposit] list
+        """
+        for account in set(account for account, _ in usage) - set(allocations):
+            logger.debug('Skipping usage report for account %s because it is not managed under Waldur', account)
 
-        for username, quotas in usage.items():
-            models.AllocationUsage.objects.update_or_create(
-                allocation=allocation,
+        totals = {}
+        for (account, username), values in usage.items():
+            if account not in allocations:
+                continue
+            totals[account] = [
+                total + value for total, value in zip(totals.get(account, [0, 0, 0, 0]), values)
+            ]
+
+        for account, (cpu, gpu, ram, deposit) in totals.items():
+            allocation = allocations[account]
+            if (allocation.cpu_usage, allocation.gpu_usage,
+                    allocation.ram_usage, allocation.deposit_usage) == (cpu, gpu, ram, deposit):
+                continue
+            allocation.cpu_usage = cpu
+            allocation.gpu_usage = gpu
+            allocation.ram_usage = ram
+            allocation.deposit_usage = deposit
+            allocation.save(update_fields=['cpu_usage', 'gpu_usage', 'ram_usage', 'deposit_usage'])
+
+        usernames = set(username for account, username in usage if account in totals)
+        usermap = dict(freeipa_models.Profile.objects.filter(
+            username__in=usernames).values_list('username', 'user_id'))
+
+        now = timezone.now()
+        objects = [
+            models.AllocationUsage(
+                allocation=allocations[account],
                 username=username,
-                year=timezone.now().year,
-                month=timezone.now().month,
-                defaults={
-                    'cpu_usage': quotas.cpu,
-                    'gpu_usage': quotas.gpu,
-                    'ram_usage': quotas.ram,
-                    'deposit_usage': quotas.deposit,
-                    'user': usermap.get(username),
-                })
+                year=now.year,
+                month=now.month,
+                cpu_usage=cpu,
+                gpu_usage=gpu,
+                ram_usage=ram,
+                deposit_usage=deposit,
+                user_id=usermap.get(username),
+            )
+            for (account, username), (cpu, gpu, ram, deposit) in usage.items()
+            if account in totals
+        ]
+        created, _ = core_utils.bulk_upsert(
+            models.AllocationUsage,
+            objects,
+            key_fields=('allocation_id', 'username', 'year', 'month'),
+            update_fields=('cpu_usage', 'gpu_usage', 'ram_usage', 'deposit_usage', 'user_id'),
+        )
+
+        # Marketplace component usages are created by post_save handler of allocation usage.
+        for allocation_usage in created:
+            signals.post_save.send(models.AllocationUsage, instance=allocation_usage, created=True)
 
     def create_customer(self, customer):
         customer_name = self.get_customer_name(customer)
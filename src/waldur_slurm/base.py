@@ -1,12 +1,14 @@
 from __future__ import absolute_import
 
 import abc
+import contextlib
 import logging
 import subprocess  # nosec
 
 from django.utils.functional import cached_property
 import six
 
+from .session import manager as session_manager
 from .structures import Quotas
 
 
@@ -20,12 +22,22 @@ class BatchError(Exception):
 @six.add_metaclass(abc.ABCMeta)
 class BaseBatchClient(object):
 
-    def __init__(self, hostname, key_path, username='root', port=22, use_sudo=False):
+    def __init__(self, hostname, key_path, username='root', port=22, use_sudo=False,
+                 control_path=None, control_persist=None, runner=None):
         self.hostname = hostname
         self.key_path = key_path
         self.username = username
         self.port = port
         self.use_sudo = use_sudo
+        self.runner = runner or session_manager.get_runner(
+            hostname=hostname,
+            key_path=key_path,
+            username=username,
+            port=port,
+            use_sudo=use_sudo,
+            control_path=control_path,
+            control_persist=control_persist,
+        )
 
     @abc.abstractmethod
     def list_accounts(self):
@@ -115,28 +127,46 @@ class BaseBatchClient(object):
         """
         raise NotImplementedError()
 
-    def execute_command(self, command):
-        server = '%s@%s' % (self.username, self.hostname)
-        port = str(self.port)
-        if self.use_sudo:
-            account_command = ['sudo']
-        else:
-            account_command = []
-
-        account_command.extend(command)
-        ssh_command = ['ssh', '-o', 'UserKnownHostsFile=/dev/null', '-o', 'StrictHostKeyChecking=no',
-                       server, '-p', port, '-i', self.key_path, ' '.join(account_command)]
+    def get_usage_records(self, accounts):
+        """
+        Get usage records aggregated per line of usage report.
+        Clients may override it in order to parse report while it is being received.
+        :param accounts: list[string]
+        :return: iterator of (account, user, cpu, gpu, ram, deposit) tuples
+        """
+        for line in self.get_usage_report(accounts):
+            quotas = line.quotas
+            yield line.account, line.user, quotas.cpu, quotas.gpu, quotas.ram, quotas.deposit
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Group mutations so that they are applied together when context is exited.
+        By default commands are executed immediately.
+        """
+        yield
+
+    def execute_command(self, command, input=None):
+        try:
+            return self.runner.run(command, input)
+        except subprocess.CalledProcessError as e:
+            self._reraise_command_error(e)
+
+    def stream_command(self, command):
         try:
-            logger.debug('Executing SSH command: %s', ' '.join(ssh_command))
-            return subprocess.check_output(ssh_command, stderr=subprocess.STDOUT)  # nosec
+            for line in self.runner.stream(command):
+                yield line
         except subprocess.CalledProcessError as e:
-            logger.exception('Failed to execute command "%s".', ssh_command)
-            stdout = e.output or ''
-            lines = stdout.splitlines()
-            if len(lines) > 0 and lines[0].startswith('Warning: Permanently added'):
-                lines = lines[1:]
-            stdout = '\n'.join(lines)
-            six.reraise(BatchError, stdout)
+            self._reraise_command_error(e)
+
+    def _reraise_command_error(self, e):
+        logger.exception('Failed to execute command "%s".', e.cmd)
+        stdout = e.output or ''
+        lines = stdout.splitlines()
+        if len(lines) > 0 and lines[0].startswith('Warning: Permanently added'):
+            lines = lines[1:]
+        stdout = '\n'.join(lines)
+        six.reraise(BatchError, stdout)
 
 
 @six.add_metaclass(abc.ABCMeta)
@@ -1,8 +1,9 @@
+import contextlib
 import logging
 import re
 
 from waldur_slurm.base import BatchError, BaseBatchClient
-from waldur_slurm.parser import SlurmReportLine
+from waldur_slurm.parser import SlurmReportLine, parse_report_line
 from waldur_slurm.structures import Account, Association
 from waldur_slurm.utils import format_current_month
 
@@ -19,6 +20,35 @@ class SlurmClient(BaseBatchClient):
     This class implements Python client for SLURM.
     See also: https://slurm.schedmd.com/sacctmgr.html
     """
+    MUTATIONS = ('add', 'modify', 'remove')
+    # sacctmgr reports failure of command in script via output, but its exit code may still be zero
+    ERROR_PATTERN = re.compile(r'^\s*(sacctmgr:\s*)?error\b', re.IGNORECASE)
+
+    def __init__(self, *args, **kwargs):
+        super(SlurmClient, self).__init__(*args, **kwargs)
+        self._batch = None
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Collect sacctmgr mutations and execute them as single script when context is exited.
+        Queries are executed immediately, so they do not observe queued mutations.
+        SlurmError is raised if any command of the script has failed.
+        Note that commands which have succeeded are not rolled back in this case.
+        """
+        if self._batch is not None:
+            yield
+            return
+
+        self._batch = []
+        try:
+            yield
+            commands = self._batch
+        finally:
+            self._batch = None
+
+        if commands:
+            self._execute_script(commands)
 
     def list_accounts(self):
         output = self._execute_command(['list', 'account'])
@@ -101,9 +131,20 @@ class SlurmClient(BaseBatchClient):
         ])
 
     def get_usage_report(self, accounts):
+        lines = self.stream_command(self._get_usage_report_command(accounts))
+        return [SlurmReportLine(line) for line in lines if '|' in line]
+
+    def get_usage_records(self, accounts):
+        lines = self.stream_command(self._get_usage_report_command(accounts))
+        return (parse_report_line(line) for line in lines if '|' in line)
+
+    def _get_usage_report_command(self, accounts):
         month_start, month_end = format_current_month()
 
-        args = [
+        return [
+            'sacct',
+            '--parsable2',
+            '--noheader',
             '--noconvert',
             '--truncate',
             '--allocations',
@@ -113,12 +154,23 @@ class SlurmClient(BaseBatchClient):
             '--accounts=%s' % ','.join(accounts),
             '--format=Account,ReqTRES,Elapsed,User',
         ]
-        output = self._execute_command(args, 'sacct', immediate=False)
-        return [SlurmReportLine(line) for line in output.splitlines() if '|' in line]
 
     def _execute_command(self, command, command_name='sacctmgr', immediate=True):
+        if self._batch is not None and command_name == 'sacctmgr' and command[0] in self.MUTATIONS:
+            self._batch.append(command)
+            return ''
+
         account_command = [command_name, '--parsable2', '--noheader']
         if immediate:
             account_command.append('--immediate')
         account_command.extend(command)
         return self.execute_command(account_command)
+
+    def _execute_script(self, commands):
+        script = ''.join(' '.join(command) + '\n' for command in commands)
+        output = self.execute_command(['sacctmgr', '--parsable2', '--noheader', '--immediate'], input=script)
+        errors = [line.strip() for line in output.splitlines() if self.ERROR_PATTERN.match(line)]
+        if errors:
+            logger.error('Failed to execute sacctmgr script:\n%s\nOutput:\n%s', script, output)
+            raise SlurmError('\n'.join(errors))
+        return output
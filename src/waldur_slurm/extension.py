@@ -8,6 +8,12 @@ class SlurmExtension(WaldurExtension):
             'PROJECT_PREFIX': 'waldur_project_',
             'ALLOCATION_PREFIX': 'waldur_allocation_',
             'PRIVATE_KEY_PATH': '/etc/waldur/id_rsa',
+            # OpenSSH multiplexing allows to reuse single connection to cluster for several commands.
+            # Set SSH_CONTROL_PERSIST to None in order to disable it.
+            # Directory of control socket is created if it does not exist yet.
+            # It should be accessible only by user running Waldur, otherwise multiplexing is disabled.
+            'SSH_CONTROL_PATH': '~/.ssh/waldur_slurm/%C',
+            'SSH_CONTROL_PERSIST': 600,
         }
 
     @staticmethod
@@ -0,0 +1,71 @@
+from __future__ import unicode_literals
+
+from functools import reduce
+import operator
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from waldur_slurm.parser import SlurmReportLine, parse_report_line
+from waldur_slurm.structures import Quotas
+from waldur_slurm.utils import aggregate_usage
+
+
+class Command(BaseCommand):
+    help = ('Measure parsing and aggregation speed of synthetic SLURM usage report. '
+            'Batch system and database are not used.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=200000,
+                            help='Number of lines in usage report.')
+        parser.add_argument('--accounts', type=int, default=100,
+                            help='Number of accounts in usage report.')
+        parser.add_argument('--users', type=int, default=20,
+                            help='Number of users per account.')
+
+    def handle(self, *args, **options):
+        lines = list(self.generate_report(options['lines'], options['accounts'], options['users']))
+        self.stdout.write('Parsing %s lines' % len(lines))
+
+        start = time.time()
+        legacy_report = self.aggregate_legacy(lines)
+        self.report('Report lines', start, len(lines))
+
+        start = time.time()
+        usage = aggregate_usage(parse_report_line(line) for line in lines)
+        self.report('Streaming parser', start, len(lines))
+
+        for (account, user), values in usage.items():
+            if legacy_report[account][user] != Quotas(*values):
+                self.stderr.write('Usage of user %s in account %s does not match.' % (user, account))
+
+    def report(self, title, start, count):
+        elapsed = time.time() - start
+        self.stdout.write('%s: %.3f seconds, %.0f lines per second' % (title, elapsed, count / elapsed))
+
+    def aggregate_legacy(self, lines):
+        report = {}
+        for line in [SlurmReportLine(line) for line in lines]:
+            report.setdefault(line.account, {}).setdefault(line.user, Quotas())
+            report[line.account][line.user] += line.quotas
+
+        for usage in report.values():
+            usage['TOTAL_ACCOUNT_USAGE'] = reduce(operator.add, usage.values())
+
+        return report
+
+    def generate_report(self, lines_count, accounts_count, users_count):
+        for _ in range(lines_count):
+            yield '%s|cpu=%s,mem=%sM,node=%s,gres/gpu=%s|%s-%02d:%02d:%02d|%s|' % (
+                'allocation_%s' % random.randrange(accounts_count),  # nosec
+                random.randint(1, 64),  # nosec
+                random.randint(1, 512) * 1024,  # nosec
+                random.randint(1, 8),  # nosec
+                random.randint(0, 4),  # nosec
+                random.randint(0, 2),  # nosec
+                random.randint(0, 23),  # nosec
+                random.randint(0, 59),  # nosec
+                random.randint(0, 59),  # nosec
+                'user_%s' % random.randrange(users_count),  # nosec
+            )
@@ -1,4 +1,3 @@
-import datetime
 import re
 
 from django.utils.functional import cached_property
@@ -12,6 +11,7 @@ SLURM_UNITS = {
     'M': 2**20,
     'G': 2**30,
     'T': 2**40,
+    'P': 2**50,
 }
 
 
@@ -19,7 +19,7 @@ def parse_int(value):
     """
     Convert 5K to 5000.
     """
-    match = re.match(SLURM_UNIT_PATTERN, value)
+    match = SLURM_UNIT_PATTERN.match(value)
     if not match:
         return 0
     value = int(match.group(1))
@@ -34,11 +34,33 @@ def parse_int(value):
 def parse_duration(value):
     """
     Returns duration in minutes as an integer number.
-    For example 00:01:00 is equal to 1
+    For example 00:01:00 is equal to 1, 1-00:00:00 is equal to 1440.
     """
-    dt = datetime.datetime.strptime(value, '%H:%M:%S')
-    delta = datetime.timedelta(hours=dt.hour, minutes=dt.minute, seconds=dt.second)
-    return int(delta.total_seconds()) // 60
+    days = 0
+    if '-' in value:
+        days, value = value.split('-', 1)
+        days = int(days)
+    hours, minutes, _ = value.split(':')
+    return days * 24 * 60 + int(hours) * 60 + int(minutes)
+
+
+def parse_report_line(line):
+    """
+    Parse line of sacct report in format Account|ReqTRES|Elapsed|User.
+    Usage is multiplied by duration and number of nodes in the same way as in SlurmReportLine.
+    :return: (account, user, cpu, gpu, ram, deposit) tuple
+    """
+    parts = line.split('|')
+    resources = dict(pair.split('=', 1) for pair in parts[1].split(',') if '=' in pair)
+    factor = parse_duration(parts[2]) * parse_int(resources.get('node', ''))
+    return (
+        parts[0].strip(),
+        parts[3],
+        parse_int(resources.get('cpu', '')) * factor,
+        parse_int(resources.get('gres/gpu', '')) * factor,
+        parse_int(resources.get('mem', '')) * factor,
+        0,
+    )
 
 
 class SlurmReportLine(BaseReportLine):
@@ -0,0 +1,210 @@
+from __future__ import absolute_import
+
+import logging
+import os
+import subprocess  # nosec
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class BaseCommandRunner(object):
+    """
+    Command runner executes batch system commands and returns their output.
+    It raises subprocess.CalledProcessError if command has failed.
+    """
+
+    def run(self, command, input=None):
+        """
+        :param command: list[string] command and its arguments
+        :param input: [string] data passed to standard input of the command. Optional.
+        :return: [string] command output
+        """
+        raise NotImplementedError()
+
+    def stream(self, command):
+        """
+        Yield output lines as soon as they are produced by the command.
+        :param command: list[string] command and its arguments
+        """
+        raise NotImplementedError()
+
+    def close(self):
+        pass
+
+    def _stream(self, command):
+        # Error output is written to temporary file instead of pipe so that
+        # command is not blocked on full pipe buffer while its standard output is consumed.
+        with tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr)  # nosec
+            for line in iter(process.stdout.readline, b''):
+                yield line.rstrip(b'\n')
+            process.stdout.close()
+            if process.wait():
+                stderr.seek(0)
+                raise subprocess.CalledProcessError(process.returncode, command, output=stderr.read())
+
+    def _execute(self, command, input=None):
+        # Error output is written to temporary file instead of pipe, because background SSH master
+        # connection inherits it, so that pipe would not be closed until master connection exits.
+        # It is prepended to standard output as it would be with stderr=subprocess.STDOUT.
+        with tempfile.TemporaryFile() as stderr:
+            try:
+                if input is None:
+                    output = subprocess.check_output(command, stderr=stderr)  # nosec
+                else:
+                    process = subprocess.Popen(command, stdin=subprocess.PIPE,  # nosec
+                                               stdout=subprocess.PIPE, stderr=stderr)
+                    output, _ = process.communicate(input)
+                    if process.returncode:
+                        raise subprocess.CalledProcessError(process.returncode, command, output=output)
+            except subprocess.CalledProcessError as e:
+                e.output = self._prepend_errors(stderr, e.output or '')
+                raise
+            return self._prepend_errors(stderr, output)
+
+    def _prepend_errors(self, stderr, output):
+        stderr.seek(0)
+        errors = stderr.read()
+        return errors + output if errors else output
+
+
+class LocalCommandRunner(BaseCommandRunner):
+    """
+    Execute commands on the same host where Waldur is running.
+    It is used when batch system tools are installed locally and in tests.
+    """
+
+    def __init__(self, use_sudo=False):
+        self.use_sudo = use_sudo
+
+    def run(self, command, input=None):
+        if self.use_sudo:
+            command = ['sudo'] + list(command)
+        logger.debug('Executing local command: %s', ' '.join(command))
+        return self._execute(command, input)
+
+    def stream(self, command):
+        if self.use_sudo:
+            command = ['sudo'] + list(command)
+        logger.debug('Streaming output of local command: %s', ' '.join(command))
+        return self._stream(command)
+
+
+class SSHCommandRunner(BaseCommandRunner):
+    """
+    Execute commands on remote host over SSH.
+
+    If control_persist is specified, OpenSSH multiplexing is used: first command opens
+    master connection which is kept open in background for given number of seconds,
+    and subsequent commands reuse it instead of doing full SSH handshake.
+
+    Control socket allows to run commands on behalf of connected user without authentication,
+    therefore multiplexing is used only if directory of control socket is private.
+    """
+
+    def __init__(self, hostname, key_path, username='root', port=22, use_sudo=False,
+                 control_path=None, control_persist=None):
+        self.hostname = hostname
+        self.key_path = key_path
+        self.username = username
+        self.port = port
+        self.use_sudo = use_sudo
+        self.control_path = control_path
+        self.control_persist = control_persist
+
+    @property
+    def server(self):
+        return '%s@%s' % (self.username, self.hostname)
+
+    def is_multiplexing_enabled(self):
+        if not self.control_path or not self.control_persist:
+            return False
+
+        directory = os.path.dirname(os.path.expanduser(self.control_path))
+        try:
+            if not os.path.isdir(directory):
+                os.makedirs(directory, 0o700)
+            stat = os.stat(directory)
+        except OSError as e:
+            logger.warning('SSH multiplexing is disabled because directory %s is not available: %s',
+                           directory, e)
+            return False
+
+        if stat.st_uid != os.getuid() or stat.st_mode & 0o077:
+            logger.warning('SSH multiplexing is disabled because directory %s is accessible by other users.',
+                           directory)
+            return False
+        return True
+
+    def get_ssh_options(self):
+        options = ['-o', 'UserKnownHostsFile=/dev/null', '-o', 'StrictHostKeyChecking=no']
+        if self.is_multiplexing_enabled():
+            options.extend([
+                '-o', 'ControlMaster=auto',
+                '-o', 'ControlPath=%s' % self.control_path,
+                '-o', 'ControlPersist=%s' % self.control_persist,
+            ])
+        return options
+
+    def get_ssh_command(self, command):
+        if self.use_sudo:
+            command = ['sudo'] + list(command)
+        return ['ssh'] + self.get_ssh_options() + [
+            self.server, '-p', str(self.port), '-i', self.key_path, ' '.join(command)
+        ]
+
+    def run(self, command, input=None):
+        ssh_command = self.get_ssh_command(command)
+        logger.debug('Executing SSH command: %s', ' '.join(ssh_command))
+        return self._execute(ssh_command, input)
+
+    def stream(self, command):
+        ssh_command = self.get_ssh_command(command)
+        logger.debug('Streaming output of SSH command: %s', ' '.join(ssh_command))
+        return self._stream(ssh_command)
+
+    def close(self):
+        """
+        Stop master connection if it is running.
+        """
+        if not self.is_multiplexing_enabled():
+            return
+        command = ['ssh'] + self.get_ssh_options() + ['-O', 'exit', self.server, '-p', str(self.port)]
+        try:
+            self._execute(command)
+        except subprocess.CalledProcessError:
+            logger.debug('Master connection to %s is not running.', self.server)
+
+
+class SessionManager(object):
+    """
+    Registry of command runners shared by batch clients within process,
+    so that there is one multiplexed connection per cluster.
+    """
+
+    def __init__(self):
+        self._runners = {}
+        self._lock = threading.Lock()
+
+    def get_runner(self, hostname, key_path, username='root', port=22, use_sudo=False,
+                   control_path=None, control_persist=None):
+        key = (hostname, port, username, key_path, use_sudo)
+        with self._lock:
+            runner = self._runners.get(key)
+            if runner is None:
+                runner = SSHCommandRunner(hostname, key_path, username, port, use_sudo,
+                                          control_path, control_persist)
+                self._runners[key] = runner
+            return runner
+
+    def close_all(self):
+        with self._lock:
+            runners = self._runners.values()
+            self._runners = {}
+        for runner in runners:
+            runner.close()
+
+
+manager = SessionManager()
@@ -9,6 +9,7 @@ from freezegun import freeze_time
 from waldur_freeipa import models as freeipa_models
 from .. import models
 from . import fixtures
+from .utils import mock_report_stream
 
 VALID_REPORT = """
 allocation1|cpu=1,mem=51200M,node=1,gres/gpu=1,gres/gpu:tesla=1|00:01:00|user1|
@@ -22,9 +23,9 @@ class BackendTest(TestCase):
         self.allocation = self.fixture.allocation
         self.account = 'waldur_allocation_' + self.allocation.uuid.hex
 
-    @mock.patch('subprocess.check_output')
-    def test_usage_synchronization(self, check_output):
-        check_output.return_value = VALID_REPORT.replace('allocation1', self.account)
+    @mock.patch('subprocess.Popen')
+    def test_usage_synchronization(self, popen):
+        mock_report_stream(popen, VALID_REPORT.replace('allocation1', self.account))
 
         backend = self.allocation.get_backend()
         backend.sync_usage()
@@ -35,9 +36,9 @@ class BackendTest(TestCase):
         self.assertEqual(self.allocation.ram_usage, (1 + 2 * 2) * 51200 * 2**20)
 
     @freeze_time('2017-10-16 00:00:00')
-    @mock.patch('subprocess.check_output')
-    def test_usage_per_user(self, check_output):
-        check_output.return_value = VALID_REPORT.replace('allocation1', self.account)
+    @mock.patch('subprocess.Popen')
+    def test_usage_per_user(self, popen):
+        mock_report_stream(popen, VALID_REPORT.replace('allocation1', self.account))
 
         user1 = self.fixture.manager
         user2 = self.fixture.admin
@@ -58,8 +59,25 @@ class BackendTest(TestCase):
         self.assertEqual(user1_allocation.gpu_usage, 1)
         self.assertEqual(user1_allocation.ram_usage, 51200 * 2**20)
 
+    @freeze_time('2017-10-16 00:00:00')
+    @mock.patch('subprocess.Popen')
+    def test_usage_per_user_is_updated_on_repeated_synchronization(self, popen):
+        report = VALID_REPORT.replace('allocation1', self.account)
+        backend = self.allocation.get_backend()
+
+        mock_report_stream(popen, report)
+        backend.sync_usage()
+
+        mock_report_stream(popen, report.replace('00:01:00', '00:03:00'))
+        backend.sync_usage()
+
+        self.assertEqual(models.AllocationUsage.objects.filter(allocation=self.allocation).count(), 2)
+        user1_allocation = models.AllocationUsage.objects.get(allocation=self.allocation, username='user1')
+        self.assertEqual(user1_allocation.cpu_usage, 3)
+
+    @mock.patch('waldur_slurm.session.SSHCommandRunner.is_multiplexing_enabled', return_value=True)
     @mock.patch('subprocess.check_output')
-    def test_set_resource_limits(self, check_output):
+    def test_set_resource_limits(self, check_output, is_multiplexing_enabled):
         self.allocation.cpu_limit = 1000
         self.allocation.gpu_limit = 2000
         self.allocation.ram_limit = 3000
@@ -69,6 +87,7 @@ class BackendTest(TestCase):
                    ' modify account %s set GrpTRESMins=cpu=%d,gres/gpu=%d,mem=%d'
         context = (self.account, self.allocation.cpu_limit, self.allocation.gpu_limit, self.allocation.ram_limit)
         command = ['ssh', '-o', 'UserKnownHostsFile=/dev/null', '-o', 'StrictHostKeyChecking=no',
+                   '-o', 'ControlMaster=auto', '-o', 'ControlPath=~/.ssh/waldur_slurm/%C', '-o', 'ControlPersist=600',
                    'root@localhost', '-p', '22', '-i', '/etc/waldur/id_rsa', template % context]
 
         backend = self.allocation.get_backend()
@@ -0,0 +1,122 @@
+from __future__ import unicode_literals
+
+import os
+import shutil
+import subprocess  # nosec
+import tempfile
+
+from django.test import TestCase
+
+from waldur_slurm.base import BatchError
+from waldur_slurm.client import SlurmClient, SlurmError
+from waldur_slurm.client_moab import MoabClient
+from waldur_slurm.session import BaseCommandRunner, SessionManager, SSHCommandRunner
+from waldur_slurm.structures import Quotas
+
+
+class FakeCommandRunner(BaseCommandRunner):
+    def __init__(self, output=''):
+        self.output = output
+        self.calls = []
+
+    def run(self, command, input=None):
+        self.calls.append((command, input))
+        if isinstance(self.output, Exception):
+            raise self.output
+        return self.output
+
+
+class SlurmClientTest(TestCase):
+    def setUp(self):
+        self.runner = FakeCommandRunner()
+        self.client = SlurmClient('localhost', '/etc/waldur/id_rsa', runner=self.runner)
+
+    def test_mutation_is_executed_immediately_outside_of_batch(self):
+        self.client.create_association('user1', 'account1')
+        self.assertEqual(self.runner.calls, [(
+            ['sacctmgr', '--parsable2', '--noheader', '--immediate',
+             'add', 'user', 'user1', 'account=account1', 'DefaultAccount='],
+            None,
+        )])
+
+    def test_mutations_are_executed_as_single_script_in_batch(self):
+        with self.client.batch():
+            self.client.create_association('user1', 'account1')
+            self.client.create_association('user2', 'account1')
+            self.client.set_resource_limits('account1', Quotas(cpu=1, gpu=2, ram=3))
+            self.assertEqual(self.runner.calls, [])
+
+        self.assertEqual(self.runner.calls, [(
+            ['sacctmgr', '--parsable2', '--noheader', '--immediate'],
+            'add user user1 account=account1 DefaultAccount=\n'
+            'add user user2 account=account1 DefaultAccount=\n'
+            'modify account account1 set GrpTRESMins=cpu=1,gres/gpu=2,mem=3\n',
+        )])
+
+    def test_error_is_raised_if_command_in_batch_has_failed_even_if_exit_code_is_zero(self):
+        self.runner.output = ' Adding User(s)\n  user1\n' \
+                             'sacctmgr: error: Problem adding user associations\n'
+        with self.assertRaises(SlurmError) as context:
+            with self.client.batch():
+                self.client.create_association('user1', 'account1')
+                self.client.create_association('user2', 'account2')
+        self.assertEqual(str(context.exception), 'sacctmgr: error: Problem adding user associations')
+
+    def test_queries_are_executed_immediately_in_batch(self):
+        with self.client.batch():
+            self.client.get_account('account1')
+            self.assertEqual(len(self.runner.calls), 1)
+
+    def test_batch_is_discarded_if_exception_is_raised(self):
+        with self.assertRaises(ValueError):
+            with self.client.batch():
+                self.client.create_association('user1', 'account1')
+                raise ValueError()
+        self.assertEqual(self.runner.calls, [])
+
+    def test_command_error_is_converted_to_batch_error(self):
+        self.runner.output = subprocess.CalledProcessError(1, ['sacctmgr'], output='Invalid account')
+        with self.assertRaises(BatchError):
+            self.client.get_account('account1')
+
+
+class MoabClientTest(TestCase):
+    def test_moab_client_uses_the_same_runner(self):
+        runner = FakeCommandRunner('account1|description|organization')
+        client = MoabClient('localhost', '/etc/waldur/id_rsa', runner=runner)
+        account = client.get_account('account1')
+        self.assertEqual(account.name, 'account1')
+        self.assertEqual(runner.calls[0][0][0], 'mam-list-accounts')
+
+
+class SessionManagerTest(TestCase):
+    def test_runner_is_shared_for_the_same_cluster(self):
+        manager = SessionManager()
+        runner1 = manager.get_runner('cluster1', '/etc/waldur/id_rsa')
+        runner2 = manager.get_runner('cluster1', '/etc/waldur/id_rsa')
+        runner3 = manager.get_runner('cluster2', '/etc/waldur/id_rsa')
+        self.assertIs(runner1, runner2)
+        self.assertIsNot(runner1, runner3)
+
+
+class SSHCommandRunnerTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def get_runner(self, control_directory):
+        return SSHCommandRunner('cluster1', '/etc/waldur/id_rsa',
+                                control_path=os.path.join(control_directory, '%C'), control_persist=600)
+
+    def test_private_control_directory_is_created(self):
+        control_directory = os.path.join(self.directory, 'sockets')
+        runner = self.get_runner(control_directory)
+
+        self.assertIn('ControlMaster=auto', runner.get_ssh_options())
+        self.assertEqual(os.stat(control_directory).st_mode & 0o777, 0o700)
+
+    def test_multiplexing_is_disabled_if_control_directory_is_accessible_by_other_users(self):
+        os.chmod(self.directory, 0o777)
+        runner = self.get_runner(self.directory)
+
+        self.assertNotIn('ControlMaster=auto', runner.get_ssh_options())
@@ -1,7 +1,9 @@
 from django.test import TestCase
 import mock
 
+from waldur_slurm.parser import SlurmReportLine, parse_duration, parse_report_line
 from waldur_slurm.tests import fixtures
+from waldur_slurm.tests.utils import mock_report_stream
 
 VALID_ALLOCATION = 'allocation1'
 
@@ -24,9 +26,9 @@ class ParserTest(TestCase):
         self.fixture = fixtures.SlurmFixture()
         self.fixture.service.settings.options = {'batch_service': 'SLURM'}
 
-        self.subprocess_patcher = mock.patch('subprocess.check_output')
+        self.subprocess_patcher = mock.patch('subprocess.Popen')
         self.subprocess_mock = self.subprocess_patcher.start()
-        self.subprocess_mock.return_value = raw
+        mock_report_stream(self.subprocess_mock, raw)
 
         backend = self.fixture.service.settings.get_backend()
         return backend.get_usage_report(VALID_ALLOCATION)
@@ -59,3 +61,18 @@ class ParserTest(TestCase):
         report = self.get_report(REPORT_WITHOUT_GPU)
         total = report[VALID_ALLOCATION]['TOTAL_ACCOUNT_USAGE']
         self.assertEqual(total.gpu, 0)
+
+
+class ReportLineTest(TestCase):
+    def test_duration_with_days_is_parsed(self):
+        self.assertEqual(parse_duration('1-02:03:04'), 24 * 60 + 2 * 60 + 3)
+
+    def test_duration_without_days_is_parsed(self):
+        self.assertEqual(parse_duration('00:02:59'), 2)
+
+    def test_streaming_parser_is_consistent_with_report_line(self):
+        for line in VALID_REPORT.strip().splitlines() + REPORT_WITHOUT_GPU.strip().splitlines():
+            report_line = SlurmReportLine(line)
+            quotas = report_line.quotas
+            self.assertEqual(parse_report_line(line), (
+                report_line.account, report_line.user, quotas.cpu, quotas.gpu, quotas.ram, quotas.deposit))
@@ -0,0 +1,11 @@
+import io
+
+
+def mock_report_stream(popen_mock, report):
+    """
+    Configure mocked subprocess.Popen so that report is streamed line by line.
+    """
+    process = popen_mock.return_value
+    process.stdout = io.BytesIO(report.encode('utf-8'))
+    process.wait.return_value = 0
+    return process
@@ -18,3 +18,22 @@ def format_current_month():
     month_start = core_utils.month_start(today).strftime('%Y-%m-%d')
     month_end = core_utils.month_end(today).strftime('%Y-%m-%d')
     return month_start, month_end
+
+
+def aggregate_usage(records):
+    """
+    Sum usage records by account and user without keeping records in memory.
+    :param records: iterable of (account, user, cpu, gpu, ram, deposit) tuples
+    :return: dict mapping (account, user) to [cpu, gpu, ram, deposit] list
+    """
+    usage = {}
+    for account, user, cpu, gpu, ram, deposit in records:
+        totals = usage.get((account, user))
+        if totals is None:
+            usage[(account, user)] = [cpu, gpu, ram, deposit]
+        else:
+            totals[0] += cpu
+            totals[1] += gpu
+            totals[2] += ram
+            totals[3] += deposit
+    return usage
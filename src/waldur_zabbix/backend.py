@@ -1,11 +1,13 @@
 from datetime import date, timedelta
 from decimal import Decimal
+import hashlib
 import logging
 import sys
 import warnings
 
 from django.conf import settings as django_settings
-from django.db import connections, DatabaseError
+from django.core.cache import cache
+from django.db import DatabaseError
 from django.utils import six, timezone
 import pyzabbix
 import requests
@@ -16,7 +18,7 @@ from waldur_core.core.utils import datetime_to_timestamp, timestamp_to_datetime
 from waldur_core.structure import ServiceBackend, ServiceBackendError, log_backend_action
 from waldur_core.structure.utils import update_pulled_fields
 
-from . import models, utils
+from . import history, models, utils
 
 
 logger = logging.getLogger(__name__)
@@ -87,6 +89,7 @@ class ZabbixBackend(ServiceBackend):
 
     TREND_DELAY_SECONDS = 60 * 60  # One hour
     HISTORY_DELAY_SECONDS = 15 * 60
+    ITEM_STATS_METHODS = ('last', 'min', 'max', 'avg')
 
     def __init__(self, settings):
         self.settings = settings
@@ -107,6 +110,10 @@ class ZabbixBackend(ServiceBackend):
     def database_parameters(self):
         return self.settings.get_option('database_parameters')
 
+    @property
+    def db(self):
+        return history.ZabbixDatabase(self.database_parameters)
+
     @property
     def api(self):
         if not hasattr(self, '_api'):
@@ -555,15 +562,30 @@ class ZabbixBackend(ServiceBackend):
 
     def get_sla(self, service_id, start_time, end_time):
         try:
-            data = self.api.service.getsla(
-                filter={'serviceids': service_id},
-                intervals={'from': start_time, 'to': end_time}
-            )
-            return data[service_id]['sla'][0]['sla']
-        except (pyzabbix.ZabbixAPIException, RequestException, IndexError, KeyError) as e:
+            return self.get_itservices_sla([service_id], [(start_time, end_time)])[service_id][0]
+        except (IndexError, KeyError) as e:
             message = 'Can not get Zabbix IT service SLA value for service with ID %s. Exception: %s'
             raise ZabbixBackendError(message % (service_id, e))
 
+    def get_itservices_sla(self, service_ids, intervals):
+        """
+        Get SLA of several IT services for several intervals with one request.
+        :param intervals: list of (start_time, end_time) pairs
+        :return: dict mapping service ID to list of SLA values ordered the same way as intervals
+        """
+        try:
+            data = self.api.service.getsla(
+                serviceids=service_ids,
+                intervals=[{'from': start_time, 'to': end_time} for start_time, end_time in intervals]
+            )
+            return {
+                service_id: [interval['sla'] for interval in service_data['sla']]
+                for service_id, service_data in data.items()
+            }
+        except (pyzabbix.ZabbixAPIException, RequestException, KeyError, TypeError) as e:
+            message = 'Can not get Zabbix IT services SLA values for services with IDs %s. Exception: %s'
+            raise ZabbixBackendError(message % (', '.join(service_ids), e))
+
     def get_itservice(self, service_id):
         try:
             response = self.api.service.get(filter={'serviceid': service_id}, output='extend')
@@ -580,25 +602,37 @@ class ZabbixBackend(ServiceBackend):
         Execute query to Zabbix DB to get minimum and maximum clock for service's alarm.
         Returns minimum and maximum dates.
         """
-        query = 'SELECT min(clock), max(clock) FROM service_alarms WHERE serviceid = %s'
-        cursor = self._execute_query(query, [serviceid])
-        min_timestamp, max_timestamp = cursor.fetchone()
+        try:
+            min_timestamp, max_timestamp = self.db.get_sla_range(serviceid)
+        except DatabaseError as e:
+            logger.exception('Can not execute query the Zabbix DB.')
+            reraise(e)
         return date.fromtimestamp(int(min_timestamp)), date.fromtimestamp(int(max_timestamp))
 
     def get_trigger_events(self, trigger_id, start_time, end_time):
+        return self.get_triggers_events([trigger_id], start_time, end_time).get(trigger_id, [])
+
+    def get_triggers_events(self, trigger_ids, start_time, end_time):
+        """
+        Get events of several triggers with one request.
+        :return: dict mapping trigger ID to list of events ordered by time
+        """
         try:
             event_data = self.api.event.get(
-                output='extend',
-                objectids=trigger_id,
+                output=['objectid', 'clock', 'value'],
+                objectids=trigger_ids,
                 time_from=start_time,
                 time_till=end_time,
                 sortfield=["clock"],
                 sortorder="ASC")
         except (pyzabbix.ZabbixAPIException, RequestException) as e:
-            message = 'Can not get events for trigger with ID %s. Exception: %s'
-            raise ZabbixBackendError(message % (trigger_id, e))
-        else:
-            return [{'timestamp': e['clock'], 'value': e['value']} for e in event_data]
+            message = 'Can not get events for triggers with IDs %s. Exception: %s'
+            raise ZabbixBackendError(message % (', '.join(trigger_ids), e))
+
+        events = {}
+        for e in event_data:
+            events.setdefault(e['objectid'], []).append({'timestamp': e['clock'], 'value': e['value']})
+        return events
 
     def _get_api(self, backend_url, username, password):
         unsafe_session = QuietSession()
@@ -608,7 +642,38 @@ class ZabbixBackend(ServiceBackend):
         api.login(username, password)
         return api
 
-    def get_item_stats(self, hostid, item, points):
+    def get_item_stats(self, hostid, item, points, method='last'):
+        return self.get_items_stats([hostid], item, points, method)[hostid]
+
+    def get_items_stats(self, hostids, item, points, method='last'):
+        """
+        Get values of item at given points for several hosts at once.
+        History and trends of all hosts are fetched with one query per table.
+        Points have to be sorted ascending. Result is cached for a short time,
+        because the same charts are usually requested by several users.
+
+        Output format: {<host ID>: [<value at point>, ...], ...}
+        """
+        if method not in self.ITEM_STATS_METHODS:
+            raise ZabbixBackendError('Unsupported item statistics method %s.' % method)
+
+        cache_timeout = django_settings.WALDUR_ZABBIX.get('ITEM_STATS_CACHE_TIMEOUT', 60)
+        if cache_timeout:
+            cache_key = self._get_item_stats_cache_key(hostids, item, points, method)
+            stats = cache.get(cache_key)
+            if stats is None:
+                stats = self._get_items_stats(hostids, item, points, method)
+                cache.set(cache_key, stats, cache_timeout)
+            return stats
+        return self._get_items_stats(hostids, item, points, method)
+
+    def _get_item_stats_cache_key(self, hostids, item, points, method):
+        parameters = (self.settings.uuid.hex, sorted(hostids), item.key, item.value_type,
+                      item.history, item.delay, list(points), method)
+        digest = hashlib.md5(six.text_type(parameters).encode('utf-8')).hexdigest()
+        return 'zabbix:item_stats:%s' % digest
+
+    def _get_items_stats(self, hostids, item, points, method):
         if item.value_type == models.Item.ValueTypes.FLOAT:
             history_table = 'history'
             trend_table = 'trends'
@@ -619,49 +684,54 @@ class ZabbixBackend(ServiceBackend):
         else:
             raise ZabbixBackendError('Cannot get statistics for non-numerical item %s' % item.key)
 
-        history_retention_days = item.history
         history_delay_seconds = item.delay or self.HISTORY_DELAY_SECONDS
         trend_delay_seconds = self.TREND_DELAY_SECONDS
 
-        trends_start_date = datetime_to_timestamp(timezone.now() - timedelta(days=history_retention_days))
+        try:
+            history_values = self._group_by_host(self.db.get_history(
+                hostids, item.key, history_table, min(points) - history_delay_seconds, max(points)))
+            trends_values = self._group_by_host(self.db.get_history(
+                hostids, item.key, trend_table, min(points) - trend_delay_seconds, max(points)))
+        except DatabaseError as e:
+            logger.exception('Can not execute query the Zabbix DB.')
+            reraise(e)
 
-        points = points[::-1]
-        history_cursor = self._get_history(
-            item.key, hostid, history_table, points[-1] - history_delay_seconds, points[0])
-        trends_cursor = self._get_history(
-            item.key, hostid, trend_table, points[-1] - trend_delay_seconds, points[0])
+        empty = ([], [])
+        return {
+            hostid: self._get_values_at_points(
+                item, points, history_values.get(hostid, empty), trends_values.get(hostid, empty), method)
+            for hostid in hostids
+        }
 
-        values = []
-        if points[0] > trends_start_date:
-            next_value = history_cursor.fetchone()
-        else:
-            next_value = trends_cursor.fetchone()
+    def _group_by_host(self, rows):
+        """
+        Rows are ordered by host and time, so that each host gets times and values sorted ascending.
+        :return: dict mapping host ID to (times, values) pair
+        """
+        result = {}
+        for hostid, time, value in rows:
+            times, values = result.setdefault(six.text_type(hostid), ([], []))
+            times.append(time)
+            values.append(value)
+        return result
 
-        for end, start in zip(points[:-1], points[1:]):
-            if start > trends_start_date:
-                interval = history_delay_seconds
-            else:
-                interval = trend_delay_seconds
-
-            value = None
-            while True:
-                if next_value is None:
-                    break
-                time, value = next_value
-                if item.is_byte():
-                    value = self.b2mb(value)
-
-                if time <= end:
-                    if end - time < interval or time > start:
-                        break
-                else:
-                    if start > trends_start_date:
-                        next_value = history_cursor.fetchone()
-                    else:
-                        next_value = trends_cursor.fetchone()
+    def _get_values_at_points(self, item, points, history, trends, method='last'):
+        """
+        History is used for segments within item history retention period, trends are used otherwise.
+        """
+        trends_start_date = datetime_to_timestamp(timezone.now() - timedelta(days=item.history))
+        history_delay_seconds = item.delay or self.HISTORY_DELAY_SECONDS
+
+        history_values = utils.resample(history[0], history[1], points, history_delay_seconds, method)
+        trends_values = utils.resample(trends[0], trends[1], points, self.TREND_DELAY_SECONDS, method)
 
+        values = []
+        for start, history_value, trends_value in zip(points[:-1], history_values, trends_values):
+            value = history_value if start > trends_start_date else trends_value
+            if value is not None and item.is_byte():
+                value = self.b2mb(value)
             values.append(value)
-        return values[::-1]
+        return values
 
     def get_items_aggregated_values(self, host, items, start_timestamp, end_timestamp, method='MAX'):
         """
@@ -674,126 +744,43 @@ class ZabbixBackend(ServiceBackend):
                 ...
             }
         """
-        int_items = [item for item in items if item.value_type == models.Item.ValueTypes.INTEGER]
-        float_items = [item for item in items if item.value_type == models.Item.ValueTypes.FLOAT]
-
-        # Get aggregated data from DB
-        db_data = tuple()
-        default_kwargs = {
-            'hostid': host.backend_id,
-            'start_timestamp': start_timestamp,
-            'end_timestamp': end_timestamp,
-            'method': method,
-        }
-        # XXX: We need to get values from table "trends" if end_timestamp < item.history.
-        if int_items:
-            cursor = self._get_aggregated_values(
-                item_keys=[item.key for item in int_items],
-                table='history_uint',
-                **default_kwargs
-            )
-            db_data += cursor.fetchall()
-        if float_items:
-            cursor = self._get_aggregated_values(
-                item_keys=[item.key for item in float_items],
-                table='history',
-                **default_kwargs
-            )
-            db_data += cursor.fetchall()
+        return self.get_hosts_items_aggregated_values(
+            [host], items, start_timestamp, end_timestamp, method)[host.backend_id]
 
-        # Prepare data - convert B to MB if needed
-        items_keys = {item.key: item for item in items}
-        aggregated_values = {}
-        for key, value in db_data:
-            item = items_keys[key]
-            aggregated_values[key] = self.b2mb(value) if item.is_byte() else value
-        return aggregated_values
-
-    def b2mb(self, value):
-        return value / 1024 / 1024
-
-    def _get_history(self, item_key, hostid, table, start_timestamp, end_timestamp):
-        """
-        Execute query to zabbix db to get item values from history
+    def get_hosts_items_aggregated_values(self, hosts, items, start_timestamp, end_timestamp, method='MAX'):
         """
-        query = (
-            'SELECT clock time, %(value_path)s value '
-            'FROM %(table)s history, items '
-            'WHERE history.itemid = items.itemid '
-            'AND items.key_ = "%(item_key)s" '
-            'AND items.hostid = %(hostid)s '
-            'AND clock > %(start_timestamp)s '
-            'AND clock < %(end_timestamp)s '
-            'ORDER BY clock DESC'
-        )
-        parameters = {
-            'table': table,
-            'item_key': item_key,
-            'hostid': hostid,
-            'start_timestamp': start_timestamp,
-            'end_timestamp': end_timestamp,
-            'value_path': table.startswith('history') and 'value' or 'value_avg'
-        }
-        query = query % parameters
-
-        return self._execute_query(query)
+        Get aggregate values of items for several hosts with one query per value type.
 
-    def _get_aggregated_values(self, hostid, item_keys, start_timestamp, end_timestamp, table, method='MAX'):
+        Output format: {<host backend ID>: {<item key>: <aggregated value>, ...}, ...}
         """
-        Execute query to zabbix DB to get item aggregated historical value.
-        """
-        # XXX: This query is really slow with a lot of item_keys, need to speed up it with index.
-        query = (
-            'SELECT items.key_, %(method)s(value) '
-            'FROM hosts, items, %(table)s history '
-            'WHERE items.hostid = %(hostid)s AND hosts.hostid = %(hostid)s AND history.itemid = items.itemid '
-            'AND items.key_ IN (%(item_keys)s) '
-            'AND clock >= %(start_timestamp)s '
-            'AND clock <= %(end_timestamp)s '
-            'GROUP BY items.key_'
-        )
-
-        parameters = {
-            'method': method,
-            'table': table,
-            'hostid': hostid,
-            'item_keys': ', '.join(['"%s"' % key for key in item_keys]),
-            'start_timestamp': start_timestamp,
-            'end_timestamp': end_timestamp,
-        }
-
-        query = query % parameters
-        return self._execute_query(query)
-
-    def _get_db_connection(self, force=False):
-        host = self.database_parameters['host']
-        port = self.database_parameters['port']
-        name = self.database_parameters['name']
-        user = self.database_parameters['user']
-        password = self.database_parameters['password']
-
-        key = '/'.join([name, host, port])
-        if key not in connections.databases or force:
-            connections.databases[key] = {
-                'ENGINE': 'django.db.backends.mysql',
-                'NAME': name,
-                'HOST': host,
-                'PORT': port,
-                'USER': user,
-                'PASSWORD': password
-            }
-        return connections[key]
+        hostids = [host.backend_id for host in hosts]
+        int_items = [item.key for item in items if item.value_type == models.Item.ValueTypes.INTEGER]
+        float_items = [item.key for item in items if item.value_type == models.Item.ValueTypes.FLOAT]
 
-    def _execute_query(self, query, *args, **kwargs):
-        logger.debug('Executing query %s to Zabbix' % query)
+        # XXX: We need to get values from table "trends" if end_timestamp < item.history.
+        db_data = []
         try:
-            cursor = self._get_db_connection().cursor()
-            cursor.execute(query, *args, **kwargs)
-            return cursor
+            if int_items:
+                db_data += self.db.get_aggregated_values(
+                    hostids, int_items, 'history_uint', start_timestamp, end_timestamp, method)
+            if float_items:
+                db_data += self.db.get_aggregated_values(
+                    hostids, float_items, 'history', start_timestamp, end_timestamp, method)
         except DatabaseError as e:
             logger.exception('Can not execute query the Zabbix DB.')
             reraise(e)
 
+        # Prepare data - convert B to MB if needed
+        items_keys = {item.key: item for item in items}
+        aggregated_values = {hostid: {} for hostid in hostids}
+        for hostid, key, value in db_data:
+            item = items_keys[key]
+            aggregated_values[six.text_type(hostid)][key] = self.b2mb(value) if item.is_byte() else value
+        return aggregated_values
+
+    def b2mb(self, value):
+        return value / 1024 / 1024
+
     def import_host(self, host_backend_id, service_project_link=None, save=True):
         if save and not service_project_link:
             raise AttributeError('Cannot save imported host if SPL is not defined.')
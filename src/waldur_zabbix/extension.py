@@ -22,7 +22,11 @@ class ZabbixExtension(WaldurExtension):
                 ('comments', 'comments', 'ReadOnlyField'),
                 ('error', 'error', 'ReadOnlyField'),
                 ('value', 'value', 'IntegerField'),
-            )
+            ),
+            # Connection to Zabbix database is kept open and reused for this number of seconds.
+            'DB_CONN_MAX_AGE': 600,
+            # Item statistics are cached for this number of seconds. Set to 0 to disable caching.
+            'ITEM_STATS_CACHE_TIMEOUT': 60,
         }
 
     @staticmethod
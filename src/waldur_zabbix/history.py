@@ -0,0 +1,141 @@
+"""
+Queries to Zabbix database.
+
+Values are always passed as query parameters. Only table names and aggregation
+methods are interpolated, and they are validated against whitelists.
+"""
+import logging
+
+from django.conf import settings as django_settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+HISTORY_TABLES = ('history', 'history_uint')
+TREND_TABLES = ('trends', 'trends_uint')
+AGGREGATION_METHODS = ('MIN', 'MAX', 'AVG', 'SUM')
+
+
+def get_connection(database_parameters):
+    """
+    Register dedicated database alias for Zabbix DB once per process.
+    Connection is persistent for CONN_MAX_AGE seconds, so it is reused by subsequent queries.
+    """
+    name = database_parameters['name']
+    host = database_parameters.get('host', '')
+    port = database_parameters.get('port', '')
+
+    alias = 'zabbix:%s/%s/%s' % (name, host, port)
+    if alias not in connections.databases:
+        connections.databases[alias] = {
+            'ENGINE': database_parameters.get('engine', 'django.db.backends.mysql'),
+            'NAME': name,
+            'HOST': host,
+            'PORT': port,
+            'USER': database_parameters.get('user', ''),
+            'PASSWORD': database_parameters.get('password', ''),
+            'CONN_MAX_AGE': django_settings.WALDUR_ZABBIX.get('DB_CONN_MAX_AGE', 600),
+        }
+    return connections[alias]
+
+
+def placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+class ZabbixDatabase(object):
+
+    def __init__(self, database_parameters, fetch_size=1000):
+        self.database_parameters = database_parameters
+        self.fetch_size = fetch_size
+
+    @property
+    def connection(self):
+        return get_connection(self.database_parameters)
+
+    def execute(self, query, params=None):
+        logger.debug('Executing query %s to Zabbix with parameters %s', query, params)
+        cursor = self.connection.cursor()
+        cursor.execute(query, params)
+        return cursor
+
+    def stream(self, query, params=None):
+        """
+        Yield rows fetched from cursor in chunks, so that the whole result is not materialized.
+        """
+        cursor = self.execute(query, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(self.fetch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield row
+        finally:
+            cursor.close()
+
+    def get_items(self, hostids, item_keys):
+        """
+        :return: dict mapping item ID to (host ID, item key) pair
+        """
+        if not hostids or not item_keys:
+            return {}
+        query = (
+            'SELECT itemid, hostid, key_ FROM items '
+            'WHERE hostid IN (%s) AND key_ IN (%s)' % (placeholders(hostids), placeholders(item_keys))
+        )
+        return {
+            itemid: (hostid, key)
+            for itemid, hostid, key in self.stream(query, list(hostids) + list(item_keys))
+        }
+
+    def get_history(self, hostids, item_key, table, start_timestamp, end_timestamp):
+        """
+        Stream item values of several hosts from history or trends table.
+        :return: iterator of (host ID, clock, value) ordered by host ID and then by clock
+        """
+        if table not in HISTORY_TABLES + TREND_TABLES:
+            raise ValueError('Invalid Zabbix history table %s.' % table)
+        if not hostids:
+            return iter([])
+
+        value_column = table in HISTORY_TABLES and 'value' or 'value_avg'
+        query = (
+            'SELECT items.hostid, history.clock, history.%s '
+            'FROM %s history INNER JOIN items ON history.itemid = items.itemid '
+            'WHERE items.hostid IN (%s) AND items.key_ = %%s '
+            'AND history.clock > %%s AND history.clock < %%s '
+            'ORDER BY items.hostid, history.clock' % (value_column, table, placeholders(hostids))
+        )
+        return self.stream(query, list(hostids) + [item_key, start_timestamp, end_timestamp])
+
+    def get_aggregated_values(self, hostids, item_keys, table, start_timestamp, end_timestamp, method='MAX'):
+        """
+        Aggregate values of several items of several hosts.
+        Item IDs are resolved first, so that history table is filtered by its (itemid, clock) index.
+        :return: list of (host ID, item key, aggregated value) tuples
+        """
+        if table not in HISTORY_TABLES + TREND_TABLES:
+            raise ValueError('Invalid Zabbix history table %s.' % table)
+        if method not in AGGREGATION_METHODS:
+            raise ValueError('Invalid aggregation method %s.' % method)
+
+        items = self.get_items(hostids, item_keys)
+        if not items:
+            return []
+
+        value_column = table in HISTORY_TABLES and 'value' or 'value_avg'
+        query = (
+            'SELECT itemid, %s(%s) FROM %s '
+            'WHERE itemid IN (%s) AND clock >= %%s AND clock <= %%s '
+            'GROUP BY itemid' % (method, value_column, table, placeholders(items))
+        )
+        params = list(items.keys()) + [start_timestamp, end_timestamp]
+        return [
+            items[itemid] + (value,)
+            for itemid, value in self.stream(query, params)
+        ]
+
+    def get_sla_range(self, serviceid):
+        query = 'SELECT min(clock), max(clock) FROM service_alarms WHERE serviceid = %s'
+        return self.execute(query, [serviceid]).fetchone()
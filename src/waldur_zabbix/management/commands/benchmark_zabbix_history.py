@@ -0,0 +1,64 @@
+from __future__ import unicode_literals
+
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from waldur_zabbix import history
+from waldur_zabbix.zabbix_db import ZabbixDatabaseFixture
+
+
+class Command(BaseCommand):
+    help = ('Compare per-host and batched queries to Zabbix history. '
+            'Synthetic history is stored in temporary SQLite database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hosts', type=int, default=100,
+                            help='Number of hosts.')
+        parser.add_argument('--items', type=int, default=10,
+                            help='Number of items per host.')
+        parser.add_argument('--values', type=int, default=1000,
+                            help='Number of history values per item.')
+
+    def handle(self, *args, **options):
+        fixture = ZabbixDatabaseFixture()
+        try:
+            self.benchmark(fixture, options['hosts'], options['items'], options['values'])
+        finally:
+            fixture.close()
+
+    def benchmark(self, fixture, hosts_count, items_count, values_count):
+        hostids = range(1, hosts_count + 1)
+        item_keys = ['item_%s' % index for index in range(items_count)]
+        for hostid in hostids:
+            for key in item_keys:
+                itemid = fixture.add_item(hostid, key)
+                fixture.add_values('history', itemid, [
+                    (clock, random.random()) for clock in range(values_count)  # nosec
+                ])
+        self.stdout.write('Created %s values' % (hosts_count * items_count * values_count))
+
+        db = history.ZabbixDatabase(fixture.database_parameters)
+        end = values_count
+
+        start = time.time()
+        for hostid in hostids:
+            list(db.get_history([hostid], item_keys[0], 'history', 0, end))
+        self.report('History, query per host', start, hosts_count)
+
+        start = time.time()
+        list(db.get_history(hostids, item_keys[0], 'history', 0, end))
+        self.report('History, batched query', start, 1)
+
+        start = time.time()
+        for hostid in hostids:
+            db.get_aggregated_values([hostid], item_keys, 'history', 0, end)
+        self.report('Aggregated values, query per host', start, hosts_count * 2)
+
+        start = time.time()
+        db.get_aggregated_values(hostids, item_keys, 'history', 0, end)
+        self.report('Aggregated values, batched query', start, 2)
+
+    def report(self, title, start, queries_count):
+        self.stdout.write('%s: %.3f seconds, %s queries' % (title, time.time() - start, queries_count))
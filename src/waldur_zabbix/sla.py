@@ -0,0 +1,164 @@
+"""
+Batched ingestion of IT services SLA and state transitions.
+
+IT services are grouped by Zabbix server, so that SLA of a batch of services for all
+requested periods is fetched with one API request, and trigger events of the whole range
+are fetched with another one. Results are stored with bulk upserts.
+"""
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+import logging
+
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+
+from waldur_core.core import utils as core_utils
+from waldur_core.monitoring.models import ResourceSla, ResourceSlaStateTransition
+from waldur_core.monitoring.utils import format_period
+
+from .backend import ZabbixBackendError
+from .models import SlaHistory, SlaHistoryEvent
+
+logger = logging.getLogger(__name__)
+
+SlaPeriod = namedtuple('SlaPeriod', ('period', 'start_time', 'end_time'))
+
+SLA_PRECISION = Decimal('0.0001')
+
+
+def get_monthly_periods(min_dt, max_dt):
+    """
+    Split date range to calendar months. The last period ends at max_dt.
+    """
+    periods = []
+    # Shift date to beginning of the month
+    current_point = min_dt.replace(day=1)
+    while current_point <= max_dt:
+        period = format_period(current_point)
+        start_time = core_utils.datetime_to_timestamp(current_point)
+        current_point += relativedelta(months=+1)
+        end_time = core_utils.datetime_to_timestamp(min(max_dt, current_point))
+        periods.append(SlaPeriod(period, start_time, end_time))
+    return periods
+
+
+def pull_itservices_sla(itservices, periods, batch_size=100):
+    """
+    Pull SLA and state transitions of IT services for given periods.
+    """
+    if not periods:
+        return
+
+    grouped_itservices = defaultdict(list)
+    for itservice in itservices:
+        grouped_itservices[itservice.service_project_link.service.settings].append(itservice)
+
+    for settings, settings_itservices in grouped_itservices.items():
+        backend = settings_itservices[0].get_backend()
+        for batch in core_utils.chunked(settings_itservices, batch_size):
+            try:
+                slas, events = fetch_itservices_sla(backend, batch, periods)
+            except ZabbixBackendError as e:
+                logger.warning('Unable to pull SLA for IT services of settings %s. Reason: %s', settings, e)
+                continue
+            save_itservices_sla(batch, periods, slas, events)
+            logger.debug('Successfully pulled SLA of %s IT services for periods %s.',
+                         len(batch), ', '.join(period.period for period in periods))
+
+
+def fetch_itservices_sla(backend, itservices, periods):
+    slas = backend.get_itservices_sla(
+        [itservice.backend_id for itservice in itservices],
+        [(period.start_time, period.end_time) for period in periods],
+    )
+    trigger_ids = list(set(itservice.backend_trigger_id for itservice in itservices
+                           if itservice.backend_trigger_id))
+    events = {}
+    if trigger_ids:
+        start_time = min(period.start_time for period in periods)
+        end_time = max(period.end_time for period in periods)
+        events = backend.get_triggers_events(trigger_ids, start_time, end_time)
+    return slas, events
+
+
+def get_scope(itservice):
+    """
+    SLA is added to the resource monitored by host only if IT service is main for the host.
+    """
+    if itservice.host and itservice.is_main:
+        return itservice.host.scope
+
+
+@transaction.atomic()
+def save_itservices_sla(itservices, periods, slas, events):
+    """
+    :param slas: dict mapping IT service backend ID to list of SLA values ordered the same way as periods
+    :param events: dict mapping trigger backend ID to list of events
+    """
+    histories = []
+    history_events = []
+    resource_slas = []
+    transitions = []
+
+    for itservice in itservices:
+        values = slas.get(itservice.backend_id)
+        if values is None:
+            logger.warning('SLA for IT Service %s (ID: %s) is not returned by Zabbix.',
+                           itservice.name, itservice.backend_id)
+            continue
+
+        scope = get_scope(itservice)
+        for period, value in zip(periods, values):
+            value = Decimal(value).quantize(SLA_PRECISION)
+            histories.append(SlaHistory(itservice=itservice, period=period.period, value=value))
+            if scope:
+                resource_slas.append(ResourceSla(
+                    scope=scope, period=period.period, value=value, agreed_value=itservice.agreed_sla))
+
+        if not itservice.backend_trigger_id:
+            continue
+
+        for event in events.get(itservice.backend_trigger_id, []):
+            timestamp = int(event['timestamp'])
+            is_up = int(event['value']) == 0
+            for period in periods:
+                if not period.start_time <= timestamp <= period.end_time:
+                    continue
+                history_events.append((itservice.pk, period.period, timestamp, 'U' if is_up else 'D'))
+                if scope:
+                    transitions.append(ResourceSlaStateTransition(
+                        scope=scope, period=period.period, timestamp=timestamp, state=is_up))
+
+    core_utils.bulk_upsert(SlaHistory, histories, ('itservice_id', 'period'), ('value',))
+    core_utils.bulk_upsert(ResourceSla, resource_slas,
+                           ('content_type_id', 'object_id', 'period'), ('value', 'agreed_value'))
+    core_utils.bulk_upsert(ResourceSlaStateTransition, transitions,
+                           ('content_type_id', 'object_id', 'period', 'timestamp'), ('state',))
+    save_history_events(itservices, periods, history_events)
+
+
+def save_history_events(itservices, periods, history_events):
+    """
+    Create missing SLA history events. Existing events are loaded with one query.
+    :param history_events: list of (IT service ID, period, timestamp, state) tuples
+    """
+    if not history_events:
+        return
+
+    history_ids = {
+        (itservice_id, period): pk
+        for pk, itservice_id, period in SlaHistory.objects.filter(
+            itservice__in=itservices,
+            period__in=[period.period for period in periods],
+        ).values_list('pk', 'itservice_id', 'period')
+    }
+    existing_events = set(SlaHistoryEvent.objects.filter(
+        history_id__in=history_ids.values()).values_list('history_id', 'timestamp', 'state'))
+
+    new_events = []
+    for itservice_id, period, timestamp, state in history_events:
+        key = (history_ids[(itservice_id, period)], timestamp, state)
+        if key not in existing_events:
+            existing_events.add(key)
+            new_events.append(SlaHistoryEvent(history_id=key[0], timestamp=timestamp, state=state))
+    SlaHistoryEvent.objects.bulk_create(new_events, batch_size=500)
@@ -1,58 +1,53 @@
+from collections import defaultdict
 import datetime
-from decimal import Decimal
 import logging
 
 from celery import shared_task
-from dateutil.relativedelta import relativedelta
 from django.contrib.contenttypes.models import ContentType
 from django.core.mail import send_mail
+from django.utils import six
 
 from waldur_core.core import tasks as core_tasks, utils as core_utils
-from waldur_core.monitoring.models import ResourceItem, ResourceSla, ResourceSlaStateTransition
-from waldur_core.monitoring.utils import format_period
+from waldur_core.monitoring.models import ResourceItem
+from waldur_core.monitoring.utils import format_period, to_list
 
+from . import sla
 from .backend import ZabbixBackendError
-from .models import Host, ITService, Item, SlaHistory
+from .models import Host, ITService, Item
 
 logger = logging.getLogger(__name__)
 
 
 @shared_task(name='waldur_core.zabbix.pull_sla')
-def pull_sla(host_uuid):
+def pull_sla(host_uuids):
     """
-    Pull SLAs for given Zabbix host for all time of its existence in Zabbix
+    Pull SLAs for given Zabbix hosts for all time of their existence in Zabbix
     """
-    try:
-        host = Host.objects.get(uuid=host_uuid)
-    except Host.DoesNotExist:
-        logger.warning('Unable to pull SLA for host with UUID %s, because it is gone', host_uuid)
-        return
-
-    try:
-        itservice = ITService.objects.get(host=host, is_main=True)
-    except ITService.DoesNotExist:
-        logger.warning('Unable to pull SLA for host with UUID %s, because IT service does not exist', host_uuid)
-        return
-
-    backend = itservice.get_backend()
-
-    try:
-        # Get dates of first and last service alarm
-        min_dt, max_dt = backend.get_sla_range(itservice.backend_id)
-    except ZabbixBackendError as e:
-        logger.warning('Unable to pull SLA for host with with UUID %s because of database error: %s', host_uuid, e)
-        return
-
-    # Shift date to beginning of the month
-    current_point = min_dt.replace(day=1)
-    while current_point <= max_dt:
-        period = format_period(current_point)
-        start_time = core_utils.datetime_to_timestamp(current_point)
-        current_point += relativedelta(months=+1)
-        end_time = core_utils.datetime_to_timestamp(min(max_dt, current_point))
-        update_itservice_sla.delay(itservice.pk, period, start_time, end_time)
-
-    logger.debug('Successfully pulled SLA for host with with UUID %s', host_uuid)
+    host_uuids = to_list(host_uuids)
+    itservices = get_itservices_queryset().filter(host__uuid__in=host_uuids, is_main=True)
+    if len(itservices) < len(host_uuids):
+        logger.warning('Unable to pull SLA for some hosts with UUIDs %s, because they or IT services are gone',
+                       ', '.join(six.text_type(host_uuid) for host_uuid in host_uuids))
+
+    # IT services with the same alarms range are pulled together
+    grouped_itservices = defaultdict(list)
+    for itservice in itservices:
+        backend = itservice.get_backend()
+        try:
+            # Get dates of first and last service alarm
+            min_dt, max_dt = backend.get_sla_range(itservice.backend_id)
+        except ZabbixBackendError as e:
+            logger.warning('Unable to pull SLA for host with with UUID %s because of database error: %s',
+                           itservice.host.uuid.hex, e)
+            continue
+        periods = tuple(sla.get_monthly_periods(min_dt, max_dt))
+        grouped_itservices[periods].append(itservice)
+
+    for periods, periods_itservices in grouped_itservices.items():
+        sla.pull_itservices_sla(periods_itservices, periods)
+
+    logger.debug('Successfully pulled SLA for hosts with with UUIDs %s',
+                 ', '.join(six.text_type(host_uuid) for host_uuid in host_uuids))
 
 
 @shared_task(name='waldur_core.zabbix.update_sla')
@@ -64,7 +59,7 @@ def update_sla(sla_type):
     dt = datetime.datetime.now()
 
     if sla_type == 'yearly':
-        period = dt.year
+        period = six.text_type(dt.year)
         start_time = int(datetime.datetime.strptime('01/01/%s' % dt.year, '%d/%m/%Y').strftime("%s"))
     else:  # it's a monthly SLA update
         period = format_period(dt)
@@ -73,8 +68,7 @@ def update_sla(sla_type):
 
     end_time = int(dt.strftime("%s"))
 
-    for itservice in ITService.objects.all():
-        update_itservice_sla.delay(itservice.pk, period, start_time, end_time)
+    sla.pull_itservices_sla(get_itservices_queryset(), [sla.SlaPeriod(period, start_time, end_time)])
 
 
 @shared_task
@@ -82,53 +76,17 @@ def update_itservice_sla(itservice_pk, period, start_time, end_time):
     logger.debug('Updating SLAs for IT Service with PK %s. Period: %s, start_time: %s, end_time: %s',
                  itservice_pk, period, start_time, end_time)
 
-    try:
-        itservice = ITService.objects.get(pk=itservice_pk)
-    except ITService.DoesNotExist:
+    itservices = get_itservices_queryset().filter(pk=itservice_pk)
+    if not itservices:
         logger.warning('Unable to update SLA for IT Service with PK %s, because it is gone', itservice_pk)
         return
 
-    backend = itservice.host.get_backend()
-
-    try:
-        current_sla = backend.get_sla(itservice.backend_id, start_time, end_time)
-        entry, _ = SlaHistory.objects.get_or_create(itservice=itservice, period=period)
-        entry.value = Decimal(current_sla)
-        entry.save()
-
-        # Save SLA if IT service is marked as main for host
-        if itservice.host and itservice.host.scope and itservice.is_main:
-            ResourceSla.objects.update_or_create(
-                object_id=itservice.host.scope.id,
-                content_type=ContentType.objects.get_for_model(itservice.host.scope),
-                period=period,
-                defaults={
-                    'value': current_sla,
-                    'agreed_value': itservice.agreed_sla
-                }
-            )
-
-        if itservice.backend_trigger_id:
-            # update connected events
-            events = backend.get_trigger_events(itservice.backend_trigger_id, start_time, end_time)
-            for event in events:
-                event_state = 'U' if int(event['value']) == 0 else 'D'
-                entry.events.get_or_create(
-                    timestamp=int(event['timestamp']),
-                    state=event_state
-                )
-
-                if itservice.host and itservice.host.scope and itservice.is_main:
-                    ResourceSlaStateTransition.objects.get_or_create(
-                        scope=itservice.host.scope,
-                        period=period,
-                        timestamp=int(event['timestamp']),
-                        state=int(event['value']) == 0
-                    )
-    except ZabbixBackendError as e:
-        logger.warning(
-            'Unable to update SLA for IT Service %s (ID: %s). Reason: %s', itservice.name, itservice.backend_id, e)
-    logger.debug('Successfully updated SLA for IT Service %s (ID: %s)', itservice.name, itservice.backend_id)
+    sla.pull_itservices_sla(itservices, [sla.SlaPeriod(six.text_type(period), start_time, end_time)])
+
+
+def get_itservices_queryset():
+    return ITService.objects.all().select_related(
+        'host', 'service_project_link__service__settings').prefetch_related('host__scope')
 
 
 @shared_task(name='waldur_core.zabbix.update_monitoring_items')
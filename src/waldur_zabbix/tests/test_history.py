@@ -0,0 +1,71 @@
+from django.test import TestCase
+from django.utils import timezone
+
+from waldur_core.core.utils import datetime_to_timestamp
+
+from . import factories
+from .. import history, models
+from ..zabbix_db import ZabbixDatabaseFixture
+
+
+class ZabbixDatabaseTest(TestCase):
+    def setUp(self):
+        self.fixture = ZabbixDatabaseFixture()
+        self.addCleanup(self.fixture.close)
+        self.db = history.ZabbixDatabase(self.fixture.database_parameters, fetch_size=2)
+
+        self.cpu1 = self.fixture.add_item(1, 'cpu')
+        self.cpu2 = self.fixture.add_item(2, 'cpu')
+        self.ram1 = self.fixture.add_item(1, 'ram')
+        self.fixture.add_values('history', self.cpu1, [(100, 1.0), (200, 2.0), (300, 3.0)])
+        self.fixture.add_values('history', self.cpu2, [(100, 10.0), (200, 20.0)])
+        self.fixture.add_values('history', self.ram1, [(100, 5.0)])
+
+    def test_history_of_several_hosts_is_fetched_in_one_query(self):
+        rows = list(self.db.get_history([1, 2], 'cpu', 'history', 0, 250))
+        self.assertEqual(rows, [(1, 100, 1.0), (1, 200, 2.0), (2, 100, 10.0), (2, 200, 20.0)])
+
+    def test_values_are_aggregated_per_host_and_item(self):
+        rows = self.db.get_aggregated_values([1, 2], ['cpu', 'ram'], 'history', 0, 300, 'MAX')
+        self.assertEqual(sorted(rows), [(1, 'cpu', 3.0), (1, 'ram', 5.0), (2, 'cpu', 20.0)])
+
+    def test_key_is_passed_as_parameter(self):
+        rows = self.db.get_aggregated_values([1], ['cpu" OR "1" = "1'], 'history', 0, 300, 'MAX')
+        self.assertEqual(rows, [])
+
+    def test_invalid_aggregation_method_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.db.get_aggregated_values([1], ['cpu'], 'history', 0, 300, 'MAX(value)); --')
+
+
+class BackendHistoryTest(TestCase):
+    def setUp(self):
+        self.fixture = ZabbixDatabaseFixture()
+        self.addCleanup(self.fixture.close)
+
+        host = factories.HostFactory(backend_id='1')
+        settings = host.service_project_link.service.settings
+        settings.options = {'database_parameters': self.fixture.database_parameters}
+        settings.save()
+        self.host1 = host
+        self.host2 = factories.HostFactory(backend_id='2', service_project_link=host.service_project_link)
+        self.backend = settings.get_backend()
+
+        template = factories.TemplateFactory(settings=settings)
+        self.item = models.Item.objects.create(
+            template=template, key='ram', name='RAM', backend_id='ram', units='B',
+            value_type=models.Item.ValueTypes.INTEGER, history=7, delay=60)
+
+        self.now = datetime_to_timestamp(timezone.now())
+        for hostid, value in ((1, 2 * 1024 * 1024), (2, 3 * 1024 * 1024)):
+            itemid = self.fixture.add_item(hostid, 'ram')
+            self.fixture.add_values('history_uint', itemid, [(self.now - 30, value)])
+
+    def test_aggregated_values_are_grouped_by_host(self):
+        values = self.backend.get_hosts_items_aggregated_values(
+            [self.host1, self.host2], [self.item], self.now - 60, self.now)
+        self.assertEqual(values, {'1': {'ram': 2}, '2': {'ram': 3}})
+
+    def test_items_stats_are_returned_for_each_host(self):
+        stats = self.backend.get_items_stats(['1', '2'], self.item, [self.now - 120, self.now])
+        self.assertEqual(stats, {'1': [2], '2': [3]})
@@ -1,13 +1,16 @@
 import datetime
+from decimal import Decimal
+
 from dateutil.relativedelta import relativedelta
 import mock
 
 from rest_framework import status, test
 
 from waldur_core.core.utils import datetime_to_timestamp
+from waldur_core.monitoring.models import ResourceSla, ResourceSlaStateTransition
 from waldur_core.monitoring.utils import format_period
 from waldur_core.structure.tests import factories as structure_factories
-from waldur_zabbix.tasks import pull_sla
+from waldur_zabbix.tasks import pull_sla, update_itservice_sla, update_sla
 
 from . import factories
 from .. import models
@@ -55,14 +58,14 @@ class SlaViewTest(test.APITransactionTestCase):
 class SlaPullTest(test.APITransactionTestCase):
 
     @mock.patch('waldur_core.structure.models.ServiceProjectLink.get_backend')
-    @mock.patch('waldur_zabbix.tasks.update_itservice_sla')
-    def test_task_calls_backend(self, mock_task, mock_backend):
+    def test_task_pulls_sla_for_all_months_at_once(self, mock_backend):
         # Given
         itservice = factories.ITServiceFactory(is_main=True, backend_id='VALID')
 
         min_dt = datetime.date.today().replace(day=10) - relativedelta(months=2)
         max_dt = datetime.date.today().replace(day=10) - relativedelta(months=1)
         mock_backend().get_sla_range.return_value = min_dt, max_dt
+        mock_backend().get_itservices_sla.return_value = {'VALID': [99.5, 100]}
 
         # When
         pull_sla(itservice.host.uuid)
@@ -71,13 +74,75 @@ class SlaPullTest(test.APITransactionTestCase):
         mock_backend().get_sla_range.assert_called_once_with(itservice.backend_id)
         month1_beginning = min_dt.replace(day=1)
         month2_beginning = min_dt.replace(day=1) + relativedelta(months=+1)
-        mock_task.delay.assert_has_calls([
-            mock.call(itservice.pk,
-                      format_period(min_dt),
-                      datetime_to_timestamp(month1_beginning),
-                      datetime_to_timestamp(month2_beginning)),
-            mock.call(itservice.pk,
-                      format_period(max_dt),
-                      datetime_to_timestamp(month2_beginning),
-                      datetime_to_timestamp(max_dt))
+        mock_backend().get_itservices_sla.assert_called_once_with(['VALID'], [
+            (datetime_to_timestamp(month1_beginning), datetime_to_timestamp(month2_beginning)),
+            (datetime_to_timestamp(month2_beginning), datetime_to_timestamp(max_dt)),
+        ])
+        values = dict(models.SlaHistory.objects.filter(itservice=itservice).values_list('period', 'value'))
+        self.assertEqual(values, {
+            format_period(min_dt): Decimal('99.5'),
+            format_period(max_dt): Decimal('100'),
+        })
+
+
+@mock.patch('waldur_core.structure.models.ServiceProjectLink.get_backend')
+class SlaUpdateTest(test.APITransactionTestCase):
+    def setUp(self):
+        self.scope = structure_factories.TestNewInstanceFactory()
+        host = factories.HostFactory(scope=self.scope)
+        self.itservice = factories.ITServiceFactory(
+            host=host, service_project_link=host.service_project_link,
+            is_main=True, backend_id='VALID', backend_trigger_id='TRIGGER', agreed_sla=Decimal('95'))
+
+        today = datetime.date.today()
+        self.period = format_period(today)
+        self.start_time = datetime_to_timestamp(today.replace(day=1))
+        self.end_time = datetime_to_timestamp(today) + 3600
+
+    def pull(self, mock_backend, sla_value, events):
+        mock_backend().get_itservices_sla.return_value = {'VALID': [sla_value]}
+        mock_backend().get_triggers_events.return_value = {'TRIGGER': events}
+        update_itservice_sla(self.itservice.pk, self.period, self.start_time, self.end_time)
+
+    def test_sla_and_state_transitions_are_saved(self, mock_backend):
+        self.pull(mock_backend, 99.5, [
+            {'timestamp': self.start_time + 10, 'value': '1'},
+            {'timestamp': self.start_time + 20, 'value': '0'},
         ])
+
+        history = models.SlaHistory.objects.get(itservice=self.itservice, period=self.period)
+        self.assertEqual(history.value, Decimal('99.5'))
+        self.assertEqual(set(history.events.values_list('timestamp', 'state')),
+                         {(self.start_time + 10, 'D'), (self.start_time + 20, 'U')})
+
+        resource_sla = ResourceSla.objects.get(scope=self.scope, period=self.period)
+        self.assertEqual(resource_sla.value, Decimal('99.5'))
+        self.assertEqual(resource_sla.agreed_value, Decimal('95'))
+        transitions = ResourceSlaStateTransition.objects.filter(scope=self.scope, period=self.period)
+        self.assertEqual(set(transitions.values_list('timestamp', 'state')),
+                         {(self.start_time + 10, False), (self.start_time + 20, True)})
+
+    def test_repeated_pull_updates_sla_and_adds_only_new_events(self, mock_backend):
+        event = {'timestamp': self.start_time + 10, 'value': '1'}
+        self.pull(mock_backend, 99.5, [event])
+        self.pull(mock_backend, 98, [event, {'timestamp': self.start_time + 20, 'value': '0'}])
+
+        history = models.SlaHistory.objects.get(itservice=self.itservice, period=self.period)
+        self.assertEqual(history.value, Decimal('98'))
+        self.assertEqual(history.events.count(), 2)
+        self.assertEqual(ResourceSla.objects.get(scope=self.scope, period=self.period).value, Decimal('98'))
+        self.assertEqual(ResourceSlaStateTransition.objects.filter(scope=self.scope).count(), 2)
+
+    def test_events_of_all_services_are_fetched_with_one_request(self, mock_backend):
+        other_itservice = factories.ITServiceFactory(
+            service_project_link=self.itservice.service_project_link, backend_trigger_id='OTHER')
+        mock_backend().get_itservices_sla.return_value = {'VALID': [99.5], other_itservice.backend_id: [100]}
+        mock_backend().get_triggers_events.return_value = {}
+
+        update_sla('monthly')
+
+        self.assertEqual(mock_backend().get_itservices_sla.call_count, 1)
+        self.assertEqual(mock_backend().get_triggers_events.call_count, 1)
+        trigger_ids = mock_backend().get_triggers_events.call_args[0][0]
+        self.assertEqual(sorted(trigger_ids), ['OTHER', 'TRIGGER'])
+        self.assertEqual(models.SlaHistory.objects.filter(period=self.period).count(), 2)
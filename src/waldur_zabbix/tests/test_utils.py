@@ -18,3 +18,30 @@ class TimeParserTest(unittest.TestCase):
 
     def test_invalid_input_value_raises_error(self):
         self.assertRaises(ValueError, utils.parse_time, 'y10')
+
+
+class ResampleTest(unittest.TestCase):
+    def setUp(self):
+        self.times = [100, 150, 210, 290]
+        self.values = [1.0, 4.0, 2.0, 3.0]
+
+    def test_latest_value_of_segment_is_taken(self):
+        values = utils.resample(self.times, self.values, [0, 160, 300], interval=60)
+        self.assertEqual(values, [4.0, 3.0])
+
+    def test_value_reported_within_check_interval_is_taken(self):
+        values = utils.resample(self.times, self.values, [290, 295, 300], interval=60)
+        self.assertEqual(values, [3.0, 3.0])
+
+    def test_outdated_value_is_skipped(self):
+        values = utils.resample(self.times, self.values, [0, 50, 160, 400, 500], interval=60)
+        self.assertEqual(values, [None, 4.0, 3.0, None])
+
+    def test_values_are_aggregated_within_segments(self):
+        points = [0, 160, 300]
+        self.assertEqual(utils.resample(self.times, self.values, points, 60, 'max'), [4.0, 3.0])
+        self.assertEqual(utils.resample(self.times, self.values, points, 60, 'min'), [1.0, 2.0])
+        self.assertEqual(utils.resample(self.times, self.values, points, 60, 'avg'), [2.5, 2.5])
+
+    def test_empty_history_is_resampled_to_none(self):
+        self.assertEqual(utils.resample([], [], [0, 10, 20], 60), [None, None])
@@ -1,3 +1,7 @@
+import numpy as np
+
+from waldur_core.core.utils import aggregate_segments
+
 TIME_SUFFIXES = {
     's': 1,
     'm': 60,
@@ -26,3 +30,35 @@ def parse_time(value):
             return int(stripped) * factor
 
     raise ValueError('Invalid time value %s' % value)
+
+
+def resample(times, values, points, interval, method='last'):
+    """
+    Resample item values to segments between consecutive points.
+    Times and points have to be sorted ascending. Segment i is (points[i], points[i + 1]].
+
+    Method "last" takes the latest value reported up to the end of segment,
+    provided that it is within segment or within interval between item checks.
+    Methods "min", "max" and "avg" aggregate all values reported within segment.
+
+    :return: list of values, None for segments without values
+    """
+    times = np.asarray(times)
+    values = np.asarray(values)
+    points = np.asarray(points)
+    if not len(times):
+        return [None] * (len(points) - 1)
+
+    if method == 'last':
+        ends = points[1:]
+        lower_bounds = np.minimum(points[:-1], ends - interval)
+        positions = np.searchsorted(times, ends, side='right') - 1
+        found = positions >= 0
+        positions = np.maximum(positions, 0)
+        found &= times[positions] > lower_bounds
+        result = values[positions]
+    else:
+        result, counts = aggregate_segments(times, values, points, method, closed='right')
+        found = counts > 0
+
+    return [value if is_found else None for value, is_found in zip(result.tolist(), found.tolist())]
@@ -12,6 +12,7 @@ from waldur_core.monitoring.utils import get_period
 from waldur_core.structure import views as structure_views
 
 from . import models, serializers, filters, executors
+from .backend import ZabbixBackend
 from .managers import filter_active
 
 
@@ -116,6 +117,9 @@ class HostViewSet(structure_views.ResourceViewSet):
 
         Also you should specify one or more name of host template items, for example 'openstack.instance.cpu_util'
 
+        Optional *?method=<method>* parameter defines how values between points are resampled.
+        Default: last, i.e. the latest value at point. Choices: last, min, max, avg.
+
         Response is list of datapoints, each of which is dictionary with following fields:
          - 'point' - timestamp;
          - 'value' - values are converted from bytes to megabytes, if possible;
@@ -160,12 +164,12 @@ class HostViewSet(structure_views.ResourceViewSet):
         items = self._get_items(request, hosts)
 
         aggregated_data = defaultdict(lambda: 0)
-        for host in hosts:
-            backend = host.get_backend()
-            host_aggregated_values = backend.get_items_aggregated_values(
-                host, items, filter_data['start'], filter_data['end'], filter_data['method'])
-            for key, value in host_aggregated_values.items():
-                aggregated_data[key] += value
+        for backend, backend_hosts in self._group_hosts_by_backend(hosts):
+            hosts_aggregated_values = backend.get_hosts_items_aggregated_values(
+                backend_hosts, items, filter_data['start'], filter_data['end'], filter_data['method'])
+            for host_aggregated_values in hosts_aggregated_values.values():
+                for key, value in host_aggregated_values.items():
+                    aggregated_data[key] += value
         return Response(aggregated_data, status=status.HTTP_200_OK)
 
     # TODO: make methods items_aggregated_values and items_values DRY.
@@ -184,7 +188,8 @@ class HostViewSet(structure_views.ResourceViewSet):
         return Response(host_aggregated_values, status=status.HTTP_200_OK)
 
     def _get_hosts(self):
-        hosts = filter_active(self.filter_queryset(self.get_queryset()))
+        hosts = filter_active(self.filter_queryset(self.get_queryset())).select_related(
+            'service_project_link__service__settings')
         if not hosts:
             raise NoHostsException()
         return hosts
@@ -208,13 +213,20 @@ class HostViewSet(structure_views.ResourceViewSet):
             raise exceptions.ValidationError(
                 'Cannot show historical data for non-numeric items: %s' % ', '.join(non_numeric_items))
         points = self._get_points(request)
+        method = request.query_params.get('method', 'last')
+        if method not in ZabbixBackend.ITEM_STATS_METHODS:
+            raise exceptions.ValidationError(
+                'Method should be one of: %s' % ', '.join(ZabbixBackend.ITEM_STATS_METHODS))
 
+        grouped_hosts = self._group_hosts_by_backend(hosts)
         stats = []
         for item in items:
-            values = self._sum_rows([
-                host.get_backend().get_item_stats(host.backend_id, item, points)
-                for host in hosts
-            ])
+            rows = []
+            for backend, backend_hosts in grouped_hosts:
+                hosts_values = backend.get_items_stats(
+                    [host.backend_id for host in backend_hosts], item, points, method)
+                rows.extend(hosts_values.values())
+            values = self._sum_rows(rows)
 
             for point, value in zip(points, values):
                 stats.append({
@@ -225,6 +237,16 @@ class HostViewSet(structure_views.ResourceViewSet):
                 })
         return stats
 
+    def _group_hosts_by_backend(self, hosts):
+        """
+        Hosts of the same service settings are stored in the same Zabbix database,
+        so that their values are fetched together.
+        """
+        grouped_hosts = defaultdict(list)
+        for host in hosts:
+            grouped_hosts[host.service_project_link.service.settings].append(host)
+        return [(settings.get_backend(), settings_hosts) for settings, settings_hosts in grouped_hosts.items()]
+
     def _get_points(self, request):
         mapped = {
             'start': request.query_params.get('start'),
@@ -0,0 +1,72 @@
+"""
+Minimal subset of Zabbix database schema backed by SQLite.
+It is used in tests and benchmarks instead of real Zabbix MySQL database.
+"""
+import os
+import tempfile
+
+from django.db import connections
+
+from waldur_zabbix import history
+
+SCHEMA = (
+    'CREATE TABLE items (itemid INTEGER PRIMARY KEY, hostid INTEGER NOT NULL, key_ VARCHAR(255) NOT NULL)',
+    'CREATE INDEX items_1 ON items (hostid, key_)',
+    'CREATE TABLE history (itemid INTEGER NOT NULL, clock INTEGER NOT NULL, value REAL NOT NULL)',
+    'CREATE INDEX history_1 ON history (itemid, clock)',
+    'CREATE TABLE history_uint (itemid INTEGER NOT NULL, clock INTEGER NOT NULL, value INTEGER NOT NULL)',
+    'CREATE INDEX history_uint_1 ON history_uint (itemid, clock)',
+    'CREATE TABLE trends (itemid INTEGER NOT NULL, clock INTEGER NOT NULL, '
+    'value_min REAL NOT NULL, value_avg REAL NOT NULL, value_max REAL NOT NULL)',
+    'CREATE INDEX trends_1 ON trends (itemid, clock)',
+    'CREATE TABLE trends_uint (itemid INTEGER NOT NULL, clock INTEGER NOT NULL, '
+    'value_min INTEGER NOT NULL, value_avg INTEGER NOT NULL, value_max INTEGER NOT NULL)',
+    'CREATE INDEX trends_uint_1 ON trends_uint (itemid, clock)',
+    'CREATE TABLE service_alarms (servicealarmid INTEGER PRIMARY KEY, serviceid INTEGER NOT NULL, '
+    'clock INTEGER NOT NULL, value INTEGER NOT NULL)',
+)
+
+
+class ZabbixDatabaseFixture(object):
+    def __init__(self):
+        _, self.path = tempfile.mkstemp(prefix='zabbix-', suffix='.sqlite3')
+        self.database_parameters = {
+            'engine': 'django.db.backends.sqlite3',
+            'name': self.path,
+        }
+        self.last_item_id = 0
+        with self.connection.cursor() as cursor:
+            for statement in SCHEMA:
+                cursor.execute(statement)
+
+    @property
+    def connection(self):
+        return history.get_connection(self.database_parameters)
+
+    def close(self):
+        connection = self.connection
+        connection.close()
+        del connections.databases[connection.alias]
+        os.remove(self.path)
+
+    def add_item(self, hostid, key):
+        self.last_item_id += 1
+        with self.connection.cursor() as cursor:
+            cursor.execute('INSERT INTO items (itemid, hostid, key_) VALUES (%s, %s, %s)',
+                           [self.last_item_id, hostid, key])
+        return self.last_item_id
+
+    def add_values(self, table, itemid, values):
+        """
+        :param values: list of (clock, value) pairs
+        """
+        with self.connection.cursor() as cursor:
+            if table.startswith('trends'):
+                cursor.executemany(
+                    'INSERT INTO %s (itemid, clock, value_min, value_avg, value_max) '
+                    'VALUES (%%s, %%s, %%s, %%s, %%s)' % table,
+                    [(itemid, clock, value, value, value) for clock, value in values])
+            else:
+                cursor.executemany(
+                    'INSERT INTO %s (itemid, clock, value) VALUES (%%s, %%s, %%s)' % table,
+                    [(itemid, clock, value) for clock, value in values])